@@ -0,0 +1,100 @@
+"""
+Assessment Progress Counters
+
+RiskTool.question_count, AssessmentSession.total_questions (the tool's count,
+copied so session lists need no join) and AssessmentSession.answered_count
+are stored instead of being counted on every progress display. Signals (see
+signals.py) move them with F() updates as questions are added or removed and
+as answers become answered or unanswered; bulk writes and deletions that
+cascade from topics or categories recount the affected tool.
+
+get_status_summary builds the status dashboard (per-category progress,
+priority buckets, risks with measures) from a fixed handful of queries.
+"""
+
+from django.db.models import Exists, F, OuterRef
+from .models import (
+    RiskTool, RiskCategory, RiskQuestion, RiskTopic, AssessmentSession, ActionPlanMeasure,
+)
+
+PRIORITY_LEVELS = ('HIGH', 'MEDIUM', 'LOW')
+
+
+def get_tool_id_of_topic(topic_id):
+    return RiskTopic.objects.filter(pk=topic_id).values_list('category__tool_id', flat=True).first()
+
+
+def adjust_question_count(tool_id, delta):
+    """Moves the tool's question count and its sessions' totals by delta"""
+    if not tool_id or not delta:
+        return
+    RiskTool.objects.filter(pk=tool_id).update(question_count=F('question_count') + delta)
+    AssessmentSession.objects.filter(tool_id=tool_id).update(total_questions=F('total_questions') + delta)
+
+
+def refresh_question_count(tool_id):
+    """Recounts the tool's questions (after bulk inserts or cascading deletes)"""
+    if not tool_id:
+        return
+    count = RiskQuestion.objects.filter(topic__category__tool_id=tool_id).count()
+    RiskTool.objects.filter(pk=tool_id).update(question_count=count)
+    AssessmentSession.objects.filter(tool_id=tool_id).update(total_questions=count)
+
+
+def adjust_answered_count(session_id, delta):
+    if delta:
+        AssessmentSession.objects.filter(pk=session_id).update(answered_count=F('answered_count') + delta)
+
+
+def _percentage(part, whole):
+    return round(part / whole * 100) if whole else 0
+
+
+def get_status_summary(session):
+    """
+    {'category_progress': [{'title', 'answered', 'total', 'progress'}],
+     'total_progress', 'high_priority', 'medium_priority', 'low_priority',
+     'total_risks', 'risks_with_measures'}; risks are 'NO' answers plus
+    custom risks marked not acceptable. Four queries regardless of tool size.
+    """
+    # question_id -> (response, risk_priority, has_measures)
+    answers = {
+        question_id: (response, priority, has_measures)
+        for question_id, response, priority, has_measures in session.answers.annotate(
+            has_measures=Exists(ActionPlanMeasure.objects.filter(answer=OuterRef('pk'))),
+        ).values_list('question_id', 'response', 'risk_priority', 'has_measures')
+    }
+
+    categories = {
+        category_id: {'title': title, 'answered': 0, 'total': 0}
+        for category_id, title in RiskCategory.objects.filter(tool_id=session.tool_id).values_list('pk', 'title')
+    } if session.tool_id else {}
+    question_rows = RiskQuestion.objects.filter(topic__category__tool_id=session.tool_id).values_list(
+        'pk', 'topic__category_id'
+    ) if session.tool_id else []
+    for question_id, category_id in question_rows:
+        category = categories[category_id]
+        category['total'] += 1
+        if question_id in answers and answers[question_id][0]:
+            category['answered'] += 1
+
+    for category in categories.values():
+        category['progress'] = _percentage(category['answered'], category['total'])
+
+    # Risks: (priority, has measures)
+    risks = [(priority, has_measures) for response, priority, has_measures in answers.values() if response == 'NO']
+    risks += list(session.custom_risks.filter(is_acceptable=False).annotate(
+        has_measures=Exists(ActionPlanMeasure.objects.filter(custom_risk=OuterRef('pk'))),
+    ).values_list('priority', 'has_measures'))
+
+    total_answered = sum(category['answered'] for category in categories.values())
+    total_questions = sum(category['total'] for category in categories.values())
+    summary = {
+        'category_progress': list(categories.values()),
+        'total_progress': _percentage(total_answered, total_questions),
+        'total_risks': len(risks),
+        'risks_with_measures': sum(1 for _, has_measures in risks if has_measures),
+    }
+    for level in PRIORITY_LEVELS:
+        summary[f'{level.lower()}_priority'] = sum(1 for priority, _ in risks if priority == level)
+    return summary
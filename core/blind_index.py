@@ -0,0 +1,114 @@
+"""
+Blind Index Utility Module
+
+Keyed HMAC digests of normalized plaintext, stored next to encrypted columns
+so exact-match lookups can run as indexed SQL queries without decrypting rows.
+"""
+
+import hashlib
+import hmac
+import re
+from django.conf import settings
+
+
+BLIND_INDEX_LENGTH = 64
+BLIND_INDEX_SUFFIX = '_bidx'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_IDENTIFIER_STRIP_RE = re.compile(r'[\s\-./]+')
+
+
+def turkish_casefold(value):
+    """
+    Lowercase a string using Turkish rules (I -> ı, İ -> i).
+    Plain str.lower() turns 'İ' into 'i̇' (with a combining dot) and 'I' into 'i'.
+    """
+    return value.replace('I', 'ı').replace('İ', 'i').lower()
+
+
+def normalize_text(value):
+    """Collapse whitespace and casefold (Turkish-aware) for name-like fields"""
+    if value is None:
+        return ''
+    return turkish_casefold(_WHITESPACE_RE.sub(' ', str(value)).strip())
+
+
+def normalize_identifier(value):
+    """Drop separators and casefold for identifiers (TCKN, license no, DETSİS no)"""
+    if value is None:
+        return ''
+    return turkish_casefold(_IDENTIFIER_STRIP_RE.sub('', str(value)))
+
+
+NORMALIZERS = {
+    'text': normalize_text,
+    'identifier': normalize_identifier,
+}
+
+
+def _get_key():
+    """
+    Returns the HMAC key. BLIND_INDEX_KEY is preferred; otherwise a sub-key is
+    derived from FIELD_ENCRYPTION_KEY so the two secrets are never used for the same purpose.
+    """
+    key = getattr(settings, 'BLIND_INDEX_KEY', '')
+    if key:
+        return key.encode('utf-8')
+    return hmac.new(
+        settings.FIELD_ENCRYPTION_KEY.encode('utf-8'),
+        b'osha-app:blind-index',
+        hashlib.sha256
+    ).digest()
+
+
+def compute_blind_index(value, kind='text'):
+    """Returns the hex HMAC-SHA256 of the normalized value ('' for empty values)"""
+    normalized = NORMALIZERS[kind](value)
+    if not normalized:
+        return ''
+    return hmac.new(_get_key(), normalized.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def blind_index_column(field_name):
+    return f"{field_name}{BLIND_INDEX_SUFFIX}"
+
+
+def get_blind_index_kind(model, field_name):
+    """Returns the normalizer kind if the model keeps a blind index for field_name, else None"""
+    if model is None:
+        return None
+    return getattr(model, 'BLIND_INDEX_FIELDS', {}).get(field_name)
+
+
+def blind_index_matches(value, other, kind='text'):
+    """Python-side equivalent of a blind-index lookup (used when rows are already in memory)"""
+    return NORMALIZERS[kind](value) == NORMALIZERS[kind](other)
+
+
+def filter_by_blind_index(queryset, field_name, value):
+    """
+    Filters a queryset on the blind index of field_name.
+    Returns None if the model has no blind index for that field.
+    """
+    kind = get_blind_index_kind(queryset.model, field_name)
+    if not kind:
+        return None
+    return queryset.filter(**{blind_index_column(field_name): compute_blind_index(value, kind)})
+
+
+SEARCH_TOKEN_LENGTH = 16
+
+
+def compute_search_token(gram):
+    """
+    Keyed digest of one n-gram for the search token table. Truncated on purpose:
+    collisions only add candidates, which the decrypt-and-verify step drops.
+    """
+    digest = hmac.new(_get_key(), f"gram:{gram}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return digest[:SEARCH_TOKEN_LENGTH]
+
+
+def compute_row_fingerprint(model_key, parts):
+    """Keyed digest of a record's normalized business-key values (import duplicate detection)"""
+    payload = '\x1f'.join(parts)
+    return hmac.new(_get_key(), f"row:{model_key}:{payload}".encode('utf-8'), hashlib.sha256).hexdigest()
@@ -0,0 +1,22 @@
+"""
+System Checks
+
+Cache invalidation (scoped stats, filter options) goes through the default
+cache, so production needs a backend shared by every worker process.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith('.LocMemCache'):
+        return [Warning(
+            "The default cache is local memory: each worker process has its own, so cached "
+            "stats and filter options go stale in the workers that did not handle a change.",
+            hint="Set CACHE_BACKEND / CACHE_LOCATION to a shared cache (see DEPLOYMENT.md).",
+            id='core.W001',
+        )]
+    return []
@@ -0,0 +1,385 @@
+"""
+Compliance Engine
+
+Loads one compact row per worker (latest education date, latest examination
+date, first aid expiry) in a fixed number of queries and derives every
+education/examination/first aid count and percentage from those rows.
+Education dates are plaintext and aggregated in SQL; examination and first aid
+dates are encrypted, so they are decrypted once and reduced in Python.
+
+The result is materialized in WorkerComplianceStatus so pages can read
+statuses and counts with indexed SQL aggregates instead of recomputing.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, F, Max, Q
+
+
+# Validity periods (years) per hazard class
+VALIDITY_YEARS = {
+    'education': {'HIGH': 1, 'MEDIUM': 2, 'LOW': 3},
+    'examination': {'HIGH': 1, 'MEDIUM': 3, 'LOW': 5},
+}
+
+
+def get_validity_years(hazard_class, type_):
+    """type_: 'education' or 'examination'. Unknown hazard classes fall back to LOW."""
+    periods = VALIDITY_YEARS.get(type_)
+    if not periods:
+        return 0
+    return periods.get(hazard_class, periods['LOW'])
+
+
+class WorkerCompliance(namedtuple('WorkerCompliance', [
+    'worker_id', 'workplace_id', 'facility_id', 'hazard_class',
+    'latest_education_date', 'latest_exam_date', 'first_aid_expiry',
+])):
+    """
+    first_aid_expiry is only set when the worker holds a certificate.
+    """
+    __slots__ = ()
+
+    def expiry(self, type_):
+        latest = self.latest_education_date if type_ == 'education' else self.latest_exam_date
+        if latest is None:
+            return None
+        return latest + relativedelta(years=get_validity_years(self.hazard_class, type_))
+
+    @property
+    def education_expiry(self):
+        return self.expiry('education')
+
+    @property
+    def exam_expiry(self):
+        return self.expiry('examination')
+
+    def is_valid(self, type_, today):
+        expiry = self.expiry(type_)
+        return expiry is not None and expiry >= today
+
+    def has_first_aid(self, today):
+        return self.first_aid_expiry is not None and self.first_aid_expiry >= today
+
+
+def load_compliance(workers):
+    """
+    Returns {worker_id: WorkerCompliance} for a Worker queryset.
+    Three queries regardless of size: workers, grouped education max, examination dates.
+    """
+    from .models import Education, Examination
+
+    worker_ids = workers.values('pk')
+    rows = workers.order_by().values_list(
+        'pk', 'workplace_id', 'facility_id', 'workplace__hazard_class',
+        'first_aid_certificate', 'first_aid_expiry_date',
+    )
+
+    latest_education = dict(
+        Education.workers.through.objects.filter(worker_id__in=worker_ids)
+        .values('worker_id')
+        .annotate(latest=Max('education__date'))
+        .values_list('worker_id', 'latest')
+    )
+
+    # Examination.date is encrypted: MAX() in SQL would compare ciphertext
+    latest_exam = {}
+    for worker_id, exam_date in Examination.objects.filter(worker_id__in=worker_ids).values_list('worker_id', 'date'):
+        if exam_date is not None and (worker_id not in latest_exam or exam_date > latest_exam[worker_id]):
+            latest_exam[worker_id] = exam_date
+
+    return {
+        pk: WorkerCompliance(
+            worker_id=pk,
+            workplace_id=workplace_id,
+            facility_id=facility_id,
+            hazard_class=hazard_class,
+            latest_education_date=latest_education.get(pk),
+            latest_exam_date=latest_exam.get(pk),
+            first_aid_expiry=first_aid_expiry if first_aid_certificate else None,
+        )
+        for pk, workplace_id, facility_id, hazard_class, first_aid_certificate, first_aid_expiry in rows
+    }
+
+
+def _percentage(part, total):
+    return round(part / total * 100) if total > 0 else 0
+
+
+def summarize(records, today=None):
+    """
+    Aggregates an iterable of WorkerCompliance rows into the counters the
+    dashboards use. 'expiring_*' counts validities that end in the current month.
+    """
+    today = today or date.today()
+    summary = {
+        'total_workers': 0,
+        'valid_education': 0,
+        'valid_examination': 0,
+        'first_aid_count': 0,
+        'missing_edu': 0,
+        'missing_exam': 0,
+        'expiring_edu': 0,
+        'expiring_exam': 0,
+    }
+    for record in records:
+        summary['total_workers'] += 1
+        for type_, valid_key, missing_key, expiring_key in (
+            ('education', 'valid_education', 'missing_edu', 'expiring_edu'),
+            ('examination', 'valid_examination', 'missing_exam', 'expiring_exam'),
+        ):
+            expiry = record.expiry(type_)
+            if expiry is None:
+                summary[missing_key] += 1
+                continue
+            if expiry >= today:
+                summary[valid_key] += 1
+            if expiry.year == today.year and expiry.month == today.month:
+                summary[expiring_key] += 1
+        if record.has_first_aid(today):
+            summary['first_aid_count'] += 1
+
+    total = summary['total_workers']
+    summary['education_percentage'] = _percentage(summary['valid_education'], total)
+    summary['examination_percentage'] = _percentage(summary['valid_examination'], total)
+    return summary
+
+
+def summarize_by(records, key, today=None):
+    """Groups rows by a WorkerCompliance attribute (e.g. 'facility_id') and summarizes each group"""
+    groups = defaultdict(list)
+    for record in records:
+        groups[getattr(record, key)].append(record)
+    return {group: summarize(rows, today) for group, rows in groups.items()}
+
+
+def compliance_status(expiry, today):
+    """Snapshot status for an expiry date"""
+    if expiry is None:
+        return 'MISSING'
+    return 'VALID' if expiry >= today else 'EXPIRED'
+
+
+SNAPSHOT_UPDATE_FIELDS = [
+    'hazard_class', 'latest_education_date', 'latest_exam_date',
+    'education_expiry', 'exam_expiry', 'first_aid_expiry',
+    'education_status', 'exam_status', 'updated_at',
+]
+
+
+def refresh_compliance_status(workers, today=None, batch_size=500):
+    """
+    Recomputes WorkerComplianceStatus rows for a Worker queryset from live data
+    (one upsert). Returns the number of rows written.
+    """
+    from django.utils import timezone
+    from .models import WorkerComplianceStatus
+
+    today = today or date.today()
+    now = timezone.now()
+    rows = []
+    for record in load_compliance(workers).values():
+        education_expiry = record.education_expiry
+        exam_expiry = record.exam_expiry
+        rows.append(WorkerComplianceStatus(
+            worker_id=record.worker_id,
+            hazard_class=record.hazard_class,
+            latest_education_date=record.latest_education_date,
+            latest_exam_date=record.latest_exam_date,
+            education_expiry=education_expiry,
+            exam_expiry=exam_expiry,
+            first_aid_expiry=record.first_aid_expiry,
+            education_status=compliance_status(education_expiry, today),
+            exam_status=compliance_status(exam_expiry, today),
+            updated_at=now,
+        ))
+    WorkerComplianceStatus.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['worker'],
+        update_fields=SNAPSHOT_UPDATE_FIELDS,
+    )
+    return len(rows)
+
+
+def expire_compliance_statuses(today=None):
+    """
+    Flips VALID snapshot rows whose expiry has passed to EXPIRED.
+    Returns (education_rows, exam_rows) updated.
+    """
+    from .models import WorkerComplianceStatus
+
+    today = today or date.today()
+    education = WorkerComplianceStatus.objects.filter(
+        education_status='VALID', education_expiry__lt=today
+    ).update(education_status='EXPIRED')
+    exam = WorkerComplianceStatus.objects.filter(
+        exam_status='VALID', exam_expiry__lt=today
+    ).update(exam_status='EXPIRED')
+    return education, exam
+
+
+def _snapshot_aggregates(today):
+    # Computed from expiry dates, so counts stay correct even before the nightly status update
+    return {
+        'valid_education': Count('pk', filter=Q(education_expiry__gte=today)),
+        'valid_examination': Count('pk', filter=Q(exam_expiry__gte=today)),
+        'first_aid_count': Count('pk', filter=Q(first_aid_expiry__gte=today)),
+        'has_edu': Count('pk', filter=Q(education_expiry__isnull=False)),
+        'has_exam': Count('pk', filter=Q(exam_expiry__isnull=False)),
+        'expiring_edu': Count('pk', filter=Q(education_expiry__year=today.year, education_expiry__month=today.month)),
+        'expiring_exam': Count('pk', filter=Q(exam_expiry__year=today.year, exam_expiry__month=today.month)),
+    }
+
+
+def _snapshot_summary(total, counts):
+    # Workers without a snapshot row yet count as missing
+    return {
+        'total_workers': total,
+        'valid_education': counts['valid_education'],
+        'valid_examination': counts['valid_examination'],
+        'first_aid_count': counts['first_aid_count'],
+        'missing_edu': total - counts['has_edu'],
+        'missing_exam': total - counts['has_exam'],
+        'expiring_edu': counts['expiring_edu'],
+        'expiring_exam': counts['expiring_exam'],
+        'education_percentage': _percentage(counts['valid_education'], total),
+        'examination_percentage': _percentage(counts['valid_examination'], total),
+    }
+
+
+def summarize_snapshot(workers, today=None):
+    """Same counters as summarize(), as SQL aggregates over the snapshot of a Worker queryset"""
+    from .models import WorkerComplianceStatus
+
+    today = today or date.today()
+    counts = WorkerComplianceStatus.objects.filter(worker__in=workers).aggregate(**_snapshot_aggregates(today))
+    return _snapshot_summary(workers.count(), counts)
+
+
+def summarize_snapshot_by(workers, key, today=None):
+    """summarize_snapshot() grouped by a Worker field (e.g. 'facility_id'), two queries"""
+    from .models import WorkerComplianceStatus
+
+    today = today or date.today()
+    totals = dict(workers.order_by().values_list(key).annotate(total=Count('pk')))
+    counts = {
+        row.pop('group'): row for row in
+        WorkerComplianceStatus.objects.filter(worker__in=workers).order_by()
+        .values(group=F(f'worker__{key}')).annotate(**_snapshot_aggregates(today))
+    }
+    empty = {name: 0 for name in _snapshot_aggregates(today)}
+    return {group: _snapshot_summary(total, counts.get(group, empty)) for group, total in totals.items()}
+
+
+def _record_from_snapshot(status, workplace_id, facility_id):
+    return WorkerCompliance(
+        worker_id=status.worker_id,
+        workplace_id=workplace_id,
+        facility_id=facility_id,
+        hazard_class=status.hazard_class,
+        latest_education_date=status.latest_education_date,
+        latest_exam_date=status.latest_exam_date,
+        first_aid_expiry=status.first_aid_expiry,
+    )
+
+
+def attach_compliance(workers):
+    """
+    Sets worker.compliance on already-fetched Worker instances, which
+    Worker.education_status/examination_status read. Rows come from the snapshot
+    table in one query; workers without a snapshot row are computed live.
+    Returns the workers as a list.
+    """
+    from .models import Worker, WorkerComplianceStatus
+
+    workers = list(workers)
+    if not workers:
+        return workers
+
+    snapshot = WorkerComplianceStatus.objects.in_bulk([w.pk for w in workers])
+    missing = [w.pk for w in workers if w.pk not in snapshot]
+    live = load_compliance(Worker.objects.filter(pk__in=missing)) if missing else {}
+    for worker in workers:
+        status = snapshot.get(worker.pk)
+        if status is not None:
+            worker.compliance = _record_from_snapshot(status, worker.workplace_id, worker.facility_id)
+        else:
+            worker.compliance = live.get(worker.pk)
+    return workers
+
+
+# Due calendar: (type key, snapshot column, label)
+DUE_TYPES = (
+    ('education', 'education_expiry', 'Eğitim'),
+    ('examination', 'exam_expiry', 'Sağlık Muayenesi'),
+    ('first_aid', 'first_aid_expiry', 'İlkyardım Sertifikası'),
+)
+
+
+def get_due_items(workers, days=30, today=None, types=None):
+    """
+    Education/examination/first aid validities of a Worker queryset ending in
+    [today, today + days], as one range query over the indexed snapshot expiry
+    columns. Returns dicts sorted by expiry date.
+    """
+    from .models import WorkerComplianceStatus
+
+    today = today or date.today()
+    end = today + timedelta(days=days)
+    due_types = [t for t in DUE_TYPES if types is None or t[0] in types]
+    if not due_types:
+        return []
+
+    condition = Q()
+    for _, column, _ in due_types:
+        condition |= Q(**{f'{column}__range': (today, end)})
+
+    statuses = WorkerComplianceStatus.objects.filter(worker__in=workers).filter(condition)\
+        .select_related('worker__workplace', 'worker__facility')
+
+    items = []
+    for status in statuses:
+        worker = status.worker
+        for type_, column, label in due_types:
+            expiry = getattr(status, column)
+            if expiry is None or not (today <= expiry <= end):
+                continue
+            items.append({
+                'type': type_,
+                'type_display': label,
+                'expiry_date': expiry,
+                'days_left': (expiry - today).days,
+                'worker_id': worker.pk,
+                'worker_name': worker.name,
+                'workplace_id': worker.workplace_id,
+                'workplace_name': worker.workplace.name,
+                'facility_id': worker.facility_id,
+                'facility_name': worker.facility.name if worker.facility else '',
+            })
+    items.sort(key=lambda item: (item['expiry_date'], item['workplace_name'], item['worker_name']))
+    return items
+
+
+def group_due_items(items, by='workplace'):
+    """Groups get_due_items() output by 'workplace' or 'facility', earliest due group first"""
+    groups = {}
+    for item in items:
+        key = item['workplace_id'] if by == 'workplace' else (item['workplace_id'], item['facility_id'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'workplace_id': item['workplace_id'],
+                'workplace_name': item['workplace_name'],
+                'items': [],
+            }
+            if by == 'facility':
+                group['facility_id'] = item['facility_id']
+                group['facility_name'] = item['facility_name']
+        group['items'].append(item)
+    for group in groups.values():
+        group['count'] = len(group['items'])
+    # items are already sorted by expiry, so dict order is earliest-due first
+    return list(groups.values())
@@ -0,0 +1,169 @@
+"""
+Filter Options
+
+On-demand options for relation select filters on list pages. The list page only
+renders the selected option; the select fetches further options page by page
+(and by search term) from api_filter_options. Options are scoped to the user's
+workplaces, searched through blind indexes where fields are encrypted, and
+cached under a version bumped by signals (see signals.py).
+
+Only option IDs are cached: labels of encrypted models are plaintext (e.g.
+"name (tckn)"), so they are rebuilt from the database on every request and
+never written to the cache backend, which may be a shared directory on disk.
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.crypto import salted_hmac
+from django.db.models import Q
+from .models import Workplace, Facility, Worker, Professional, Profession, Education, Inspection, Examination, ActionLog
+from .utils import get_allowed_workplace_ids, scope_queryset, get_cache_version, bump_cache_version
+from .blind_index import filter_by_blind_index, normalize_identifier
+from .search_index import search_queryset
+
+OPTIONS_PAGE_SIZE = 20
+OPTIONS_CACHE_TIMEOUT = 300
+OPTIONS_VERSION_KEY = 'filter_options:version'
+
+# List models whose relation filters may be queried through the options endpoint
+FILTER_SOURCE_MODELS = {
+    model._meta.model_name: model
+    for model in (Workplace, Facility, Worker, Professional, Education, Inspection, Examination, ActionLog)
+}
+
+# Models that may be offered as options, with the workplace lookup used to scope them
+# (None: not workplace-bound)
+OPTION_MODELS = {
+    Workplace: 'pk',
+    Facility: 'workplace_id',
+    Worker: 'workplace_id',
+    Professional: None,
+    Profession: None,
+    User: None,
+}
+
+# Relations read by __str__ of the option models
+OPTION_SELECT_RELATED = {Facility: ('workplace',)}
+
+# Plaintext fields searched with icontains (models without search tokens)
+PLAIN_SEARCH_FIELDS = {
+    Profession: ('name',),
+    User: ('username', 'first_name', 'last_name'),
+}
+
+
+def bump_filter_options_version():
+    """Invalidates every cached options page"""
+    bump_cache_version(OPTIONS_VERSION_KEY)
+
+
+def resolve_related_model(model, path):
+    """
+    Target model of a relation filter path such as 'workplace' or
+    'worker__workplace'. Returns None if path is not an allowed relation.
+    """
+    for name in path.split('__'):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.is_relation or field.related_model is None:
+            return None
+        model = field.related_model
+    return model if model in OPTION_MODELS else None
+
+
+def get_options_queryset(related_model, user):
+    """Options the user may pick from, in a stable (pk) order"""
+    queryset = related_model._default_manager.order_by('pk')
+    select_related = OPTION_SELECT_RELATED.get(related_model)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+
+    if related_model is User:
+        # Restricted users only ever see their own log entries
+        if get_allowed_workplace_ids(user) is not None:
+            queryset = queryset.filter(pk=user.pk)
+        return queryset
+
+    scope_field = OPTION_MODELS[related_model]
+    if scope_field:
+        queryset = scope_queryset(queryset, user, scope_field)
+    return queryset
+
+
+def search_options(queryset, query):
+    """Restricts options to those matching query (substring, or exact TCKN)"""
+    model = queryset.model
+    if getattr(model, 'SEARCH_TOKEN_FIELDS', None):
+        matches = search_queryset(queryset, query)
+        if 'tckn' in getattr(model, 'BLIND_INDEX_FIELDS', {}) and normalize_identifier(query).isdigit():
+            matches = matches | filter_by_blind_index(queryset, 'tckn', query)
+        return matches
+
+    fields = PLAIN_SEARCH_FIELDS.get(model)
+    if not fields:
+        return queryset.none()
+    condition = Q()
+    for field_name in fields:
+        condition |= Q(**{f'{field_name}__icontains': query})
+    return queryset.filter(condition)
+
+
+def _get_cache_key(related_model, user, query, page):
+    """
+    One key per scope, query and page. The version is stored in the value
+    rather than the key, so a bump overwrites entries instead of leaving
+    abandoned ones behind. The query may be a name or TCKN: keyed hash only.
+    """
+    ids = get_allowed_workplace_ids(user)
+    if ids is None:
+        scope = 'all'
+    else:
+        scope = ','.join(str(pk) for pk in sorted(ids))
+        if related_model is User:
+            scope = f'{scope};{user.pk}'
+    digest = salted_hmac('filter_options', f'{scope}|{query}').hexdigest()
+    return f"filter_options:{related_model._meta.label_lower}:{digest}:{page}"
+
+
+def get_filter_options(related_model, user, query='', page=1):
+    """
+    One page of select options: {'results': [{'id', 'text'}], 'has_more'}.
+    Only the rows of the requested page are decrypted for their labels.
+    """
+    query = (query or '').strip()
+    key = _get_cache_key(related_model, user, query, page)
+    version = get_cache_version(OPTIONS_VERSION_KEY)
+    queryset = get_options_queryset(related_model, user)
+
+    cached = cache.get(key)
+    if cached is not None and cached['version'] == version:
+        # Search and paging are cached, labels are not: one query by primary key
+        rows = list(queryset.filter(pk__in=cached['ids'])) if cached['ids'] else []
+        has_more = cached['has_more']
+    else:
+        if query:
+            queryset = search_options(queryset, query)
+        start = (page - 1) * OPTIONS_PAGE_SIZE
+        rows = list(queryset[start:start + OPTIONS_PAGE_SIZE + 1])
+        has_more = len(rows) > OPTIONS_PAGE_SIZE
+        rows = rows[:OPTIONS_PAGE_SIZE]
+        cache.set(key, {'version': version, 'ids': [obj.pk for obj in rows], 'has_more': has_more}, OPTIONS_CACHE_TIMEOUT)
+
+    return {
+        'results': [{'id': obj.pk, 'text': str(obj)} for obj in rows],
+        'has_more': has_more,
+    }
+
+
+def get_selected_options(related_model, user, value):
+    """The (pk, label) option for the currently selected filter value, if the user may see it"""
+    if not value:
+        return []
+    try:
+        obj = get_options_queryset(related_model, user).filter(pk=value).first()
+    except (TypeError, ValueError):
+        return []
+    return [(obj.pk, str(obj))] if obj else []
@@ -0,0 +1,88 @@
+"""
+Row Fingerprints
+
+Keyed hash of each record's normalized business key (FINGERPRINT_FIELDS on
+the model, e.g. TCKN + workplace for workers), kept in RowFingerprint by
+signals. Imports load a model's fingerprints into a set once and check every
+row against it in O(1), which also works for encrypted fields that SQL
+cannot compare.
+"""
+
+from .blind_index import NORMALIZERS, normalize_text, compute_row_fingerprint
+from .models import RowFingerprint
+from .search_index import get_model_key
+
+
+def get_fingerprint_fields(model):
+    return getattr(model, 'FINGERPRINT_FIELDS', ())
+
+
+def _normalize(model, field, value):
+    if value is None:
+        return ''
+    if hasattr(value, 'pk'):
+        value = value.pk
+    kind = getattr(model, 'BLIND_INDEX_FIELDS', {}).get(field.name)
+    if kind:
+        return NORMALIZERS[kind](value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return normalize_text(value)
+
+
+def row_fingerprint(model, values):
+    """
+    Fingerprint of a record given as {field name or attname: value} (related
+    objects or pks). None if a key field is missing or empty: such rows cannot
+    be matched.
+    """
+    parts = []
+    for name in get_fingerprint_fields(model):
+        field = model._meta.get_field(name)
+        if field.attname in values:
+            value = values[field.attname]
+        elif field.name in values:
+            value = values[field.name]
+        else:
+            return None
+        part = _normalize(model, field, value)
+        if not part:
+            return None
+        parts.append(part)
+    return compute_row_fingerprint(get_model_key(model), parts) if parts else None
+
+
+def instance_fingerprint(instance):
+    model = instance.__class__
+    attnames = [model._meta.get_field(name).attname for name in get_fingerprint_fields(model)]
+    return row_fingerprint(model, {attname: getattr(instance, attname) for attname in attnames})
+
+
+def build_fingerprints(objs):
+    """Unsaved RowFingerprint rows for saved objects (bulk imports, rebuilds)"""
+    rows = []
+    for obj in objs:
+        fingerprint = instance_fingerprint(obj)
+        if fingerprint:
+            rows.append(RowFingerprint(model_name=get_model_key(obj.__class__), object_id=obj.pk, fingerprint=fingerprint))
+    return rows
+
+
+def update_fingerprint(instance):
+    model_key = get_model_key(instance.__class__)
+    fingerprint = instance_fingerprint(instance)
+    if fingerprint is None:
+        RowFingerprint.objects.filter(model_name=model_key, object_id=instance.pk).delete()
+        return
+    RowFingerprint.objects.update_or_create(
+        model_name=model_key, object_id=instance.pk, defaults={'fingerprint': fingerprint},
+    )
+
+
+def delete_fingerprints(model, ids):
+    RowFingerprint.objects.filter(model_name=get_model_key(model), object_id__in=ids).delete()
+
+
+def load_fingerprints(model):
+    """Every stored fingerprint of model, as a set (one query)"""
+    return set(RowFingerprint.objects.filter(model_name=get_model_key(model)).values_list('fingerprint', flat=True))
@@ -2,7 +2,7 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from .models import Workplace, Worker, Professional, Education, Inspection, Examination, Profession, Facility, CertificateTemplate, RiskTool, AssessmentSession, AssessmentCustomRisk, SafetyEngagement, UserProfile
-from .utils import get_allowed_workplaces
+from .utils import get_allowed_workplaces, scope_queryset
 import random
 
 class CustomUserCreationForm(forms.ModelForm):
@@ -156,7 +156,7 @@ class WorkerForm(forms.ModelForm):
             self.fields['workplace'].queryset = allowed
             
             # Filter facilities based on allowed workplaces
-            self.fields['facility'].queryset = Facility.objects.filter(workplace__in=allowed)
+            self.fields['facility'].queryset = scope_queryset(Facility.objects.all(), self.user)
 
             if allowed.count() == 1:
                 self.fields['workplace'].initial = allowed.first()
@@ -225,7 +225,7 @@ class EducationForm(forms.ModelForm):
         if self.user:
             allowed = get_allowed_workplaces(self.user)
             self.fields['workplace'].queryset = allowed
-            self.fields['workers'].queryset = Worker.objects.filter(workplace__in=allowed)
+            self.fields['workers'].queryset = scope_queryset(Worker.objects.all(), self.user)
             
             if allowed.count() == 1:
                 self.fields['workplace'].initial = allowed.first()
@@ -306,8 +306,7 @@ class ExaminationForm(forms.ModelForm):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if self.user:
-            allowed = get_allowed_workplaces(self.user)
-            self.fields['worker'].queryset = Worker.objects.filter(workplace__in=allowed)
+            self.fields['worker'].queryset = scope_queryset(Worker.objects.all(), self.user)
 
 class ExaminationNoteForm(forms.ModelForm):
     class Meta:
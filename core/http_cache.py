@@ -0,0 +1,76 @@
+"""
+HTTP Conditional Caching
+
+conditional_json wraps read-mostly JSON views. A cheap version function
+(library signature, a digest of the rows shown, ...) identifies the data the
+response is built from; from it the decorator derives the ETag, answers
+If-None-Match / If-Modified-Since with 304 (django's condition()) and keeps
+the serialized payload in the cache, so an unchanged response is neither
+rebuilt nor, for clients that already have it, resent.
+
+The version function is the only invalidation. It must be computed on every
+request from the data itself (files, database rows), not read from a marker
+that writes bump, and must change whenever the response body would. The
+payload is stored under the version, so a stale entry is never served,
+whatever the cache backend or number of worker processes.
+"""
+
+import hashlib
+from functools import wraps
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+HTTP_CACHE_TIMEOUT = 3600
+
+
+def conditional_json(version_func, vary_on=()):
+    """
+    version_func(request, *args, **kwargs) -> (token, last_modified or None).
+    The token must change whenever the response would; it is combined with
+    the view and the full URL (query string included). vary_on: request
+    headers the response also depends on (e.g. 'Cookie'; the version
+    function must then include the relevant cookie in its token).
+    """
+    def decorator(view_func):
+        def get_version(request, *args, **kwargs):
+            # Computed once per request (condition() asks for the ETag and Last-Modified separately)
+            versions = request.__dict__.setdefault('_http_cache_versions', {})
+            if view_func not in versions:
+                token, last_modified = version_func(request, *args, **kwargs)
+                etag = hashlib.sha1(
+                    f'{view_func.__module__}.{view_func.__name__}|{request.get_full_path()}|{token}'.encode('utf-8')
+                ).hexdigest()
+                versions[view_func] = (etag, last_modified)
+            return versions[view_func]
+
+        def etag_func(request, *args, **kwargs):
+            return get_version(request, *args, **kwargs)[0]
+
+        def last_modified_func(request, *args, **kwargs):
+            return get_version(request, *args, **kwargs)[1]
+
+        @condition(etag_func=etag_func, last_modified_func=last_modified_func)
+        def cached_view(request, *args, **kwargs):
+            key = f'http_cache:{etag_func(request, *args, **kwargs)}'
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.content, HTTP_CACHE_TIMEOUT)
+            return response
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            response = cached_view(request, *args, **kwargs)
+            # Clients may keep the response but must revalidate it (cheap: 304)
+            patch_cache_control(response, private=True, no_cache=True)
+            if vary_on:
+                patch_vary_headers(response, vary_on)
+            return response
+        return wrapper
+    return decorator
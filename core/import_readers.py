@@ -0,0 +1,168 @@
+"""
+Import File Readers
+
+Row sources for ImportHandler. CSV files are read with the csv module;
+spreadsheets are streamed row by row (XLSX with openpyxl in read-only mode,
+ODS by parsing content.xml incrementally), so large sheets never load fully
+into memory. Every source yields lists of cell texts, header row first, and
+spreadsheet cells are turned into the text a CSV export would contain
+(dates in the import's date format), so the rest of the import pipeline is
+the same for all formats.
+"""
+
+import codecs
+import csv
+import os
+import zipfile
+from contextlib import contextmanager
+from datetime import date, datetime
+from xml.etree import ElementTree
+import openpyxl
+
+SPREADSHEET_EXTENSIONS = ('.xlsx', '.xlsm', '.ods')
+IMPORT_FILE_EXTENSIONS = ('.csv', '.txt') + SPREADSHEET_EXTENSIONS
+
+CSV_DELIMITERS = ';,\t|'
+SNIFF_BYTES = 64 * 1024
+SNIFF_LINES = 20
+
+_ODS_TABLE = '{urn:oasis:names:tc:opendocument:xmlns:table:1.0}'
+_ODS_OFFICE = '{urn:oasis:names:tc:opendocument:xmlns:office:1.0}'
+_ODS_TEXT = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+def is_spreadsheet(path):
+    return _extension(path) in SPREADSHEET_EXTENSIONS
+
+
+def sniff_csv(path):
+    """Guesses the encoding and delimiter of a CSV file from its first block: {'encoding', 'delimiter'}"""
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+
+    encoding = 'utf-8-sig'
+    if not sample.startswith(codecs.BOM_UTF8):
+        try:
+            sample.decode('utf-8')
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the block is still UTF-8
+            if len(sample) < SNIFF_BYTES or e.start < len(sample) - 3:
+                encoding = 'cp1254'
+
+    lines = sample.decode(encoding, errors='ignore').splitlines()[:SNIFF_LINES]
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(lines), delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ';'
+    return {'encoding': encoding, 'delimiter': delimiter}
+
+
+def cell_text(value, date_format='%Y-%m-%d'):
+    """A spreadsheet cell as the text a CSV export would hold"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (datetime, date)):
+        return value.strftime(date_format)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Numbers typed into Excel (TCKN, DETSIS) come back as floats
+    return str(value)
+
+
+def _iter_xlsx_rows(path):
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()  # Read-only workbooks keep the file open
+
+
+def _ods_cell_value(cell):
+    value_type = cell.get(f'{_ODS_OFFICE}value-type')
+    if value_type in ('float', 'percentage', 'currency'):
+        return float(cell.get(f'{_ODS_OFFICE}value'))
+    if value_type == 'date':
+        value = cell.get(f'{_ODS_OFFICE}date-value')
+        return datetime.fromisoformat(value) if 'T' in value else date.fromisoformat(value)
+    if value_type == 'boolean':
+        return cell.get(f'{_ODS_OFFICE}boolean-value') == 'true'
+    paragraphs = [''.join(p.itertext()) for p in cell.iter(f'{_ODS_TEXT}p')]
+    return '\n'.join(paragraphs) if paragraphs else None
+
+
+def _iter_ods_rows(path):
+    """Rows of the first sheet, parsed incrementally; repeated empty cells and rows are not expanded"""
+    with zipfile.ZipFile(path) as archive, archive.open('content.xml') as content:
+        for event, elem in ElementTree.iterparse(content, events=('end',)):
+            if elem.tag == f'{_ODS_TABLE}table':
+                return
+            if elem.tag != f'{_ODS_TABLE}table-row':
+                continue
+
+            row = []
+            for cell in elem:
+                if cell.tag not in (f'{_ODS_TABLE}table-cell', f'{_ODS_TABLE}covered-table-cell'):
+                    continue
+                # (value, repeat): expanded below, after trailing empty cells are dropped
+                row.append((_ods_cell_value(cell), int(cell.get(f'{_ODS_TABLE}number-columns-repeated', 1))))
+            while row and row[-1][0] is None:
+                row.pop()
+            values = []
+            for value, repeat in row:
+                values.extend([value] * repeat)
+
+            if values:
+                for _ in range(int(elem.get(f'{_ODS_TABLE}number-rows-repeated', 1))):
+                    yield values
+            elem.clear()
+
+
+@contextmanager
+def open_rows(path, delimiter=';', encoding='utf-8-sig', date_format='%Y-%m-%d'):
+    """Iterator over the file's rows as lists of cell texts (header first), closed on exit"""
+    if not is_spreadsheet(path):
+        with open(path, 'r', encoding=encoding, newline='') as f:
+            yield csv.reader(f, delimiter=delimiter)
+        return
+
+    reader = _iter_ods_rows(path) if _extension(path) == '.ods' else _iter_xlsx_rows(path)
+    try:
+        yield ([cell_text(value, date_format) for value in row] for row in reader)
+    finally:
+        reader.close()
+
+
+@contextmanager
+def open_records(path, delimiter=';', encoding='utf-8-sig', date_format='%Y-%m-%d'):
+    """
+    Iterator over the data rows as {header: cell text} dicts, like
+    csv.DictReader: empty rows are skipped, missing cells are None.
+    """
+    with open_rows(path, delimiter, encoding, date_format) as rows:
+        headers = next(rows, [])
+        yield (
+            dict(zip(headers, row + [None] * (len(headers) - len(row))))
+            for row in rows if any(cell.strip() for cell in row)
+        )
+
+
+def count_data_rows(path, delimiter=';', encoding='utf-8-sig'):
+    """Number of data rows (for progress reporting; CSV line count is an upper bound)"""
+    if not is_spreadsheet(path):
+        with open(path, 'r', encoding=encoding) as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    if _extension(path) != '.ods':
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            max_row = wb.worksheets[0].max_row
+        finally:
+            wb.close()
+        if max_row:
+            return max(max_row - 1, 0)
+    with open_rows(path) as rows:
+        return max(sum(1 for _ in rows) - 1, 0)
@@ -1,15 +1,31 @@
-import csv
+import hashlib
+import json
 import os
 from datetime import datetime
+from itertools import islice
 from django.core.files.storage import FileSystemStorage
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.dateparse import parse_date
+from encrypted_model_fields.fields import EncryptedMixin
+from .blind_index import normalize_text
+from .import_readers import open_rows, open_records, count_data_rows, is_spreadsheet, sniff_csv
+from .fingerprints import get_fingerprint_fields, row_fingerprint, load_fingerprints, build_fingerprints
+from .nace import get_danger_class, get_hazard_class
+
+# Rows per validation/bulk_create batch (each batch is one transaction)
+IMPORT_BATCH_SIZE = 500
+# Import preview: rows fully validated up front, rows shown, failing rows kept in the full report
+PREVIEW_SAMPLE_ROWS = 200
+PREVIEW_DISPLAY_ROWS = 10
+PREVIEW_ERROR_ROWS = 100
 
 class ImportHandler:
-    def __init__(self, request):
+    def __init__(self, request=None, session=None):
+        # Background jobs have no request: they pass the wizard's session values instead
         self.request = request
-        self.session = request.session
+        self.session = request.session if request is not None else (session or {})
         self.fs = FileSystemStorage(location=os.path.join(settings.BASE_DIR, 'tmp_uploads'))
 
     def save_file(self, file_obj):
@@ -20,130 +36,86 @@ class ImportHandler:
     def get_file_path(self):
         return self.session.get('import_file_path')
 
+    def is_spreadsheet(self):
+        """XLSX/ODS upload: delimiter and encoding settings do not apply"""
+        return is_spreadsheet(self.get_file_path() or '')
+
+    def detect_settings(self):
+        """Delimiter and encoding guessed from the uploaded CSV (empty for spreadsheets), used as step 2 defaults"""
+        path = self.get_file_path()
+        if not path or not os.path.exists(path) or self.is_spreadsheet():
+            return {}
+        return sniff_csv(path)
+
     def get_headers(self, delimiter=';', encoding='utf-8-sig'):
         path = self.get_file_path()
         if not path or not os.path.exists(path):
             return []
 
         try:
-            with open(path, 'r', encoding=encoding) as f:
-                reader = csv.reader(f, delimiter=delimiter)
-                headers = next(reader)
-                return headers
+            with open_rows(path, delimiter, encoding) as rows:
+                return next(rows)
         except Exception:
             return []
 
-    def get_preview_data(self, model_class, mapping, delimiter=';', date_format='%Y-%m-%d', encoding='utf-8-sig'):
+    def get_file_digest(self):
+        """SHA-256 of the uploaded file, read in blocks"""
+        digest = hashlib.sha256()
+        with open(self.get_file_path(), 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_report_key(self, model_class, mapping, import_settings):
+        """Identifies a validation report: same file contents, mapping and settings give the same key"""
+        payload = json.dumps({
+            'model': model_class._meta.label_lower,
+            'file': self.get_file_digest(),
+            'mapping': mapping,
+            'settings': import_settings,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_preview_data(self, model_class, mapping, delimiter=';', date_format='%Y-%m-%d', encoding='utf-8-sig', sample_size=PREVIEW_SAMPLE_ROWS):
+        """
+        Validates the first sample_size rows with the same checks as the import
+        (lookups, choices, duplicates) and only counts the rest of the file.
+        'complete' is False when rows were left unchecked: validate_file then
+        produces the full report.
+        """
         path = self.get_file_path()
         if not path or not os.path.exists(path):
             return {'error': 'File not found'}
 
         uppercase_names = self.session.get('import_settings', {}).get('uppercase_names', False)
+        # Existing business keys, read once (see core.fingerprints)
+        fingerprints = load_fingerprints(model_class) if get_fingerprint_fields(model_class) else None
 
         preview_rows = []
         valid_count = 0
         error_count = 0
-        total_count = 0
 
         try:
-            with open(path, 'r', encoding=encoding) as f:
-                reader = csv.DictReader(f, delimiter=delimiter)
-
-                for row_idx, row in enumerate(reader):
-                    total_count += 1
-                    model_data = {}
-                    errors = []
-
-                    for model_field, csv_header in mapping.items():
-                        if not csv_header: # Skipped field
-                            continue
-
-                        val = row.get(csv_header, '').strip()
-                        field_obj = model_class._meta.get_field(model_field)
-
-                        # Empty check
-                        if val == '' and not field_obj.blank and not field_obj.null:
-                            errors.append(f"{model_field}: Bu alan boş bırakılamaz.")
-                            continue
-
-                        if val == '':
-                            if isinstance(field_obj, models.BooleanField):
-                                model_data[model_field] = False
-                                continue
-                            model_data[model_field] = None
-                            continue
-
-                        # Type Conversion & Validation
-                        try:
-                            if isinstance(field_obj, models.DateField):
-                                model_data[model_field] = datetime.strptime(val, date_format).date()
-
-                            elif isinstance(field_obj, models.ForeignKey):
-                                rel_model = field_obj.related_model
-                                # Try ID first
-                                if val.isdigit():
-                                    try:
-                                        rel_obj = rel_model.objects.get(pk=int(val))
-                                        model_data[model_field] = rel_obj
-                                    except rel_model.DoesNotExist:
-                                        errors.append(f"{model_field}: ID {val} ile kayıt bulunamadı.")
-                                else:
-                                    # Build filter - try name match
-                                    filter_kwargs = {}
-                                    if hasattr(rel_model, 'name'):
-                                        filter_kwargs['name__iexact'] = val
-                                    else:
-                                        errors.append(f"{model_field}: '{val}' değeri ile kayıt bulunamadı.")
-                                        continue
-                                    
-                                    # Special case: filter Facility by Workplace if already resolved
-                                    if model_field == 'facility' and 'workplace' in model_data:
-                                        filter_kwargs['workplace'] = model_data['workplace']
-                                    
-                                    qs = rel_model.objects.filter(**filter_kwargs)
-                                    if qs.exists():
-                                        model_data[model_field] = qs.first()
-                                    else:
-                                        errors.append(f"{model_field}: '{val}' değeri ile kayıt bulunamadı.")
-
-                            elif field_obj.choices:
-                                # Try to match human readable label or key
-                                found = False
-                                for key, label in field_obj.choices:
-                                    if str(key) == val or str(label).lower() == val.lower():
-                                        model_data[model_field] = key
-                                        found = True
-                                        break
-                                if not found:
-                                    errors.append(f"{model_field}: '{val}' geçerli bir seçenek değil.")
-
-                            else:
-                                model_data[model_field] = val
-
-                        except ValueError as e:
-                             errors.append(f"{model_field}: Format hatası ({val})")
-
-                    # Unique Check (Simple)
-                    if not errors:
-                         # Exclude ManyToMany for uniqueness check initially
-                        check_data = {k: v for k, v in model_data.items() if not isinstance(model_class._meta.get_field(k), models.ManyToManyField)}
-                        if model_class.objects.filter(**check_data).exists():
-                             errors.append("Bu kayıt zaten mevcut.")
-
-                    status = 'Valid' if not errors else 'Error'
-                    if status == 'Valid':
-                        valid_count += 1
-                    else:
+            with open_records(path, delimiter, encoding, date_format) as reader:
+                sample = islice(reader, sample_size)
+                for row_idx, row, errors in self._iter_validated(model_class, mapping, sample, date_format, uppercase_names, fingerprints):
+                    if errors:
                         error_count += 1
+                    else:
+                        valid_count += 1
 
-                    if len(preview_rows) < 10: # Only show first 10
-                         preview_rows.append({
-                             'row_idx': row_idx + 1,
-                             'data': model_data,
-                             'original': row,
-                             'errors': errors,
-                             'status': status
-                         })
+                    if len(preview_rows) < PREVIEW_DISPLAY_ROWS:
+                        preview_rows.append({
+                            'row_idx': row_idx,
+                            'data': {field: (row.get(header) or '').strip() for field, header in mapping.items() if header},
+                            'original': row,
+                            'errors': errors,
+                            'status': 'Error' if errors else 'Valid',
+                        })
+
+                # Cheap pass: the remaining rows are only counted
+                sampled = valid_count + error_count
+                total_count = sampled + sum(1 for _ in reader)
 
         except Exception as e:
             return {'error': str(e)}
@@ -152,107 +124,94 @@ class ImportHandler:
             'total': total_count,
             'valid': valid_count,
             'error': error_count,
-            'rows': preview_rows
+            'rows': preview_rows,
+            'sampled': sampled,
+            'complete': sampled == total_count,
         }
 
-    def execute_import(self, model_class, mapping, delimiter=';', date_format='%Y-%m-%d', encoding='utf-8-sig'):
+    def validate_file(self, model_class, mapping, delimiter=';', date_format='%Y-%m-%d', encoding='utf-8-sig', progress=None):
+        """
+        Full validation report: {'total', 'valid', 'error', 'errors'} where
+        errors lists the first PREVIEW_ERROR_ROWS failing rows.
+        progress: optional callback(report_so_far, rows_total), called after every batch.
+        """
+        path = self.get_file_path()
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(path)
+
+        uppercase_names = self.session.get('import_settings', {}).get('uppercase_names', False)
+        fingerprints = load_fingerprints(model_class) if get_fingerprint_fields(model_class) else None
+        report = {'total': 0, 'valid': 0, 'error': 0, 'errors': []}
+
+        total_rows = 0
+        if progress:
+            total_rows = max(count_data_rows(path, delimiter, encoding), 1)
+
+        with open_records(path, delimiter, encoding, date_format) as reader:
+            for row_idx, row, errors in self._iter_validated(model_class, mapping, reader, date_format, uppercase_names, fingerprints):
+                report['total'] += 1
+                if errors:
+                    report['error'] += 1
+                    if len(report['errors']) < PREVIEW_ERROR_ROWS:
+                        report['errors'].append({'row_idx': row_idx, 'errors': errors})
+                else:
+                    report['valid'] += 1
+                if progress and report['total'] % IMPORT_BATCH_SIZE == 0:
+                    progress(report, total_rows)
+        return report
+
+    def _iter_validated(self, model_class, mapping, rows, date_format, uppercase_names, fingerprints, batch_size=IMPORT_BATCH_SIZE):
+        """
+        Yields (row_idx, row, errors) for each CSV row. Rows are converted as
+        the import converts them and checked for duplicates batch by batch.
+        """
+        resolvers = {}
+        pending = []
+        for row_idx, row in enumerate(rows, 1):
+            model_data, error = self._convert_row(model_class, mapping, row, date_format, uppercase_names, resolvers)
+            pending.append((row_idx, row, model_data, error))
+            if len(pending) >= batch_size:
+                yield from _with_duplicate_errors(model_class, pending, fingerprints)
+                pending = []
+        if pending:
+            yield from _with_duplicate_errors(model_class, pending, fingerprints)
+
+    def execute_import(self, model_class, mapping, delimiter=';', date_format='%Y-%m-%d', encoding='utf-8-sig', progress=None, batch_size=IMPORT_BATCH_SIZE):
+        """
+        Imports valid, not yet existing rows in batches of batch_size (one
+        bulk_create per batch). Returns the number of created records.
+        progress: optional callback(rows_done, rows_total), called every 100 rows.
+        """
         path = self.get_file_path()
         if not path or not os.path.exists(path):
             return 0  # No file to import
         
         uppercase_names = self.session.get('import_settings', {}).get('uppercase_names', False)
         success_count = 0
+        resolvers = {}
+        # Existing business keys, read once: each row is then checked in memory
+        fingerprints = load_fingerprints(model_class) if get_fingerprint_fields(model_class) else None
 
-        # Import models locally to avoid circular imports and check types
-        from .models import Workplace, Facility
+        total_rows = 0
+        if progress:
+            total_rows = max(count_data_rows(path, delimiter, encoding), 1)
 
         try:
-            with open(path, 'r', encoding=encoding) as f:
-                reader = csv.DictReader(f, delimiter=delimiter)
-                for row in reader:
-                    model_data = {}
-                    m2m_data = {}
-                    skip = False
-
-                    for model_field, csv_header in mapping.items():
-                        if not csv_header: continue
-                        val = row.get(csv_header, '').strip()
-                        field_obj = model_class._meta.get_field(model_field)
-
-                        if val == '':
-                            if not field_obj.blank and not field_obj.null:
-                                # Special case for BooleanField with default
-                                if isinstance(field_obj, models.BooleanField):
-                                    model_data[model_field] = False
-                                    continue
-                                skip = True; break
-
-                            if isinstance(field_obj, models.BooleanField):
-                                 model_data[model_field] = False
-                                 continue
-
-                            model_data[model_field] = None
-                            continue
-
-                        try:
-                            if isinstance(field_obj, models.DateField):
-                                model_data[model_field] = datetime.strptime(val, date_format).date()
-                            elif isinstance(field_obj, models.ForeignKey):
-                                rel_model = field_obj.related_model
-                                if val.isdigit():
-                                    try:
-                                        model_data[model_field] = rel_model.objects.get(pk=int(val))
-                                    except rel_model.DoesNotExist:
-                                        skip = True; break
-                                else:
-                                    # Build filter - first try name match
-                                    filter_kwargs = {}
-                                    if hasattr(rel_model, 'name'):
-                                        filter_kwargs['name__iexact'] = val
-                                    else:
-                                        # Fallback to pk if no name field
-                                        skip = True; break
-                                    
-                                    # Special case: filter Facility by Workplace if already resolved
-                                    if model_field == 'facility' and 'workplace' in model_data:
-                                        filter_kwargs['workplace'] = model_data['workplace']
-                                    
-                                    qs = rel_model.objects.filter(**filter_kwargs)
-                                    if qs.exists():
-                                        model_data[model_field] = qs.first()
-                                    else:
-                                        skip = True; break
-                            elif isinstance(field_obj, models.ManyToManyField):
-                                # Handle M2M later
-                                pass
-                            elif field_obj.choices:
-                                found_choice = False
-                                for key, label in field_obj.choices:
-                                    if str(key) == val or str(label).lower() == val.lower():
-                                        model_data[model_field] = key
-                                        found_choice = True
-                                        break
-                                if not found_choice:
-                                    skip = True; break
-                            else:
-                                if uppercase_names and isinstance(val, str):
-                                    model_data[model_field] = val.replace('i', 'İ').upper()
-                                else:
-                                    model_data[model_field] = val
-                        except Exception:
-                            skip = True; break
-
-                    if skip: continue
-
-                    # Check exist
-                    check_data = {k: v for k, v in model_data.items() if not isinstance(model_class._meta.get_field(k), models.ManyToManyField)}
-                    if not model_class.objects.filter(**check_data).exists():
-                        obj = model_class.objects.create(**check_data)
-                        success_count += 1
-
-                        # Auto-create Facility for Workplace
-                        if model_class == Workplace:
-                            Facility.objects.create(name="MERKEZ BİNA", workplace=obj)
+            with open_records(path, delimiter, encoding, date_format) as reader:
+                batch = []
+                for row_number, row in enumerate(reader, 1):
+                    if progress and row_number % 100 == 0:
+                        progress(min(row_number, total_rows), total_rows)
+
+                    model_data, error = self._convert_row(model_class, mapping, row, date_format, uppercase_names, resolvers)
+                    if error:
+                        continue
+                    batch.append(model_data)
+                    if len(batch) >= batch_size:
+                        success_count += self._create_batch(model_class, batch, fingerprints)
+                        batch = []
+                if batch:
+                    success_count += self._create_batch(model_class, batch, fingerprints)
 
         except Exception as e:
             # Log the error but don't crash
@@ -260,5 +219,256 @@ class ImportHandler:
             logging.error(f"Import error: {e}")
             return success_count
 
+        finally:
+            if success_count:
+                _after_bulk_import()
+
         return success_count
 
+    def _convert_row(self, model_class, mapping, row, date_format, uppercase_names, resolvers):
+        """
+        Converts one CSV row to model field values (FKs as `<field>_id` pks).
+        Returns (model_data, error); error is a message when the row must be skipped.
+        """
+        model_data = {}
+
+        for model_field, csv_header in mapping.items():
+            if not csv_header: continue
+            val = (row.get(csv_header) or '').strip()
+            field_obj = model_class._meta.get_field(model_field)
+
+            if isinstance(field_obj, models.ManyToManyField):
+                continue  # Not imported
+
+            if val == '':
+                if isinstance(field_obj, models.BooleanField):
+                    model_data[field_obj.attname] = False
+                    continue
+                if model_field == 'hazard_class' and mapping.get('nace_code'):
+                    continue  # Filled from the NACE code below
+                if not field_obj.blank and not field_obj.null:
+                    return None, f"{model_field}: Bu alan boş bırakılamaz."
+                # '' for non-null text columns, None otherwise
+                model_data[field_obj.attname] = field_obj.get_default()
+                continue
+
+            try:
+                if isinstance(field_obj, models.DateField):
+                    model_data[field_obj.attname] = datetime.strptime(val, date_format).date()
+                elif isinstance(field_obj, models.ForeignKey):
+                    if model_field not in resolvers:
+                        resolvers[model_field] = ForeignKeyResolver(field_obj.related_model)
+                    # Special case: filter Facility by Workplace if already resolved
+                    workplace_id = model_data.get('workplace_id') if model_field == 'facility' else None
+                    pk = resolvers[model_field].resolve(val, workplace_id)
+                    if pk is None:
+                        return None, f"{model_field}: '{val}' değeri ile kayıt bulunamadı."
+                    model_data[field_obj.attname] = pk
+                elif field_obj.choices:
+                    for key, label in field_obj.choices:
+                        if str(key) == val or str(label).lower() == val.lower():
+                            model_data[field_obj.attname] = key
+                            break
+                    else:
+                        return None, f"{model_field}: '{val}' geçerli bir seçenek değil."
+                else:
+                    if uppercase_names and isinstance(val, str):
+                        model_data[field_obj.attname] = val.replace('i', 'İ').upper()
+                    else:
+                        model_data[field_obj.attname] = val
+            except Exception:
+                return None, f"{model_field}: Format hatası ({val})"
+
+        if model_data.get('nace_code') and any(f.name == 'hazard_class' for f in model_class._meta.fields):
+            error = _apply_nace_hazard_class(model_data)
+            if error:
+                return None, error
+        if mapping.get('hazard_class') and 'hazard_class' not in model_data:
+            return None, "hazard_class: Bu alan boş bırakılamaz."
+
+        # Worker.clean: the facility must belong to the worker's workplace
+        facility_resolver = resolvers.get('facility')
+        if facility_resolver and model_data.get('facility_id') and model_data.get('workplace_id'):
+            if facility_resolver.workplace_of.get(model_data['facility_id']) != model_data['workplace_id']:
+                return None, "facility: Seçilen birim, seçilen işyerine ait değil."
+
+        return model_data, None
+
+    def _create_batch(self, model_class, batch, fingerprints=None):
+        """Creates the rows of batch that do not exist yet; returns how many were created"""
+        objs = []
+        for model_data, duplicate in zip(batch, _mark_duplicates(model_class, batch, fingerprints)):
+            if duplicate:
+                continue
+            obj = model_class(**model_data)
+            if hasattr(obj, 'update_blind_indexes'):
+                obj.update_blind_indexes()  # save() is bypassed by bulk_create
+            objs.append(obj)
+
+        if not objs:
+            return 0
+
+        from .models import Workplace, Facility
+        with transaction.atomic():
+            model_class.objects.bulk_create(objs)
+
+            # Auto-create Facility for Workplace
+            if model_class == Workplace:
+                facilities = Facility.objects.bulk_create([
+                    Facility(name="MERKEZ BİNA", workplace_id=obj.pk) for obj in objs
+                ])
+                _index_created(Facility, facilities)
+
+            _index_created(model_class, objs)
+        return len(objs)
+
+
+def _apply_nace_hazard_class(model_data):
+    """
+    A workplace's hazard class follows from its NACE code: a missing one is
+    filled in, a contradicting one is an error. Unknown codes are left alone.
+    """
+    hazard_class = get_hazard_class(model_data['nace_code'])
+    if hazard_class is None:
+        return None
+    if 'hazard_class' not in model_data:
+        model_data['hazard_class'] = hazard_class
+    elif model_data['hazard_class'] != hazard_class:
+        return (f"hazard_class: NACE kodu {model_data['nace_code']} için tehlike sınıfı "
+                f"'{get_danger_class(model_data['nace_code'])}' olmalı.")
+    return None
+
+
+class ForeignKeyResolver:
+    """
+    Resolves import cell values (a pk or a name) of one FK to related pks.
+    The related table is read once per import; encrypted names are decrypted
+    here once instead of being compared in SQL, which cannot match ciphertext.
+    """
+
+    def __init__(self, related_model):
+        field_names = {f.name for f in related_model._meta.concrete_fields}
+        self.has_name = 'name' in field_names
+        has_workplace = 'workplace' in field_names
+        columns = ['pk'] + (['name'] if self.has_name else []) + (['workplace_id'] if has_workplace else [])
+
+        self.pks = set()
+        self.by_name = {}
+        self.workplace_of = {}
+        for values in related_model._default_manager.order_by('pk').values_list(*columns):
+            pk = values[0]
+            self.pks.add(pk)
+            if self.has_name:
+                self.by_name.setdefault(normalize_text(values[1]), []).append(pk)
+            if has_workplace:
+                self.workplace_of[pk] = values[-1]
+
+    def resolve(self, value, workplace_id=None):
+        """pk for value (ID first, then case-insensitive name), or None if there is no match"""
+        if value.isdigit():
+            pk = int(value)
+            return pk if pk in self.pks else None
+        if not self.has_name:
+            return None
+        candidates = self.by_name.get(normalize_text(value), [])
+        if workplace_id is not None:
+            candidates = [pk for pk in candidates if self.workplace_of.get(pk) == workplace_id]
+        return candidates[0] if candidates else None
+
+
+def _row_key(model_class, model_data):
+    return tuple(
+        (name, model_class._meta.get_field(name).to_python(value) if value is not None else None)
+        for name, value in sorted(model_data.items())
+    )
+
+
+def _mark_duplicates(model_class, batch, fingerprints=None):
+    """
+    One flag per row of batch (converted model data): True if the record
+    already exists or repeats an earlier row. Rows are matched on their
+    fingerprint (added to fingerprints as they are seen); rows without one, or
+    models without FINGERPRINT_FIELDS, fall back to comparing every mapped
+    column in SQL.
+    """
+    keyed = [
+        (model_data, row_fingerprint(model_class, model_data) if fingerprints is not None else None)
+        for model_data in batch
+    ]
+    existing = _existing_row_keys(model_class, [model_data for model_data, fingerprint in keyed if fingerprint is None])
+    flags = []
+    for model_data, fingerprint in keyed:
+        if fingerprint is not None:
+            key, seen = fingerprint, fingerprints
+        else:
+            key, seen = _row_key(model_class, model_data), existing
+        flags.append(key in seen)
+        seen.add(key)
+    return flags
+
+
+def _with_duplicate_errors(model_class, pending, fingerprints):
+    """(row_idx, row, errors) for converted rows (row_idx, row, model_data, error)"""
+    convertible = [model_data for _, _, model_data, error in pending if not error]
+    duplicates = iter(_mark_duplicates(model_class, convertible, fingerprints))
+    for row_idx, row, model_data, error in pending:
+        if error:
+            yield row_idx, row, [error]
+        elif next(duplicates):
+            yield row_idx, row, ["Bu kayıt zaten mevcut."]
+        else:
+            yield row_idx, row, []
+
+
+def _existing_row_keys(model_class, batch, chunk_size=100):
+    """
+    Keys of batch rows that already exist, in one query per chunk_size rows.
+    Encrypted columns cannot be compared in SQL, so rows with encrypted
+    values are never found here.
+    """
+    if not batch:
+        return set()
+    names = sorted(batch[0])
+    if not names or any(isinstance(model_class._meta.get_field(name), EncryptedMixin) for name in names):
+        return set()
+
+    existing = set()
+    for start in range(0, len(batch), chunk_size):
+        condition = Q()
+        for model_data in batch[start:start + chunk_size]:
+            condition |= Q(**model_data)
+        for values in model_class.objects.filter(condition).values_list(*names):
+            existing.add(_row_key(model_class, dict(zip(names, values))))
+    return existing
+
+
+def _index_created(model_class, objs):
+    """Search tokens, fingerprints and compliance snapshots that post_save signals would have written"""
+    from .models import SearchToken, RowFingerprint, Worker, Examination
+    from .search_index import build_tokens
+    from .compliance import refresh_compliance_status
+
+    if getattr(model_class, 'SEARCH_TOKEN_FIELDS', None):
+        tokens = []
+        for obj in objs:
+            tokens.extend(build_tokens(obj))
+        SearchToken.objects.bulk_create(tokens, batch_size=IMPORT_BATCH_SIZE)
+
+    if get_fingerprint_fields(model_class):
+        RowFingerprint.objects.bulk_create(build_fingerprints(objs), batch_size=IMPORT_BATCH_SIZE)
+
+    if model_class is Worker:
+        worker_ids = [obj.pk for obj in objs]
+    elif model_class is Examination:
+        worker_ids = {obj.worker_id for obj in objs}
+    else:
+        return
+    refresh_compliance_status(Worker.objects.filter(pk__in=worker_ids))
+
+
+def _after_bulk_import():
+    # bulk_create sends no post_save: invalidate the caches the signals would have bumped
+    from .stats import bump_stats_version
+    from .filter_options import bump_filter_options_version
+    bump_stats_version()
+    bump_filter_options_version()
@@ -0,0 +1,303 @@
+"""
+Background Jobs
+
+DB-backed queue for work too slow for a web request: list exports, PDF/Word
+reports and CSV imports. Views enqueue a BackgroundJob and send the user to
+its status page; `manage.py run_jobs` claims pending jobs and runs them.
+
+  - concurrency: a job is only claimed while fewer than JOB_CONCURRENCY run
+    (enforced with row locks where the database has them, see claim_next_job),
+  - retry: failures are re-queued with exponential backoff up to max_attempts
+    (JobError marks failures that retrying cannot fix),
+  - validation: full import validation reports (VALIDATE) publish partial
+    counts as they go, so the import preview can show them while they grow,
+  - artifacts: result files live in JOB_ARTIFACT_ROOT and are deleted after
+    JOB_ARTIFACT_TTL_HOURS.
+"""
+
+import logging
+import tempfile
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import Http404, HttpRequest
+from django.utils import timezone
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 30  # seconds, doubled on every further attempt
+STALE_JOB_TIMEOUT = timedelta(hours=1)  # RUNNING longer than this: the worker died
+PROGRESS_EVERY_ROWS = 1000
+
+JOB_HANDLERS = {}
+
+
+class JobError(Exception):
+    """Permanent job failure (not retried)"""
+
+
+def register_job(kind):
+    """Registers the handler for a job kind; handlers take the job and return a result dict"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def get_artifact_storage():
+    return FileSystemStorage(location=settings.JOB_ARTIFACT_ROOT)
+
+
+def enqueue_job(kind, user=None, params=None, max_attempts=3):
+    if user is not None and not user.is_authenticated:
+        user = None
+    return BackgroundJob.objects.create(kind=kind, user=user, params=params or {}, max_attempts=max_attempts)
+
+
+def set_progress(job, percent, message='', result=None):
+    """Records progress; result optionally publishes a partial result to status pollers"""
+    job.progress = max(0, min(100, int(percent)))
+    job.progress_message = message[:255]
+    fields = {'progress': job.progress, 'progress_message': job.progress_message}
+    if result is not None:
+        job.result = fields['result'] = result
+    BackgroundJob.objects.filter(pk=job.pk).update(**fields)
+
+
+def save_artifact(job, content, filename):
+    """Stores the job's result file; content is bytes or a file object"""
+    content = ContentFile(content) if isinstance(content, bytes) else File(content)
+    job.artifact = get_artifact_storage().save(f'{job.pk}/{filename}', content)
+    job.artifact_name = filename
+
+
+def claim_next_job(worker_id, now=None):
+    """
+    Marks the next due job RUNNING for this worker and returns it (None if idle
+    or at the concurrency limit). Where the database has row locks, the limit
+    check and the claim run in one transaction: the candidate is locked with
+    select_for_update() and the running jobs are counted again after the lock,
+    so a worker that raced for the same job sees the winner's claim. Without
+    row locks (SQLite) the check and the claim of two workers can interleave,
+    and the limit is best-effort.
+    """
+    now = now or timezone.now()
+    if not connection.features.has_select_for_update:
+        return _claim_next_job(worker_id, now, lock=False)
+    with transaction.atomic():
+        return _claim_next_job(worker_id, now, lock=True)
+
+
+def _claim_next_job(worker_id, now, lock):
+    running = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING)
+    if running.count() >= settings.JOB_CONCURRENCY:
+        return None
+    candidates = BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_PENDING, run_after__lte=now,
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)[:5]
+    for pk in candidates:
+        pending = BackgroundJob.objects.filter(pk=pk, status=BackgroundJob.STATUS_PENDING)
+        if lock:
+            # Waits while another worker claims this job (then it is no longer PENDING)
+            if not list(pending.select_for_update().values_list('pk', flat=True)):
+                continue
+            if running.count() >= settings.JOB_CONCURRENCY:
+                return None
+        # Conditional update: only one worker wins the PENDING -> RUNNING transition
+        claimed = pending.update(
+            status=BackgroundJob.STATUS_RUNNING,
+            locked_by=worker_id,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Runs a claimed job and records success, retry or failure"""
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise JobError(f"Bilinmeyen iş türü: {job.kind}")
+        result = handler(job) or {}
+    except Exception as e:
+        logger.exception("Background job %s failed (attempt %s)", job.pk, job.attempts)
+        now = timezone.now()
+        job.error = str(e)
+        job.locked_by = ''
+        if not isinstance(e, JobError) and job.attempts < job.max_attempts:
+            job.status = BackgroundJob.STATUS_PENDING
+            job.run_after = now + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = BackgroundJob.STATUS_FAILED
+            job.finished_at = now
+        job.save(update_fields=['status', 'error', 'locked_by', 'run_after', 'finished_at'])
+        return job
+
+    now = timezone.now()
+    job.status = BackgroundJob.STATUS_SUCCEEDED
+    job.result = result
+    job.error = ''
+    job.progress = 100
+    job.finished_at = now
+    job.expires_at = now + timedelta(hours=settings.JOB_ARTIFACT_TTL_HOURS) if job.artifact else None
+    job.save(update_fields=['status', 'result', 'error', 'progress', 'finished_at', 'expires_at', 'artifact', 'artifact_name'])
+    return job
+
+
+def requeue_stale_jobs(now=None, timeout=STALE_JOB_TIMEOUT):
+    """Returns jobs left RUNNING by a dead worker to the queue (or fails them when out of attempts)"""
+    now = now or timezone.now()
+    stale = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING, started_at__lt=now - timeout)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=BackgroundJob.STATUS_FAILED, locked_by='', finished_at=now, error='İş zaman aşımına uğradı.',
+    )
+    requeued = stale.update(status=BackgroundJob.STATUS_PENDING, locked_by='', run_after=now)
+    return requeued, failed
+
+
+def expire_job_artifacts(now=None):
+    """Deletes result files past their expiry; returns the number of expired jobs"""
+    now = now or timezone.now()
+    storage = get_artifact_storage()
+    expired = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_SUCCEEDED, expires_at__lt=now)
+    count = 0
+    for job in expired.only('pk', 'artifact'):
+        if job.artifact:
+            storage.delete(job.artifact)
+        count += 1
+    expired.update(status=BackgroundJob.STATUS_EXPIRED, artifact='')
+    return count
+
+
+def _iter_with_progress(job, rows, total, message):
+    for number, row in enumerate(rows, 1):
+        if number % PROGRESS_EVERY_ROWS == 0 and total:
+            set_progress(job, number * 100 / total, f"{message}: {number}/{total}")
+        yield row
+
+
+# =============================================================================
+# Handlers
+# =============================================================================
+
+@register_job('EXPORT')
+def run_export_job(job):
+    """List export (generic_export_view with ?background=1)"""
+    from .exports import get_export_fields, get_export_headers, iter_export_values, iter_csv_lines, write_xlsx
+    from .views import apply_filters
+
+    params = job.params
+    model_class = apps.get_model('core', params['model'])
+    queryset = model_class.objects.all()
+    if params.get('filter_config'):
+        queryset = apply_filters(queryset, params['filter_config'], params.get('query', {}))
+
+    fields = get_export_fields(model_class)
+    total = len(queryset) if isinstance(queryset, list) else queryset.count()
+    filename = f"{model_class._meta.verbose_name_plural}_{job.created_at.strftime('%Y%m%d_%H%M%S')}"
+
+    if params.get('format') == 'xlsx':
+        rows = _iter_with_progress(job, iter_export_values(queryset, fields), total, "Satır")
+        spool = write_xlsx(rows, get_export_headers(fields))
+        filename += '.xlsx'
+    else:
+        spool = tempfile.TemporaryFile()
+        for block in iter_csv_lines(queryset, fields):
+            spool.write(block)
+        spool.seek(0)
+        filename += '.csv'
+
+    with spool:
+        save_artifact(job, spool, filename)
+    return {'rows': total}
+
+
+# Report views run as-is for the job's user; they only read session_pk
+REPORT_VIEWS = {
+    'pdf': ('export_report_pdf', 'rapor_{pk}.pdf'),
+    'word': ('export_report_word', 'rapor_{pk}.docx'),
+    'checklist': ('export_full_checklist_pdf', 'kontrol_listesi_{pk}.pdf'),
+}
+
+
+@register_job('REPORT')
+def run_report_job(job):
+    """Assessment report (PDF/Word), rendered by the same view as the direct download"""
+    from . import views
+
+    report_format = job.params.get('format')
+    if report_format not in REPORT_VIEWS:
+        raise JobError(f"Bilinmeyen rapor türü: {report_format}")
+    if job.user is None:
+        raise JobError("İşi başlatan kullanıcı bulunamadı.")
+
+    view_name, filename = REPORT_VIEWS[report_format]
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = job.user
+    try:
+        response = getattr(views, view_name)(request, job.params['session_pk'])
+    except Http404:
+        raise JobError("Değerlendirme bulunamadı.")
+    if response.status_code != 200:
+        raise JobError(response.content.decode('utf-8', 'replace')[:500])
+
+    save_artifact(job, response.content, filename.format(pk=job.params['session_pk']))
+    return {}
+
+
+@register_job('IMPORT')
+def run_import_job(job):
+    """CSV import prepared by the import wizard (step 4 with background=1)"""
+    from .import_utils import ImportHandler
+
+    params = job.params
+    model_class = apps.get_model('core', params['model'])
+    import_settings = params.get('settings', {})
+    handler = ImportHandler(session={
+        'import_file_path': params['file_path'],
+        'import_settings': import_settings,
+    })
+    count = handler.execute_import(
+        model_class, params['mapping'],
+        delimiter=import_settings.get('delimiter', ';'),
+        date_format=import_settings.get('date_format', '%Y-%m-%d'),
+        encoding=import_settings.get('encoding', 'utf-8-sig'),
+        progress=lambda done, total: set_progress(job, done * 100 / total, f"Satır: {done}/{total}"),
+    )
+    return {'imported': count}
+
+
+@register_job('VALIDATE')
+def run_validation_job(job):
+    """Full validation report for the import preview (which only checks a sample)"""
+    from .import_utils import ImportHandler
+
+    params = job.params
+    model_class = apps.get_model('core', params['model'])
+    import_settings = params.get('settings', {})
+    handler = ImportHandler(session={
+        'import_file_path': params['file_path'],
+        'import_settings': import_settings,
+    })
+    try:
+        return handler.validate_file(
+            model_class, params['mapping'],
+            delimiter=import_settings.get('delimiter', ';'),
+            date_format=import_settings.get('date_format', '%Y-%m-%d'),
+            encoding=import_settings.get('encoding', 'utf-8-sig'),
+            progress=lambda report, total: set_progress(
+                job, report['total'] * 100 / total, f"Satır: {report['total']}/{total}", result=report,
+            ),
+        )
+    except (FileNotFoundError, UnicodeDecodeError) as e:
+        raise JobError(f"Dosya okunamadı: {e}")
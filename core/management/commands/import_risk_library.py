@@ -0,0 +1,60 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.models import RiskLibraryEntry
+from core.risk_library import get_risk_library, get_risks_dir, read_library_file, reset_library_source
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads risk library JSON files into the database (full-text searchable). '
+        'Without arguments loads static/external_data/risks/; files already loaded are replaced.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Additional library JSON files (e.g. an organization\'s own risks)')
+        parser.add_argument('--remove', action='append', default=[], metavar='FILENAME',
+                            help='Remove the entries loaded from this file name')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        for filename in options['remove']:
+            deleted, _ = RiskLibraryEntry.objects.filter(source_file=filename).delete()
+            self.stdout.write(f"Removed {deleted} entries of {filename}.")
+        reset_library_source()
+        if options['remove'] and not options['files']:
+            return
+
+        if options['files']:
+            items_by_file = {}
+            for path in options['files']:
+                if not os.path.isfile(path):
+                    raise CommandError(f"File not found: {path}")
+                filename = os.path.basename(path)
+                # IDs only have to avoid the entries of the other files
+                taken = set(
+                    RiskLibraryEntry.objects.exclude(source_file=filename).values_list('library_id', flat=True)
+                )
+                for items in items_by_file.values():
+                    taken.update(item['id'] for item in items)
+                items_by_file[filename] = read_library_file(path, taken)
+        else:
+            # Same IDs as the file-based library, so stored source_library_id values stay valid
+            risks_dir = get_risks_dir()
+            if not os.path.isdir(risks_dir):
+                raise CommandError(f"Risk library directory not found: {risks_dir}")
+            items_by_file = {}
+            for item in get_risk_library():
+                items_by_file.setdefault(item['source_file'], []).append(item)
+
+        for filename, items in items_by_file.items():
+            entries = [RiskLibraryEntry.from_library_dict(item, filename) for item in items]
+            with transaction.atomic():
+                RiskLibraryEntry.objects.filter(source_file=filename).delete()
+                RiskLibraryEntry.objects.bulk_create(entries, batch_size=options['batch_size'])
+            self.stdout.write(f"Loaded {len(entries)} entries from {filename}.")
+        reset_library_source()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Risk library has {RiskLibraryEntry.objects.count()} entries."
+        ))
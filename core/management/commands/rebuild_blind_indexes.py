@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from core.models import Worker, Workplace, Professional, Facility, Examination, SearchToken, RowFingerprint
+from core.blind_index import blind_index_column
+from core.search_index import build_tokens, get_model_key
+from core.fingerprints import build_fingerprints, get_fingerprint_fields
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = 'Backfills blind-index columns, trigram search tokens and row fingerprints for encrypted lookup fields'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk write batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write("Rebuilding blind indexes...")
+
+        for model_class in (Workplace, Worker, Professional):
+            index_fields = [blind_index_column(f) for f in model_class.BLIND_INDEX_FIELDS]
+            source_fields = ['pk', *model_class.BLIND_INDEX_FIELDS]
+            count = 0
+            batch = []
+
+            with transaction.atomic():
+                for item in model_class.objects.only(*source_fields).iterator(chunk_size=batch_size):
+                    item.update_blind_indexes()
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        model_class.objects.bulk_update(batch, index_fields)
+                        count += len(batch)
+                        batch = []
+                        self.stdout.write(f"Processed {count} {model_class.__name__}", ending='\r')
+                if batch:
+                    model_class.objects.bulk_update(batch, index_fields)
+                    count += len(batch)
+
+            self.stdout.write(f"\nSuccessfully indexed {count} {model_class._meta.verbose_name_plural}.")
+
+        self.stdout.write("Rebuilding search tokens...")
+
+        for model_class in (Workplace, Facility, Worker, Professional):
+            source_fields = ['pk', *model_class.SEARCH_TOKEN_FIELDS]
+            count = 0
+            tokens = []
+
+            with transaction.atomic():
+                SearchToken.objects.filter(model_name=get_model_key(model_class)).delete()
+                for item in model_class.objects.only(*source_fields).iterator(chunk_size=batch_size):
+                    tokens.extend(build_tokens(item))
+                    count += 1
+                    if len(tokens) >= batch_size * 10:
+                        SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+                        tokens = []
+                        self.stdout.write(f"Processed {count} {model_class.__name__}", ending='\r')
+                if tokens:
+                    SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+
+            self.stdout.write(f"\nSuccessfully tokenized {count} {model_class._meta.verbose_name_plural}.")
+
+        self.stdout.write("Rebuilding row fingerprints...")
+
+        for model_class in (Workplace, Facility, Worker, Professional, Examination):
+            source_fields = ['pk', *get_fingerprint_fields(model_class)]
+            count = 0
+            batch = []
+
+            with transaction.atomic():
+                RowFingerprint.objects.filter(model_name=get_model_key(model_class)).delete()
+                for item in model_class.objects.only(*source_fields).iterator(chunk_size=batch_size):
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        RowFingerprint.objects.bulk_create(build_fingerprints(batch))
+                        count += len(batch)
+                        batch = []
+                        self.stdout.write(f"Processed {count} {model_class.__name__}", ending='\r')
+                if batch:
+                    RowFingerprint.objects.bulk_create(build_fingerprints(batch))
+                    count += len(batch)
+
+            self.stdout.write(f"\nSuccessfully fingerprinted {count} {model_class._meta.verbose_name_plural}.")
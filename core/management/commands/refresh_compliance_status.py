@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.models import Worker
+from core.compliance import refresh_compliance_status, expire_compliance_statuses
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluates worker compliance snapshots whose validity ended (run nightly); --all rebuilds every row'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every worker from education/examination data')
+        parser.add_argument('--batch-size', type=int, default=500, help='Workers per batch when rebuilding')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            batch_size = options['batch_size']
+            worker_ids = list(Worker.objects.order_by('pk').values_list('pk', flat=True))
+            count = 0
+            for start in range(0, len(worker_ids), batch_size):
+                count += refresh_compliance_status(
+                    Worker.objects.filter(pk__in=worker_ids[start:start + batch_size]),
+                    batch_size=batch_size,
+                )
+                self.stdout.write(f"Processed {count} workers", ending='\r')
+            self.stdout.write(f"\nSuccessfully rebuilt {count} compliance snapshots.")
+            return
+
+        education, exam = expire_compliance_statuses()
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {education} education and {exam} examination statuses."
+        ))
@@ -0,0 +1,45 @@
+import os
+import socket
+import time
+from django.core.management.base import BaseCommand
+from core.jobs import claim_next_job, run_job, requeue_stale_jobs, expire_job_artifacts
+
+# Stale-job and artifact cleanup runs at most this often (seconds)
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (exports, reports, imports); start one or more of these next to the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now, then exit (e.g. from cron)')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0: no limit)')
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        processed = 0
+        last_maintenance = 0
+
+        while True:
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                requeued, failed = requeue_stale_jobs()
+                expired = expire_job_artifacts()
+                if requeued or failed or expired:
+                    self.stdout.write(f"Requeued {requeued}, failed {failed} stale jobs; expired {expired} artifacts.")
+                last_maintenance = time.monotonic()
+
+            job = claim_next_job(worker_id)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            job = run_job(job)
+            processed += 1
+            self.stdout.write(f"Job {job.pk} ({job.kind}): {job.get_status_display()}")
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs."))
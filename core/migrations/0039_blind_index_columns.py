@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_add_fast_run_fields_to_custom_risk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professional',
+            name='license_id_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='professional',
+            name='name_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='professional',
+            name='tckn_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='name_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='tckn_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='workplace',
+            name='detsis_number_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='workplace',
+            name='name_bidx',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+    ]
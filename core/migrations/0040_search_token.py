@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_blind_index_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Veri Türü')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Kayıt ID')),
+                ('field', models.CharField(max_length=50, verbose_name='Alan')),
+                ('token', models.CharField(max_length=16, verbose_name='Belirteç')),
+            ],
+            options={
+                'verbose_name': 'Arama Belirteci',
+                'verbose_name_plural': 'Arama Belirteçleri',
+                'indexes': [models.Index(fields=['model_name', 'token'], name='core_searchtoken_lookup_idx'), models.Index(fields=['model_name', 'object_id'], name='core_searchtoken_object_idx')],
+            },
+        ),
+    ]
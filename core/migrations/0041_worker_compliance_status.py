@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_search_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerComplianceStatus',
+            fields=[
+                ('worker', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compliance_status', serialize=False, to='core.worker', verbose_name='Çalışan')),
+                ('hazard_class', models.CharField(choices=[('LOW', 'Az Tehlikeli'), ('MEDIUM', 'Tehlikeli'), ('HIGH', 'Çok Tehlikeli')], max_length=10, verbose_name='Tehlike Sınıfı')),
+                ('latest_education_date', models.DateField(blank=True, null=True, verbose_name='Son Eğitim Tarihi')),
+                ('latest_exam_date', models.DateField(blank=True, null=True, verbose_name='Son Muayene Tarihi')),
+                ('education_expiry', models.DateField(blank=True, db_index=True, null=True, verbose_name='Eğitim Geçerlilik Bitişi')),
+                ('exam_expiry', models.DateField(blank=True, db_index=True, null=True, verbose_name='Muayene Geçerlilik Bitişi')),
+                ('first_aid_expiry', models.DateField(blank=True, null=True, verbose_name='İlkyardım Sertifikası Bitişi')),
+                ('education_status', models.CharField(choices=[('VALID', 'Geçerli'), ('EXPIRED', 'Süresi Dolmuş'), ('MISSING', 'Yok')], db_index=True, default='MISSING', max_length=10, verbose_name='Eğitim Durumu')),
+                ('exam_status', models.CharField(choices=[('VALID', 'Geçerli'), ('EXPIRED', 'Süresi Dolmuş'), ('MISSING', 'Yok')], db_index=True, default='MISSING', max_length=10, verbose_name='Muayene Durumu')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme')),
+            ],
+            options={
+                'verbose_name': 'Çalışan Uygunluk Durumu',
+                'verbose_name_plural': 'Çalışan Uygunluk Durumları',
+            },
+        ),
+    ]
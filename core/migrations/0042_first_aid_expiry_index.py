@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_worker_compliance_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workercompliancestatus',
+            name='first_aid_expiry',
+            field=models.DateField(blank=True, db_index=True, null=True, verbose_name='İlkyardım Sertifikası Bitişi'),
+        ),
+    ]
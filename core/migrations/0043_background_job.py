@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0042_first_aid_expiry_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('EXPORT', 'Dışa Aktarma'), ('REPORT', 'Rapor'), ('IMPORT', 'İçe Aktarma')], max_length=20, verbose_name='Tür')),
+                ('params', models.JSONField(default=dict, verbose_name='Parametreler')),
+                ('status', models.CharField(choices=[('PENDING', 'Bekliyor'), ('RUNNING', 'Çalışıyor'), ('SUCCEEDED', 'Tamamlandı'), ('FAILED', 'Başarısız'), ('EXPIRED', 'Süresi Doldu')], default='PENDING', max_length=20, verbose_name='Durum')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='İlerleme (%)')),
+                ('progress_message', models.CharField(blank=True, default='', max_length=255, verbose_name='İlerleme Mesajı')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Sonuç')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Hata')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Deneme Sayısı')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='En Fazla Deneme')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Çalışma Zamanı')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100, verbose_name='Çalıştıran')),
+                ('artifact', models.CharField(blank=True, default='', max_length=255, verbose_name='Dosya')),
+                ('artifact_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Dosya Adı')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Başlangıç')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Dosya Son Geçerlilik')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Kullanıcı')),
+            ],
+            options={
+                'verbose_name': 'Arka Plan İşi',
+                'verbose_name_plural': 'Arka Plan İşleri',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='backgroundjob_queue_idx')],
+            },
+        ),
+    ]
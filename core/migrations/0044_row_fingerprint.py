@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_background_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Veri Türü')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Kayıt ID')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='Parmak İzi')),
+            ],
+            options={
+                'verbose_name': 'Kayıt Parmak İzi',
+                'verbose_name_plural': 'Kayıt Parmak İzleri',
+                'indexes': [models.Index(fields=['model_name', 'fingerprint'], name='core_rowfingerprint_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rowfingerprint',
+            constraint=models.UniqueConstraint(fields=('model_name', 'object_id'), name='core_rowfingerprint_object_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_row_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('EXPORT', 'Dışa Aktarma'), ('REPORT', 'Rapor'), ('IMPORT', 'İçe Aktarma'), ('VALIDATE', 'İçe Aktarma Doğrulaması')], max_length=20, verbose_name='Tür'),
+        ),
+    ]
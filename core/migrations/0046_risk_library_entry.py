@@ -0,0 +1,118 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:18
+
+from django.db import migrations, models
+
+
+SQLITE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_risklibraryentry_fts USING fts5(
+        search_title, search_body,
+        content='core_risklibraryentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE TRIGGER core_risklibraryentry_fts_ai AFTER INSERT ON core_risklibraryentry BEGIN
+        INSERT INTO core_risklibraryentry_fts(rowid, search_title, search_body)
+        VALUES (new.id, new.search_title, new.search_body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_risklibraryentry_fts_ad AFTER DELETE ON core_risklibraryentry BEGIN
+        INSERT INTO core_risklibraryentry_fts(core_risklibraryentry_fts, rowid, search_title, search_body)
+        VALUES ('delete', old.id, old.search_title, old.search_body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_risklibraryentry_fts_au AFTER UPDATE ON core_risklibraryentry BEGIN
+        INSERT INTO core_risklibraryentry_fts(core_risklibraryentry_fts, rowid, search_title, search_body)
+        VALUES ('delete', old.id, old.search_title, old.search_body);
+        INSERT INTO core_risklibraryentry_fts(rowid, search_title, search_body)
+        VALUES (new.id, new.search_title, new.search_body);
+    END
+    """,
+]
+
+SQLITE_FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_risklibraryentry_fts_ai",
+    "DROP TRIGGER IF EXISTS core_risklibraryentry_fts_ad",
+    "DROP TRIGGER IF EXISTS core_risklibraryentry_fts_au",
+    "DROP TABLE IF EXISTS core_risklibraryentry_fts",
+]
+
+POSTGRES_FTS_SQL = [
+    """
+    ALTER TABLE core_risklibraryentry ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', search_title), 'A') ||
+        setweight(to_tsvector('simple', search_body), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX core_risklibraryentry_search_gin ON core_risklibraryentry USING GIN (search_vector)",
+]
+
+POSTGRES_FTS_DROP_SQL = [
+    "DROP INDEX IF EXISTS core_risklibraryentry_search_gin",
+    "ALTER TABLE core_risklibraryentry DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    """Full-text index over search_title/search_body (other backends fall back to LIKE queries)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FTS_SQL)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FTS_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FTS_DROP_SQL)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FTS_DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_background_job_validate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskLibraryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('library_id', models.IntegerField(unique=True, verbose_name='Kütüphane ID')),
+                ('source_file', models.CharField(db_index=True, max_length=255, verbose_name='Kaynak Dosya')),
+                ('category', models.CharField(blank=True, max_length=255, verbose_name='Kategori')),
+                ('parent_group', models.CharField(blank=True, max_length=255, verbose_name='Üst Grup Adı')),
+                ('group_name', models.CharField(blank=True, db_index=True, max_length=255, verbose_name='Grup Adı')),
+                ('topic', models.TextField(blank=True, verbose_name='Konu')),
+                ('hazard_source', models.TextField(blank=True, verbose_name='Tehlike Kaynağı')),
+                ('activity', models.TextField(blank=True, verbose_name='Faaliyet')),
+                ('hazard', models.TextField(blank=True, verbose_name='Tehlike')),
+                ('risk', models.TextField(blank=True, verbose_name='Risk')),
+                ('legislation', models.TextField(blank=True, verbose_name='İlgili Mevzuat')),
+                ('affected_persons', models.TextField(blank=True, verbose_name='Etkilenecek Kişiler')),
+                ('measures', models.TextField(blank=True, verbose_name='Alınması Gereken Önlemler')),
+                ('tags', models.TextField(blank=True, verbose_name='Etiketler')),
+                ('extra', models.JSONField(blank=True, default=dict, verbose_name='Diğer Alanlar')),
+                ('search_title', models.TextField(blank=True, editable=False)),
+                ('search_body', models.TextField(blank=True, editable=False)),
+            ],
+            options={
+                'verbose_name': 'Risk Kütüphanesi Kaydı',
+                'verbose_name_plural': 'Risk Kütüphanesi Kayıtları',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
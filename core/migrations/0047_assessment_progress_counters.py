@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_progress_counters(apps, schema_editor):
+    RiskTool = apps.get_model('core', 'RiskTool')
+    AssessmentSession = apps.get_model('core', 'AssessmentSession')
+    question_counts = dict(
+        RiskTool.objects.annotate(count=Count('categories__topics__questions')).values_list('pk', 'count')
+    )
+    for tool_id, count in question_counts.items():
+        RiskTool.objects.filter(pk=tool_id).update(question_count=count)
+
+    answered = Count('answers', filter=Q(answers__response__isnull=False) & ~Q(answers__response=''))
+    for session_id, tool_id, answered_count in AssessmentSession.objects.annotate(answered=answered).values_list('pk', 'tool_id', 'answered'):
+        AssessmentSession.objects.filter(pk=session_id).update(
+            total_questions=question_counts.get(tool_id, 0),
+            answered_count=answered_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_risk_library_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Yanıtlanan Soru Sayısı'),
+        ),
+        migrations.AddField(
+            model_name='assessmentsession',
+            name='total_questions',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Soru Sayısı'),
+        ),
+        migrations.AddField(
+            model_name='risktool',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Soru Sayısı'),
+        ),
+        migrations.RunPython(fill_progress_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_assessment_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='risktool',
+            name='tree_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Soru Ağacı Sürümü'),
+        ),
+    ]
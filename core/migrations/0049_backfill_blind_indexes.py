@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from core.blind_index import compute_blind_index
+
+
+# Frozen copy of the models' BLIND_INDEX_FIELDS at the time of this migration
+BLIND_INDEX_FIELDS = {
+    'Workplace': {'name': 'text', 'detsis_number': 'identifier'},
+    'Worker': {'name': 'text', 'tckn': 'identifier'},
+    'Professional': {'name': 'text', 'tckn': 'identifier', 'license_id': 'identifier'},
+}
+
+BATCH_SIZE = 500
+
+
+def fill_blind_indexes(apps, schema_editor):
+    for model_name, fields in BLIND_INDEX_FIELDS.items():
+        model = apps.get_model('core', model_name)
+        columns = [f"{field}_bidx" for field in fields]
+        batch = []
+        for obj in model.objects.only('pk', *fields).iterator(chunk_size=BATCH_SIZE):
+            for field, kind in fields.items():
+                setattr(obj, f"{field}_bidx", compute_blind_index(getattr(obj, field), kind))
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, columns)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, columns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_risk_tool_tree_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_blind_indexes, migrations.RunPython.noop),
+    ]
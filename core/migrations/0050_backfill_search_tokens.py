@@ -0,0 +1,50 @@
+from django.db import migrations
+
+from core.blind_index import compute_search_token
+from core.search_index import index_grams
+
+
+# Frozen copy of the models' SEARCH_TOKEN_FIELDS at the time of this migration
+SEARCH_TOKEN_FIELDS = {
+    'Workplace': ('name', 'detsis_number', 'nace_code'),
+    'Facility': ('name',),
+    'Worker': ('name', 'tckn'),
+    'Professional': ('name',),
+}
+
+BATCH_SIZE = 500
+
+
+def fill_search_tokens(apps, schema_editor):
+    SearchToken = apps.get_model('core', 'SearchToken')
+    for model_name, fields in SEARCH_TOKEN_FIELDS.items():
+        model = apps.get_model('core', model_name)
+        model_key = model._meta.model_name
+        # Start from scratch so the migration can be re-run safely
+        SearchToken.objects.filter(model_name=model_key).delete()
+        batch = []
+        for obj in model.objects.only('pk', *fields).iterator(chunk_size=BATCH_SIZE):
+            for field in fields:
+                for gram in index_grams(getattr(obj, field)):
+                    batch.append(SearchToken(
+                        model_name=model_key,
+                        object_id=obj.pk,
+                        field=field,
+                        token=compute_search_token(gram),
+                    ))
+            if len(batch) >= BATCH_SIZE:
+                SearchToken.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+                batch = []
+        if batch:
+            SearchToken.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_backfill_blind_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_tokens, migrations.RunPython.noop),
+    ]
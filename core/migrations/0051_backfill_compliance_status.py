@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from core.compliance import refresh_compliance_status
+
+
+BATCH_SIZE = 500
+
+
+def fill_compliance_status(apps, schema_editor):
+    # Same rebuild as `refresh_compliance_status --all`. The engine reads the
+    # education/examination tables itself, so only the worker batches come
+    # from the historical model.
+    Worker = apps.get_model('core', 'Worker')
+    worker_ids = list(Worker.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(worker_ids), BATCH_SIZE):
+        refresh_compliance_status(
+            Worker.objects.filter(pk__in=worker_ids[start:start + BATCH_SIZE]),
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0050_backfill_search_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_compliance_status, migrations.RunPython.noop),
+    ]
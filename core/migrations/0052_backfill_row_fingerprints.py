@@ -0,0 +1,63 @@
+from django.db import migrations
+
+from core.blind_index import NORMALIZERS, normalize_text, compute_row_fingerprint
+
+
+# Frozen copy of the models' FINGERPRINT_FIELDS at the time of this migration,
+# as (attname, blind index kind or None) pairs
+FINGERPRINT_FIELDS = {
+    'Workplace': (('detsis_number', 'identifier'),),
+    'Facility': (('workplace_id', None), ('name', None)),
+    'Worker': (('tckn', 'identifier'), ('workplace_id', None)),
+    'Professional': (('tckn', 'identifier'),),
+    'Examination': (('worker_id', None), ('date', None)),
+}
+
+BATCH_SIZE = 500
+
+
+def _normalize(value, kind):
+    # Mirrors core.fingerprints._normalize
+    if value is None:
+        return ''
+    if kind:
+        return NORMALIZERS[kind](value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return normalize_text(value)
+
+
+def fill_row_fingerprints(apps, schema_editor):
+    RowFingerprint = apps.get_model('core', 'RowFingerprint')
+    for model_name, fields in FINGERPRINT_FIELDS.items():
+        model = apps.get_model('core', model_name)
+        model_key = model._meta.model_name
+        # Start from scratch so the migration can be re-run safely
+        RowFingerprint.objects.filter(model_name=model_key).delete()
+        attnames = [attname for attname, kind in fields]
+        batch = []
+        for obj in model.objects.only('pk', *attnames).iterator(chunk_size=BATCH_SIZE):
+            parts = [_normalize(getattr(obj, attname), kind) for attname, kind in fields]
+            if not all(parts):
+                continue
+            batch.append(RowFingerprint(
+                model_name=model_key,
+                object_id=obj.pk,
+                fingerprint=compute_row_fingerprint(model_key, parts),
+            ))
+            if len(batch) >= BATCH_SIZE:
+                RowFingerprint.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            RowFingerprint.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0051_backfill_compliance_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_row_fingerprints, migrations.RunPython.noop),
+    ]
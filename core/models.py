@@ -5,8 +5,78 @@ from django.utils.safestring import mark_safe
 from django.utils.html import escape
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from datetime import date, timedelta
+from django.utils import timezone
+from datetime import date
 from uuid import uuid4
+from .blind_index import BLIND_INDEX_LENGTH, SEARCH_TOKEN_LENGTH, blind_index_column, compute_blind_index
+
+
+class BlindIndexedModel(models.Model):
+    """
+    Keeps `<field>_bidx` shadow columns in sync with encrypted fields listed in
+    BLIND_INDEX_FIELDS ({field_name: normalizer kind}) so they can be filtered in SQL.
+    """
+    BLIND_INDEX_FIELDS = {}
+
+    class Meta:
+        abstract = True
+
+    def update_blind_indexes(self):
+        for field_name, kind in self.BLIND_INDEX_FIELDS.items():
+            setattr(self, blind_index_column(field_name), compute_blind_index(getattr(self, field_name), kind))
+
+    def save(self, *args, **kwargs):
+        self.update_blind_indexes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            update_fields |= {blind_index_column(f) for f in self.BLIND_INDEX_FIELDS if f in update_fields}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+
+def blind_index_field():
+    return models.CharField(max_length=BLIND_INDEX_LENGTH, blank=True, default='', editable=False, db_index=True)
+
+
+class SearchToken(models.Model):
+    """
+    Trigram blind index for substring search on encrypted fields.
+    One row per (object, field, keyed n-gram digest); see core.search_index.
+    """
+    model_name = models.CharField(max_length=50, verbose_name="Veri Türü")
+    object_id = models.PositiveBigIntegerField(verbose_name="Kayıt ID")
+    field = models.CharField(max_length=50, verbose_name="Alan")
+    token = models.CharField(max_length=SEARCH_TOKEN_LENGTH, verbose_name="Belirteç")
+
+    class Meta:
+        verbose_name = "Arama Belirteci"
+        verbose_name_plural = "Arama Belirteçleri"
+        indexes = [
+            models.Index(fields=['model_name', 'token'], name='core_searchtoken_lookup_idx'),
+            models.Index(fields=['model_name', 'object_id'], name='core_searchtoken_object_idx'),
+        ]
+
+
+class RowFingerprint(models.Model):
+    """
+    Keyed hash of a record's normalized business key (the model's
+    FINGERPRINT_FIELDS) for duplicate detection on imports; see core.fingerprints.
+    """
+    model_name = models.CharField(max_length=50, verbose_name="Veri Türü")
+    object_id = models.PositiveBigIntegerField(verbose_name="Kayıt ID")
+    fingerprint = models.CharField(max_length=BLIND_INDEX_LENGTH, verbose_name="Parmak İzi")
+
+    class Meta:
+        verbose_name = "Kayıt Parmak İzi"
+        verbose_name_plural = "Kayıt Parmak İzleri"
+        constraints = [
+            models.UniqueConstraint(fields=['model_name', 'object_id'], name='core_rowfingerprint_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['model_name', 'fingerprint'], name='core_rowfingerprint_lookup_idx'),
+        ]
+
 
 class ActionLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name="Kullanıcı")
@@ -32,7 +102,7 @@ class Profession(models.Model):
         verbose_name_plural = "Meslekler"
 
 
-class Workplace(models.Model):
+class Workplace(BlindIndexedModel):
     HAZARD_CHOICES = [
         ('LOW', 'Az Tehlikeli'),
         ('MEDIUM', 'Tehlikeli'),
@@ -48,6 +118,15 @@ class Workplace(models.Model):
     employer_representative = EncryptedCharField(max_length=255, verbose_name="İşveren Vekili", default="")
     phone_number = EncryptedCharField(max_length=20, null=True, blank=True, verbose_name="İletişim Numarası")
 
+    # Blind indexes (HMAC of normalized plaintext) for SQL lookups on encrypted fields
+    BLIND_INDEX_FIELDS = {'name': 'text', 'detsis_number': 'identifier'}
+    # Fields tokenized into SearchToken for substring search
+    SEARCH_TOKEN_FIELDS = ('name', 'detsis_number', 'nace_code')
+    # Business key for import duplicate detection (RowFingerprint)
+    FINGERPRINT_FIELDS = ('detsis_number',)
+    name_bidx = blind_index_field()
+    detsis_number_bidx = blind_index_field()
+
     def __str__(self):
         return f"{self.name} ({self.detsis_number})"
 
@@ -64,81 +143,31 @@ class Workplace(models.Model):
 
     def get_validity_years(self, type_):
         # type_: 'education' or 'examination'
-        if type_ == 'education':
-            # HIGH=1, MEDIUM=2, LOW=3
-            if self.hazard_class == 'HIGH': return 1
-            elif self.hazard_class == 'MEDIUM': return 2
-            else: return 3
-        elif type_ == 'examination':
-            # HIGH=1, MEDIUM=3, LOW=5
-            if self.hazard_class == 'HIGH': return 1
-            elif self.hazard_class == 'MEDIUM': return 3
-            else: return 5
-        return 0
+        from .compliance import get_validity_years
+        return get_validity_years(self.hazard_class, type_)
 
     @property
-    def valid_education_count_display(self):
-        # We need to count workers who have at least one education where date >= today - validity
-        # This is expensive if not prefetched. We assume prefetch is done in view.
-        today = date.today()
-        years = self.get_validity_years('education')
-        limit_date = today - timedelta(days=365*years)
+    def compliance_summary(self):
+        """Education/examination/first aid counters for all workers (computed once per instance)"""
+        if not hasattr(self, '_compliance_summary'):
+            from .compliance import summarize_snapshot
+            self._compliance_summary = summarize_snapshot(self.workers.all())
+        return self._compliance_summary
 
-        # Check if prefetch cache exists for workers
-        if hasattr(self, '_prefetched_objects_cache') and 'workers' in self._prefetched_objects_cache:
-            workers = self.workers.all()
-        else:
-            # Avoid N+1 if not prefetched by fetching IDs only? No, just iterate.
-            workers = self.workers.prefetch_related('education_set').all()
-
-        count = 0
-        for w in workers:
-            # Check education_set
-            # If prefetched, use all()
-            edus = w.education_set.all()
-            # We need ANY education after limit_date?
-            # Or the LATEST one must be after limit_date?
-            # Usually compliance means "is currently valid", so if you had one 5 years ago and one 1 month ago, you are valid.
-            # So ANY education >= limit_date.
-            if any(e.date >= limit_date for e in edus):
-                count += 1
-
-        return f"{count}/{len(workers)}"
+    @property
+    def valid_education_count_display(self):
+        summary = self.compliance_summary
+        return f"{summary['valid_education']}/{summary['total_workers']}"
 
     @property
     def valid_examination_count_display(self):
-        today = date.today()
-        years = self.get_validity_years('examination')
-        limit_date = today - timedelta(days=365*years)
-
-        if hasattr(self, '_prefetched_objects_cache') and 'workers' in self._prefetched_objects_cache:
-            workers = self.workers.all()
-        else:
-            workers = self.workers.prefetch_related('examination_set').all()
-
-        count = 0
-        for w in workers:
-            exams = w.examination_set.all()
-            if any(e.date >= limit_date for e in exams):
-                count += 1
-
-        return f"{count}/{len(workers)}"
+        summary = self.compliance_summary
+        return f"{summary['valid_examination']}/{summary['total_workers']}"
 
     @property
     def valid_first_aid_count_display(self):
-        today = date.today()
-        # Use prefetched workers if available
-        if hasattr(self, '_prefetched_objects_cache') and 'workers' in self._prefetched_objects_cache:
-            workers = self.workers.all()
-        else:
-            workers = self.workers.all()
-
-        count = 0
-        for w in workers:
-            if w.first_aid_certificate and w.first_aid_expiry_date and w.first_aid_expiry_date >= today:
-                count += 1
-
-        return f"{count}/{len(workers)} 🏥"
+        summary = self.compliance_summary
+        return f"{summary['first_aid_count']}/{summary['total_workers']} 🏥"
 
     @property
     def contact_html(self):
@@ -166,6 +195,9 @@ class Facility(models.Model):
     coordinates = EncryptedCharField(max_length=100, null=True, blank=True, verbose_name="Koordinatlar", help_text="Örn: 39.6425, 27.9152")
     uuid = models.UUIDField(default=uuid4, unique=True, editable=False, verbose_name="Benzersiz Kimlik")
 
+    SEARCH_TOKEN_FIELDS = ('name',)
+    FINGERPRINT_FIELDS = ('workplace', 'name')
+
     def __str__(self):
         return f"{self.name} ({self.workplace.name})"
 
@@ -290,7 +322,7 @@ class SafetyPoll(models.Model):
         ordering = ['-created_at']
 
 
-class Worker(models.Model):
+class Worker(BlindIndexedModel):
     GENDER_CHOICES = [
         ('F', 'Kadın'),
         ('M', 'Erkek'),
@@ -314,6 +346,12 @@ class Worker(models.Model):
     # I will encrypt `first_aid_expiry_date` as well to be safe, using EncryptedDateField.
     first_aid_expiry_date = EncryptedDateField(null=True, blank=True, verbose_name="Sertifika Bitiş Tarihi")
 
+    BLIND_INDEX_FIELDS = {'name': 'text', 'tckn': 'identifier'}
+    SEARCH_TOKEN_FIELDS = ('name', 'tckn')
+    FINGERPRINT_FIELDS = ('tckn', 'workplace')
+    name_bidx = blind_index_field()
+    tckn_bidx = blind_index_field()
+
     def clean(self):
         if self.facility and self.facility.workplace != self.workplace:
             raise ValidationError({'facility': "Seçilen birim, seçilen işyerine ait değil."})
@@ -331,33 +369,19 @@ class Worker(models.Model):
 
     def _get_badge_html(self, type_):
         # type_: 'education' or 'examination'
-        if not self.workplace:
+        if not self.workplace_id:
             return mark_safe('<span class="badge bg-secondary">İşyeri Yok</span>')
 
-        today = date.today()
-        if type_ == 'education':
-            years = self.workplace.get_validity_years('education')
-            # Education is M2M. Get latest.
-            items = self.education_set.all()
-        else:
-            years = self.workplace.get_validity_years('examination')
-            # Examination is FK (reverse). Get latest.
-            items = self.examination_set.all()
+        # Lists attach compliance in one batch (compliance.attach_compliance); load it alone otherwise
+        if getattr(self, 'compliance', None) is None:
+            from .compliance import attach_compliance
+            attach_compliance([self])
 
-        if not items:
+        expiry_date = self.compliance.expiry(type_) if self.compliance else None
+        if expiry_date is None:
             return mark_safe('<span class="badge bg-danger">Yok</span>')
 
-        # Filter out items with None dates to prevent crashes
-        valid_items = [item for item in items if item.date is not None]
-        
-        if not valid_items:
-            return mark_safe('<span class="badge bg-danger">Yok</span>')
-
-        # Find latest date
-        latest_item = max(valid_items, key=lambda x: x.date)
-        expiry_date = latest_item.date + timedelta(days=365*years)
-
-        if expiry_date >= today:
+        if expiry_date >= date.today():
             return mark_safe(f'<span class="badge bg-success">{expiry_date.strftime("%d.%m.%Y")}</span>')
         else:
             return mark_safe(f'<span class="badge bg-warning text-dark">Gecikmiş ({expiry_date.strftime("%d.%m.%Y")})</span>')
@@ -371,7 +395,7 @@ class Worker(models.Model):
         return self._get_badge_html('examination')
 
 
-class Professional(models.Model):
+class Professional(BlindIndexedModel):
     ROLE_CHOICES = [
         ('DOCTOR', 'İşyeri Hekimi'),
         ('SPECIALIST', 'İş Güvenliği Uzmanı'),
@@ -386,6 +410,13 @@ class Professional(models.Model):
     license_id = EncryptedCharField(max_length=6, verbose_name="Lisans No")
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, verbose_name="Görevi")
 
+    BLIND_INDEX_FIELDS = {'name': 'text', 'tckn': 'identifier', 'license_id': 'identifier'}
+    SEARCH_TOKEN_FIELDS = ('name',)
+    FINGERPRINT_FIELDS = ('tckn',)
+    name_bidx = blind_index_field()
+    tckn_bidx = blind_index_field()
+    license_id_bidx = blind_index_field()
+
     def __str__(self):
         return f"{self.name} - {self.get_role_display()}"
 
@@ -544,6 +575,8 @@ class Examination(models.Model):
     audiometry = EncryptedBooleanField(default=False, verbose_name="Odyometri")
     radiology = EncryptedBooleanField(default=False, verbose_name="Radyoloji")
 
+    FINGERPRINT_FIELDS = ('worker', 'date')
+
     def __str__(self):
         return f"{self.worker.name} - {self.date}"
 
@@ -566,6 +599,35 @@ class Examination(models.Model):
         verbose_name = "Sağlık Muayenesi"
         verbose_name_plural = "Sağlık Muayeneleri"
 
+class WorkerComplianceStatus(models.Model):
+    """
+    Materialized compliance snapshot per worker (see compliance.refresh_compliance_status).
+    Kept current by signals; 'refresh_compliance_status' re-evaluates statuses nightly.
+    """
+    STATUS_CHOICES = [
+        ('VALID', 'Geçerli'),
+        ('EXPIRED', 'Süresi Dolmuş'),
+        ('MISSING', 'Yok'),
+    ]
+    worker = models.OneToOneField(Worker, on_delete=models.CASCADE, primary_key=True, related_name='compliance_status', verbose_name="Çalışan")
+    hazard_class = models.CharField(max_length=10, choices=Workplace.HAZARD_CHOICES, verbose_name="Tehlike Sınıfı")
+    latest_education_date = models.DateField(null=True, blank=True, verbose_name="Son Eğitim Tarihi")
+    latest_exam_date = models.DateField(null=True, blank=True, verbose_name="Son Muayene Tarihi")
+    education_expiry = models.DateField(null=True, blank=True, db_index=True, verbose_name="Eğitim Geçerlilik Bitişi")
+    exam_expiry = models.DateField(null=True, blank=True, db_index=True, verbose_name="Muayene Geçerlilik Bitişi")
+    first_aid_expiry = models.DateField(null=True, blank=True, db_index=True, verbose_name="İlkyardım Sertifikası Bitişi")
+    education_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='MISSING', db_index=True, verbose_name="Eğitim Durumu")
+    exam_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='MISSING', db_index=True, verbose_name="Muayene Durumu")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme")
+
+    def __str__(self):
+        return f"{self.worker_id} - {self.education_status}/{self.exam_status}"
+
+    class Meta:
+        verbose_name = "Çalışan Uygunluk Durumu"
+        verbose_name_plural = "Çalışan Uygunluk Durumları"
+
+
 DEFAULT_INSTITUTE = "T.C. Sağlık Bakanlığı\\nBalıkesir İl Sağlık Müdürlüğü\\nKaresi Çalışan Sağlığı Merkezi"
 DEFAULT_TOPICS = """Çalışma mevzuatı ile ilgili bilgiler
 Çalışanların yasal hak ve sorumlulukları
@@ -590,6 +652,62 @@ Tahliye kurtarma
 Yüksekte çalışma
 Kapalı ortamda çalışma"""
 
+class BackgroundJob(models.Model):
+    """Long-running export/report/import/validation work executed by `manage.py run_jobs` (see jobs.py)"""
+    KIND_CHOICES = [
+        ('EXPORT', 'Dışa Aktarma'),
+        ('REPORT', 'Rapor'),
+        ('IMPORT', 'İçe Aktarma'),
+        ('VALIDATE', 'İçe Aktarma Doğrulaması'),
+    ]
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCEEDED = 'SUCCEEDED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_EXPIRED = 'EXPIRED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Bekliyor'),
+        (STATUS_RUNNING, 'Çalışıyor'),
+        (STATUS_SUCCEEDED, 'Tamamlandı'),
+        (STATUS_FAILED, 'Başarısız'),
+        (STATUS_EXPIRED, 'Süresi Doldu'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Tür")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs', verbose_name="Kullanıcı")
+    params = models.JSONField(default=dict, verbose_name="Parametreler")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Durum")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="İlerleme (%)")
+    progress_message = models.CharField(max_length=255, blank=True, default='', verbose_name="İlerleme Mesajı")
+    result = models.JSONField(default=dict, blank=True, verbose_name="Sonuç")
+    error = models.TextField(blank=True, default='', verbose_name="Hata")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Deneme Sayısı")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="En Fazla Deneme")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Çalışma Zamanı")
+    locked_by = models.CharField(max_length=100, blank=True, default='', verbose_name="Çalıştıran")
+    artifact = models.CharField(max_length=255, blank=True, default='', verbose_name="Dosya")  # name in the artifact storage
+    artifact_name = models.CharField(max_length=255, blank=True, default='', verbose_name="Dosya Adı")  # download filename
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Başlangıç")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş")
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Dosya Son Geçerlilik")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED, self.STATUS_EXPIRED)
+
+    class Meta:
+        verbose_name = "Arka Plan İşi"
+        verbose_name_plural = "Arka Plan İşleri"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='backgroundjob_queue_idx'),
+        ]
+
+
 class CertificateTemplate(models.Model):
     name = models.CharField(max_length=255, default="Global", verbose_name="Şablon Adı")
     institute_name = models.TextField(default=DEFAULT_INSTITUTE, verbose_name="Kurum Başlığı (Satır boşlukları için Enter kullanın)")
@@ -608,6 +726,21 @@ class CertificateTemplate(models.Model):
 # Risk Assessment Module (OiRA-style)
 # =============================================================================
 
+def exclude_counter_fields(instance, save_kwargs, keep=()):
+    """
+    Counters are kept up to date in the database with F() updates, so an
+    existing row's save() must not write back the (possibly stale) values
+    held in memory: update every other field instead.
+    """
+    if instance._state.adding or save_kwargs.get('update_fields') is not None:
+        return
+    skipped = (set(instance.COUNTER_FIELDS) - set(keep)) | instance.get_deferred_fields()
+    save_kwargs['update_fields'] = [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in skipped and field.attname not in skipped
+    ]
+
+
 class RiskTool(models.Model):
     """Master template for risk assessments (e.g., 'Ofisler', 'Depolar')"""
     title = models.CharField(max_length=255, verbose_name="Araç Adı")
@@ -615,6 +748,12 @@ class RiskTool(models.Model):
     sector = models.CharField(max_length=100, blank=True, verbose_name="Sektör")
     is_active = models.BooleanField(default=True, verbose_name="Aktif")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Total questions across all categories and topics (maintained by assessment_progress.py)
+    question_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Soru Sayısı")
+    # Moved forward on every category/topic/question change; keys the cached question tree (question_tree.py)
+    tree_version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Soru Ağacı Sürümü")
+
+    COUNTER_FIELDS = ('question_count', 'tree_version')
 
     def __str__(self):
         return self.title
@@ -624,10 +763,9 @@ class RiskTool(models.Model):
         verbose_name_plural = "Risk Değerlendirme Araçları"
         ordering = ['title']
 
-    @property
-    def question_count(self):
-        """Total questions across all categories and topics"""
-        return RiskQuestion.objects.filter(topic__category__tool=self).count()
+    def save(self, *args, **kwargs):
+        exclude_counter_fields(self, kwargs)
+        super().save(*args, **kwargs)
 
 
 class RiskCategory(models.Model):
@@ -678,6 +816,81 @@ class RiskQuestion(models.Model):
         ordering = ['topic', 'order_index']
 
 
+class RiskLibraryEntry(models.Model):
+    """
+    One hazard/risk of the risk library (fast-run mode). Loaded from the JSON
+    files by `manage.py import_risk_library`; searched through a full-text
+    index created by migration (FTS5 on SQLite, tsvector + GIN on Postgres).
+    """
+    # Library JSON keys of the columns; any other keys are kept in `extra`
+    LIBRARY_KEYS = {
+        'category': 'Kategori',
+        'parent_group': 'Üst Grup Adı',
+        'group_name': 'Grup Adı',
+        'topic': 'Konu',
+        'hazard_source': 'Tehlike Kaynağı',
+        'activity': 'Faaliyet',
+        'hazard': 'Tehlike',
+        'risk': 'Risk',
+        'legislation': 'İlgili Mevzuat',
+        'affected_persons': 'Etkilenecek Kişiler',
+        'measures': 'Alınması Gereken Önlemler',
+        'tags': 'Etiketler',
+    }
+
+    library_id = models.IntegerField(unique=True, verbose_name="Kütüphane ID")  # AssessmentCustomRisk.source_library_id
+    source_file = models.CharField(max_length=255, db_index=True, verbose_name="Kaynak Dosya")
+    category = models.CharField(max_length=255, blank=True, verbose_name="Kategori")
+    parent_group = models.CharField(max_length=255, blank=True, verbose_name="Üst Grup Adı")
+    group_name = models.CharField(max_length=255, blank=True, db_index=True, verbose_name="Grup Adı")
+    topic = models.TextField(blank=True, verbose_name="Konu")
+    hazard_source = models.TextField(blank=True, verbose_name="Tehlike Kaynağı")
+    activity = models.TextField(blank=True, verbose_name="Faaliyet")
+    hazard = models.TextField(blank=True, verbose_name="Tehlike")
+    risk = models.TextField(blank=True, verbose_name="Risk")
+    legislation = models.TextField(blank=True, verbose_name="İlgili Mevzuat")
+    affected_persons = models.TextField(blank=True, verbose_name="Etkilenecek Kişiler")
+    measures = models.TextField(blank=True, verbose_name="Alınması Gereken Önlemler")
+    tags = models.TextField(blank=True, verbose_name="Etiketler")
+    extra = models.JSONField(default=dict, blank=True, verbose_name="Diğer Alanlar")
+    # Turkish-normalized text the full-text index is built from (weighted title / body)
+    search_title = models.TextField(blank=True, editable=False)
+    search_body = models.TextField(blank=True, editable=False)
+
+    def __str__(self):
+        return f"{self.group_name}: {self.hazard}"
+
+    class Meta:
+        verbose_name = "Risk Kütüphanesi Kaydı"
+        verbose_name_plural = "Risk Kütüphanesi Kayıtları"
+        ordering = ['pk']
+
+    def update_search_text(self):
+        from .blind_index import normalize_text
+        self.search_title = normalize_text(f"{self.hazard} {self.risk}")
+        self.search_body = normalize_text(f"{self.tags} {self.group_name} {self.topic}")
+
+    def save(self, *args, **kwargs):
+        self.update_search_text()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_library_dict(cls, item, source_file):
+        values = {field: str(item.get(key) or '').strip() for field, key in cls.LIBRARY_KEYS.items()}
+        extra = {key: value for key, value in item.items() if key not in cls.LIBRARY_KEYS.values() and key not in ('id', 'source_file')}
+        entry = cls(library_id=item['id'], source_file=source_file, extra=extra, **values)
+        entry.update_search_text()
+        return entry
+
+    def as_library_dict(self):
+        """The entry in the JSON file's shape (as returned by risk_library)"""
+        item = dict(self.extra)
+        item.update({key: getattr(self, field) for field, key in self.LIBRARY_KEYS.items()})
+        item['id'] = self.library_id
+        item['source_file'] = self.source_file
+        return item
+
+
 class AssessmentSession(models.Model):
     """A user's assessment instance for a specific facility"""
     STATUS_CHOICES = [
@@ -703,10 +916,36 @@ class AssessmentSession(models.Model):
     participants = models.TextField(blank=True, null=True, verbose_name="Katılımcılar")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+    # Progress counters (maintained by assessment_progress.py): questions of the tool, answered questions
+    total_questions = models.PositiveIntegerField(default=0, editable=False, verbose_name="Soru Sayısı")
+    answered_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Yanıtlanan Soru Sayısı")
+
+    COUNTER_FIELDS = ('total_questions', 'answered_count')
+
+    _loaded_tool_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_tool_id = instance.__dict__.get('tool_id')
+        return instance
 
     def __str__(self):
         return f"{self.title} - {self.facility.name}"
 
+    def save(self, *args, **kwargs):
+        tool_changed = self._state.adding or (
+            'tool_id' in self.__dict__ and self.tool_id != self._loaded_tool_id
+        )
+        if tool_changed:
+            self.total_questions = (
+                RiskTool.objects.filter(pk=self.tool_id).values_list('question_count', flat=True).first() or 0
+                if self.tool_id else 0
+            )
+        exclude_counter_fields(self, kwargs, keep=('total_questions',) if tool_changed else ())
+        super().save(*args, **kwargs)
+        self._loaded_tool_id = self.tool_id
+
     class Meta:
         verbose_name = "Değerlendirme Oturumu"
         verbose_name_plural = "Değerlendirme Oturumları"
@@ -714,14 +953,10 @@ class AssessmentSession(models.Model):
 
     @property
     def progress_percentage(self):
-        """Calculate completion percentage based on answered questions"""
-        if not self.tool:
+        """Completion percentage from the stored counters (no queries)"""
+        if not self.tool_id or self.total_questions == 0:
             return 0
-        total_questions = RiskQuestion.objects.filter(topic__category__tool=self.tool).count()
-        if total_questions == 0:
-            return 0
-        answered = self.answers.exclude(response__isnull=True).exclude(response='').count()
-        return round((answered / total_questions) * 100)
+        return round((self.answered_count / self.total_questions) * 100)
 
 
 class RiskAssessmentTeamMember(models.Model):
@@ -768,6 +1003,19 @@ class AssessmentAnswer(models.Model):
     notes = models.TextField(blank=True, verbose_name="Notlar")
     risk_priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, null=True, blank=True, verbose_name="Risk Önceliği")
 
+    # Answered state as stored, for AssessmentSession.answered_count (see assessment_progress.py)
+    _loaded_answered = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_answered = bool(instance.__dict__.get('response'))
+        return instance
+
+    @property
+    def is_answered(self):
+        return bool(self.response)
+
     def __str__(self):
         return f"{self.session.title} - Q{self.question.id}: {self.response or 'Yanıtsız'}"
 
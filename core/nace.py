@@ -0,0 +1,147 @@
+"""
+NACE Code Index
+
+The NACE code list (nace-codes.json: code, description, legal danger class)
+is read once per process into:
+  - a prefix trie over the code digits, so '01', '01.1' and '0111' all list
+    the codes below them,
+  - a Turkish-normalized word index over the descriptions (the risk library's
+    RiskSearchIndex), matching every query word as a word prefix, ranked,
+  - a code -> entry dict for danger class lookups (e.g. during imports).
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from django.conf import settings
+from .blind_index import normalize_text
+from .risk_search import RiskSearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Codes in the file may carry amendment notes: '23.32.02 (Ek:RG-18/3/2022-31782)'
+_CODE_RE = re.compile(r'\d{2}\.\d{2}\.\d{2}')
+_CODE_QUERY_RE = re.compile(r'[\d.\s]+')
+
+
+def get_nace_path():
+    return os.path.join(settings.BASE_DIR, 'nace-codes.json')
+
+
+def code_key(code):
+    """Digits of a NACE code ('01.11.12' -> '011112'), the key of lookups"""
+    return re.sub(r'\D', '', code or '')
+
+
+def danger_class_to_hazard_class(danger_class):
+    """Workplace.hazard_class value of a danger class label ('Çok Tehlikeli *' -> 'HIGH'), or None"""
+    from .models import Workplace
+    label = normalize_text(danger_class).rstrip(' *')
+    for key, choice_label in Workplace.HAZARD_CHOICES:
+        if normalize_text(choice_label) == label:
+            return key
+    return None
+
+
+class NaceIndex:
+    # (token, mtime) of the file the index was loaded from
+    version = ('', None)
+
+    def __init__(self, items):
+        self.entries = []
+        for item in items:
+            raw_code = item.get('nace_code') or ''
+            match = _CODE_RE.search(raw_code)
+            danger_class = (item.get('danger_class') or '').strip()
+            self.entries.append({
+                'nace_code': match.group() if match else raw_code.strip(),
+                'description': (item.get('description') or '').strip(),
+                'danger_class': danger_class,
+                'hazard_class': danger_class_to_hazard_class(danger_class),
+            })
+        self.entries.sort(key=lambda entry: entry['nace_code'])
+
+        # Trie node: {'children': {digit: node}, 'docs': [entries below the node, in code order]}
+        self.trie = {'children': {}, 'docs': []}
+        self.by_code = {}
+        for doc, entry in enumerate(self.entries):
+            key = code_key(entry['nace_code'])
+            self.by_code.setdefault(key, entry)
+            node = self.trie
+            for digit in key:
+                node = node['children'].setdefault(digit, {'children': {}, 'docs': []})
+                node['docs'].append(doc)
+
+        self.text_index = RiskSearchIndex(self.entries, fields={'description': 1})
+
+    def get(self, code):
+        """Entry of a NACE code in any notation ('01.11.12', '011112'), or None"""
+        return self.by_code.get(code_key(code))
+
+    def _code_prefix_docs(self, digits):
+        node = self.trie
+        for digit in digits:
+            node = node['children'].get(digit)
+            if node is None:
+                return []
+        return node['docs']
+
+    def search(self, query, limit=10):
+        """
+        Code queries ('01.1') list the codes starting with the digits; text
+        queries match descriptions, best first (whole words outrank prefixes,
+        then shorter descriptions). Returns (entries, total matches).
+        """
+        query = (query or '').strip()
+        if not query:
+            return [], 0
+        if _CODE_QUERY_RE.fullmatch(query):
+            docs = self._code_prefix_docs(code_key(query))
+        else:
+            scores = self.text_index.match(query) or {}
+            docs = sorted(scores, key=lambda doc: (-scores[doc], len(self.entries[doc]['description']), doc))
+        return [self.entries[doc] for doc in docs[:limit]], len(docs)
+
+
+@lru_cache(maxsize=None)
+def _load_index(path):
+    try:
+        stat = os.stat(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error("Error reading %s: %s", path, e)
+        return NaceIndex([])
+    index = NaceIndex(items if isinstance(items, list) else [])
+    index.version = (f'{stat.st_mtime_ns}:{stat.st_size}', stat.st_mtime)
+    return index
+
+
+def get_nace_index():
+    """The process-wide index (the file ships with the code: read once, not re-checked)"""
+    return _load_index(get_nace_path())
+
+
+def get_nace_version():
+    """(token, last modified or None) of the loaded code list, for HTTP caching"""
+    token, mtime = get_nace_index().version
+    return token, datetime.fromtimestamp(mtime, tz=timezone.utc) if mtime else None
+
+
+def search_nace(query, limit=10):
+    return get_nace_index().search(query, limit=limit)
+
+
+def get_danger_class(code):
+    """Legal danger class label of a NACE code ('Çok Tehlikeli'), or None"""
+    entry = get_nace_index().get(code)
+    return entry['danger_class'] if entry else None
+
+
+def get_hazard_class(code):
+    """Workplace.hazard_class value (LOW / MEDIUM / HIGH) of a NACE code, or None"""
+    entry = get_nace_index().get(code)
+    return entry['hazard_class'] if entry else None
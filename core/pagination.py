@@ -0,0 +1,242 @@
+"""
+List Pagination
+
+Keyset (cursor) pagination for list pages, so a page request only fetches,
+decrypts and renders the visible rows:
+  - querysets sorted by a plaintext, non-null column (or by pk): keyset on
+    (sort value, pk), no OFFSET scan and stable under inserts,
+  - querysets sorted by an encrypted column: only (pk, sort column) is decrypted
+    to establish the order, then the page's rows are fetched by pk,
+  - lists (rows already filtered in Python): a bounded offset window.
+"""
+
+import base64
+import json
+from decimal import Decimal
+from encrypted_model_fields.fields import EncryptedCharField, EncryptedTextField, EncryptedDateField, EncryptedBooleanField
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+PAGE_SIZE_CHOICES = (25, 50, 100, 200)
+
+ENCRYPTED_FIELD_TYPES = (EncryptedCharField, EncryptedTextField, EncryptedDateField, EncryptedBooleanField)
+
+
+def get_page_size(params):
+    try:
+        size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return size if size in PAGE_SIZE_CHOICES else DEFAULT_PAGE_SIZE
+
+
+def _get_page_number(params):
+    try:
+        return max(1, int(params.get('page', 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _json_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(sort, value, pk, direction):
+    payload = json.dumps({'s': sort or '', 'v': _json_value(value), 'pk': pk, 'd': direction})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Returns the cursor dict or None for missing/garbled tokens"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get('d') not in ('next', 'prev') or 'pk' not in data:
+        return None
+    return data
+
+
+class ListPage:
+    """One page of a list: object_list plus the query strings of the neighbouring pages"""
+
+    def __init__(self, object_list, params, page_size, mode):
+        self.object_list = object_list
+        self.params = params
+        self.page_size = page_size
+        self.mode = mode  # 'keyset' or 'offset'
+        self.number = None
+        self.has_next = False
+        self.has_previous = False
+        self.next_query = ''
+        self.previous_query = ''
+
+    def _query(self, **updates):
+        query = self.params.copy()
+        for key in ('cursor', 'page'):
+            query.pop(key, None)
+        for key, value in updates.items():
+            query[key] = value
+        return query.urlencode()
+
+    def set_cursors(self, next_cursor=None, previous_cursor=None):
+        if next_cursor:
+            self.has_next = True
+            self.next_query = self._query(cursor=next_cursor)
+        if previous_cursor:
+            self.has_previous = True
+            self.previous_query = self._query(cursor=previous_cursor)
+
+    def set_page_number(self, number, has_next):
+        self.number = number
+        self.has_next = has_next
+        self.has_previous = number > 1
+        if has_next:
+            self.next_query = self._query(page=number + 1)
+        if self.has_previous:
+            self.previous_query = self._query(page=number - 1)
+
+
+def _resolve_sort(model, sort_param):
+    """Returns (field, descending) for a sort parameter, or (None, False) if it is not a model field"""
+    if not sort_param:
+        return None, False
+    try:
+        field = model._meta.get_field(sort_param.lstrip('-'))
+    except FieldDoesNotExist:
+        return None, False
+    if not getattr(field, 'concrete', False) or field.many_to_many:
+        return None, False
+    return field, sort_param.startswith('-')
+
+
+def _python_sort_key(value):
+    # None first, then values; mixed types fall back to their string form
+    return (value is not None, value if value is not None else '')
+
+
+def _paginate_list(items, sort_param, params, page_size):
+    # Rows are already materialized (Python-side filtering): sort and cut a window
+    if sort_param:
+        attr = sort_param.lstrip('-')
+        try:
+            items = sorted(items, key=lambda obj: _python_sort_key(getattr(obj, attr)), reverse=sort_param.startswith('-'))
+        except (AttributeError, TypeError):
+            pass
+    number = _get_page_number(params)
+    start = (number - 1) * page_size
+    page = ListPage(items[start:start + page_size], params, page_size, 'offset')
+    page.set_page_number(number, len(items) > start + page_size)
+    return page
+
+
+def _paginate_encrypted_sort(queryset, field, descending, params, page_size):
+    # Ciphertext (and HMAC blind indexes) carry no order: decrypt only the sort
+    # column to order the pks, then fetch one page of rows
+    number = _get_page_number(params)
+    keys = list(queryset.order_by().values_list('pk', field.attname))
+    try:
+        keys.sort(key=lambda row: (_python_sort_key(row[1]), row[0]), reverse=descending)
+    except TypeError:
+        keys.sort(key=lambda row: row[0])
+    start = (number - 1) * page_size
+    page_pks = [pk for pk, _ in keys[start:start + page_size]]
+    rows = queryset.in_bulk(page_pks)
+    page = ListPage([rows[pk] for pk in page_pks if pk in rows], params, page_size, 'offset')
+    page.set_page_number(number, len(keys) > start + page_size)
+    return page
+
+
+def _paginate_offset(queryset, params, page_size):
+    number = _get_page_number(params)
+    start = (number - 1) * page_size
+    rows = list(queryset[start:start + page_size + 1])
+    page = ListPage(rows[:page_size], params, page_size, 'offset')
+    page.set_page_number(number, len(rows) > page_size)
+    return page
+
+
+def _paginate_keyset(queryset, field, descending, sort_param, params, page_size):
+    column = field.attname if field else 'pk'
+    cursor = decode_cursor(params.get('cursor'))
+    if cursor and cursor['s'] != (sort_param or ''):
+        cursor = None  # sort changed since the link was built: restart
+    if cursor and column != 'pk':
+        try:
+            cursor['v'] = field.to_python(cursor['v'])
+        except ValidationError:
+            cursor = None
+
+    backwards = bool(cursor) and cursor['d'] == 'prev'
+    # Walking backwards reads the rows before the cursor in reverse order
+    ascending = descending == backwards
+    ordering = [column, 'pk'] if ascending else [f'-{column}', '-pk']
+    if column == 'pk':
+        ordering = ordering[1:]
+
+    if cursor:
+        op = 'gt' if ascending else 'lt'
+        pk_condition = Q(**{f'pk__{op}': cursor['pk']})
+        if column == 'pk':
+            queryset = queryset.filter(pk_condition)
+        else:
+            value = cursor['v']
+            queryset = queryset.filter(Q(**{f'{column}__{op}': value}) | (Q(**{column: value}) & pk_condition))
+
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    page = ListPage(rows, params, page_size, 'keyset')
+    if rows:
+        def cursor_for(obj, direction):
+            value = getattr(obj, column) if column != 'pk' else None
+            return encode_cursor(sort_param, value, obj.pk, direction)
+
+        more_after = has_more if not backwards else True
+        more_before = has_more if backwards else bool(cursor)
+        page.set_cursors(
+            next_cursor=cursor_for(rows[-1], 'next') if more_after else None,
+            previous_cursor=cursor_for(rows[0], 'prev') if more_before else None,
+        )
+    elif cursor:
+        # Stepped past the end (rows deleted meanwhile): offer a way back to the start
+        page.has_previous = True
+        page.previous_query = page._query()
+    return page
+
+
+def paginate_items(items, sort_param, params, page_size=None):
+    """
+    Sorts and paginates a queryset or list for a list page.
+    params is request.GET; returns a ListPage.
+    """
+    page_size = page_size or get_page_size(params)
+
+    if isinstance(items, list):
+        return _paginate_list(items, sort_param, params, page_size)
+
+    if not sort_param:
+        # Keep the queryset's own ordering (explicit order_by or Meta.ordering) as the default sort
+        ordering = items.query.order_by or items.model._meta.ordering
+        sort_param = ordering[0] if ordering and isinstance(ordering[0], str) else ''
+
+    field, descending = _resolve_sort(items.model, sort_param)
+    if field is None:
+        return _paginate_keyset(items, None, False, '', params, page_size)
+    if isinstance(field, ENCRYPTED_FIELD_TYPES):
+        return _paginate_encrypted_sort(items, field, descending, params, page_size)
+    if field.null:
+        # NULLs break (value, pk) comparisons: fall back to LIMIT/OFFSET
+        return _paginate_offset(items.order_by(sort_param, 'pk'), params, page_size)
+    return _paginate_keyset(items, field, descending, sort_param, params, page_size)
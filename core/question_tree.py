@@ -0,0 +1,100 @@
+"""
+Assessment Question Tree
+
+The category -> topic -> question navigation of a RiskTool, compiled once
+and cached (with a question id -> position map) under the tool's
+tree_version, a database counter moved forward by signals whenever a
+category, topic or question changes (see signals.py). Being stored with the
+tool, the version is seen by every worker process, not only by the one that
+handled the change.
+Runner views merge a session's answer statuses into it from a single
+values_list query instead of re-reading the whole tool on every click.
+"""
+
+from django.core.cache import cache
+from django.db.models import F
+from .models import RiskTool, RiskQuestion
+
+QUESTION_TREE_CACHE_TIMEOUT = 3600
+NAV_CONTENT_LENGTH = 60
+
+ANSWER_STATUSES = {'YES': 'yes', 'NO': 'no', 'NA': 'na', 'POSTPONED': 'postponed'}
+
+
+def bump_question_tree_version(tool_id):
+    """Invalidates the cached question tree of a tool"""
+    if tool_id:
+        RiskTool.objects.filter(pk=tool_id).update(tree_version=F('tree_version') + 1)
+
+
+def _build_tree(tool_id):
+    rows = RiskQuestion.objects.filter(topic__category__tool_id=tool_id).order_by(
+        'topic__category__order_index',
+        'topic__order_index',
+        'order_index',
+    ).values_list('id', 'content', 'topic_id', 'topic__title', 'topic__category_id', 'topic__category__title')
+
+    categories = []
+    question_ids = []
+    current_category = None
+    current_topic = None
+    for idx, (question_id, content, topic_id, topic_title, category_id, category_title) in enumerate(rows):
+        if current_category is None or current_category['id'] != category_id:
+            current_category = {'id': category_id, 'title': category_title, 'topics': []}
+            categories.append(current_category)
+            current_topic = None
+        if current_topic is None or current_topic['id'] != topic_id:
+            current_topic = {'id': topic_id, 'title': topic_title, 'questions': []}
+            current_category['topics'].append(current_topic)
+        current_topic['questions'].append({
+            'id': question_id,
+            'index': idx,
+            'content': content[:NAV_CONTENT_LENGTH] + '...' if len(content) > NAV_CONTENT_LENGTH else content,
+        })
+        question_ids.append(question_id)
+
+    return {
+        'categories': categories,
+        'question_ids': question_ids,
+        'index_of': {question_id: idx for idx, question_id in enumerate(question_ids)},
+    }
+
+
+def get_question_tree(tool, rebuild=False):
+    """
+    {'categories': [{'id', 'title', 'topics': [{'id', 'title', 'questions':
+    [{'id', 'index', 'content'}]}]}], 'question_ids': [...], 'index_of': {id: index}}
+    (shared: do not modify). Empty for sessions without a tool. rebuild:
+    ignore the cached tree (e.g. it names a question that no longer exists).
+    """
+    if tool is None:
+        return {'categories': [], 'question_ids': [], 'index_of': {}}
+    key = f"question_tree:{tool.pk}:{tool.tree_version}"
+    tree = None if rebuild else cache.get(key)
+    if tree is None:
+        tree = _build_tree(tool.pk)
+        cache.set(key, tree, QUESTION_TREE_CACHE_TIMEOUT)
+    return tree
+
+
+def get_answer_statuses(session):
+    """{question_id: status} of the session's answered questions (one query)"""
+    return {
+        question_id: ANSWER_STATUSES.get(response, 'postponed')
+        for question_id, response in session.answers.exclude(response__isnull=True).exclude(response='')
+        .values_list('question_id', 'response')
+    }
+
+
+def get_navigation(tree, statuses):
+    """The tree's categories with each question's status ('unanswered' when not in statuses)"""
+    return [
+        {**category, 'topics': [
+            {**topic, 'questions': [
+                {**question, 'status': statuses.get(question['id'], 'unanswered')}
+                for question in topic['questions']
+            ]}
+            for topic in category['topics']
+        ]}
+        for category in tree['categories']
+    ]
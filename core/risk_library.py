@@ -2,107 +2,218 @@
 Risk Library Utility Module
 
 Reads and combines all JSON risk files from the external data directory.
+
+The combined library is parsed once per process and kept in memory together
+with an id -> risk dict and the category list; it is re-read only when a
+file is added, removed or modified (checked by mtime/size on each call).
+Risk IDs are derived from each entry's content, so every worker process
+assigns the same ID to the same risk regardless of directory order.
+Searches run on an inverted index (risk_search.py) built with the cache.
+
+When the library has been loaded into the database (`manage.py
+import_risk_library`, which also takes additional files an organization
+wants to add), lookups, categories and searches are served from the
+RiskLibraryEntry table and its full-text index instead of the files.
+Whether it has been is checked once a minute per process (and whenever the
+files change), not on every call.
 """
 
-import os
+import hashlib
 import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
 from django.conf import settings
+from django.db.models import Count, Max
+from .risk_search import RiskSearchIndex, search_entries
+
+logger = logging.getLogger(__name__)
+
+# IDs are stored in AssessmentCustomRisk.source_library_id (a 32-bit IntegerField)
+RISK_ID_MASK = 0x7FFFFFFF
+
+_cache = {'signature': None, 'risks': [], 'by_id': {}, 'categories': [], 'index': RiskSearchIndex([])}
+_cache_lock = threading.Lock()
+
+# Whether the library is served from the database, per file signature: {'signature', 'checked_at', 'in_database'}
+LIBRARY_SOURCE_CHECK_INTERVAL = 60  # seconds; import_risk_library may run in another process
+_source = {'signature': None, 'checked_at': 0.0, 'in_database': False}
+
+
+def get_risks_dir():
+    return os.path.join(settings.BASE_DIR, 'static', 'external_data', 'risks')
+
+
+def _get_signature(risks_dir):
+    """Directory plus (filename, mtime, size) of every JSON file: changes whenever the library does"""
+    if not os.path.exists(risks_dir):
+        return (risks_dir,)
+    signature = [risks_dir]
+    for filename in sorted(os.listdir(risks_dir)):
+        if filename.endswith('.json'):
+            stat = os.stat(os.path.join(risks_dir, filename))
+            signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _content_id(filename, item, taken):
+    """Stable positive 31-bit ID from the entry's file and content (probing on the rare collision)"""
+    payload = filename + '\x1f' + json.dumps(item, sort_keys=True, ensure_ascii=False)
+    risk_id = int(hashlib.sha1(payload.encode('utf-8')).hexdigest()[:8], 16) & RISK_ID_MASK or 1
+    while risk_id in taken:
+        risk_id = risk_id % RISK_ID_MASK + 1
+    return risk_id
+
+
+def read_library_file(path, taken):
+    """
+    Entries of one library JSON file with 'id' and 'source_file' added.
+    IDs in the taken set are avoided and the new IDs are added to it.
+    Returns [] for unreadable files.
+    """
+    filename = os.path.basename(path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error("Error reading %s: %s", filename, e)
+        return []
+    if not isinstance(data, list):
+        return []
+    for item in data:
+        item['id'] = _content_id(filename, item, taken)
+        item['source_file'] = filename
+        taken.add(item['id'])
+    return data
+
+
+def _load_library(risks_dir, signature):
+    risks = []
+    by_id = {}
+    taken = set()
+    for filename, _, _ in signature[1:]:
+        for item in read_library_file(os.path.join(risks_dir, filename), taken):
+            by_id[item['id']] = item
+            risks.append(item)
+
+    categories = sorted({risk.get('Grup Adı', '').strip() for risk in risks} - {''})
+    return {
+        'signature': signature,
+        'risks': risks,
+        'by_id': by_id,
+        'categories': categories,
+        'index': RiskSearchIndex(risks),
+    }
+
+
+def _get_cache():
+    global _cache
+    risks_dir = get_risks_dir()
+    signature = _get_signature(risks_dir)
+    if _cache['signature'] != signature:
+        with _cache_lock:
+            if _cache['signature'] != signature:
+                _cache = _load_library(risks_dir, signature)
+    return _cache
+
+
+def reset_library_source():
+    """Makes the next call re-check whether the library is in the database (after an import)"""
+    global _source
+    _source = {'signature': None, 'checked_at': 0.0, 'in_database': False}
+
+
+def _library_entries():
+    """RiskLibraryEntry manager, or None while the library is not loaded into the database"""
+    global _source
+    from .models import RiskLibraryEntry
+    signature = _get_signature(get_risks_dir())
+    now = time.monotonic()
+    source = _source
+    if source['signature'] != signature or now - source['checked_at'] >= LIBRARY_SOURCE_CHECK_INTERVAL:
+        source = {'signature': signature, 'checked_at': now, 'in_database': RiskLibraryEntry.objects.exists()}
+        _source = source
+    return RiskLibraryEntry.objects if source['in_database'] else None
+
+
+def get_library_version():
+    """
+    (token, last modified or None) identifying the current library contents,
+    for HTTP caching: the file signature, or the entry count and latest row
+    of the database table (import_risk_library replaces rows, never edits them).
+    """
+    entries = _library_entries()
+    if entries is None:
+        signature = _get_cache()['signature']
+        token = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()
+        mtimes = [mtime for _, mtime, _ in signature[1:]]
+        last_modified = datetime.fromtimestamp(max(mtimes) / 1e9, tz=timezone.utc) if mtimes else None
+        return token, last_modified
+    stats = entries.aggregate(count=Count('pk'), last=Max('pk'))
+    return f"db:{stats['count']}:{stats['last']}", None
 
 
 def get_risk_library():
     """
     Read all JSON files from static/external_data/risks/ directory
-    and return a combined list of risk objects with unique IDs.
-    
+    and return a combined list of risk objects with unique IDs
+    (always the files: import_risk_library loads them from here).
+
     Returns:
         list: Combined list of risk dictionaries with added 'id' field
+        (shared by all callers: do not modify)
     """
-    risks_dir = os.path.join(settings.BASE_DIR, 'static', 'external_data', 'risks')
-    combined_risks = []
-    risk_id = 0
-    
-    if not os.path.exists(risks_dir):
-        return []
-    
-    for filename in os.listdir(risks_dir):
-        if filename.endswith('.json'):
-            filepath = os.path.join(risks_dir, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        for item in data:
-                            risk_id += 1
-                            item['id'] = risk_id
-                            item['source_file'] = filename
-                            combined_risks.append(item)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error reading {filename}: {e}")
-                continue
-    
-    return combined_risks
+    return _get_cache()['risks']
+
+
+def get_risk(risk_id):
+    """
+    The library risk with the given ID, or None.
+
+    Args:
+        risk_id: ID as returned in the risk dictionaries (int or numeric string)
+    """
+    try:
+        risk_id = int(risk_id)
+    except (TypeError, ValueError):
+        return None
+    entries = _library_entries()
+    if entries is None:
+        return _get_cache()['by_id'].get(risk_id)
+    entry = entries.filter(library_id=risk_id).first()
+    return entry.as_library_dict() if entry else None
 
 
 def get_risk_categories():
     """
     Extract unique category names (Grup Adı) from the risk library.
-    
+
     Returns:
         list: Sorted list of unique category names
     """
-    risks = get_risk_library()
-    categories = set()
-    
-    for risk in risks:
-        group_name = risk.get('Grup Adı', '').strip()
-        if group_name:
-            categories.add(group_name)
-    
-    return sorted(categories)
+    entries = _library_entries()
+    if entries is None:
+        return list(_get_cache()['categories'])
+    return sorted(set(entries.exclude(group_name='').order_by().values_list('group_name', flat=True).distinct()))
 
 
 def search_risks(query='', category='', limit=100, offset=0):
     """
     Search and filter risks from the library.
-    
+
     Args:
-        query: Text search query (searches in Tehlike and Risk fields)
+        query: Text search query (every word must match, as a word or word
+            prefix, in Tehlike, Risk, Konu, Etiketler or Grup Adı)
         category: Filter by Grup Adı
         limit: Maximum number of results
         offset: Starting offset for pagination
-        
+
     Returns:
-        dict: {'results': list, 'total': int, 'has_more': bool}
+        dict: {'results': list, 'total': int, 'has_more': bool, 'facets': dict}
+        with results ranked by relevance and facets counting matches per category
     """
-    all_risks = get_risk_library()
-    filtered = []
-    
-    query_lower = query.lower().strip() if query else ''
-    category_lower = category.lower().strip() if category else ''
-    
-    for risk in all_risks:
-        # Category filter
-        if category_lower:
-            risk_category = risk.get('Grup Adı', '').lower()
-            if category_lower not in risk_category:
-                continue
-        
-        # Text search
-        if query_lower:
-            tehlike = risk.get('Tehlike', '').lower()
-            risk_text = risk.get('Risk', '').lower()
-            konu = risk.get('Konu', '').lower()
-            
-            if query_lower not in tehlike and query_lower not in risk_text and query_lower not in konu:
-                continue
-        
-        filtered.append(risk)
-    
-    total = len(filtered)
-    paginated = filtered[offset:offset + limit]
-    
-    return {
-        'results': paginated,
-        'total': total,
-        'has_more': (offset + limit) < total
-    }
+    if _library_entries() is not None:
+        return search_entries(query=query, category=category, limit=limit, offset=offset)
+    return _get_cache()['index'].search(query=query, category=category, limit=limit, offset=offset)
@@ -0,0 +1,229 @@
+"""
+Risk Library Search
+
+In-memory inverted index over the risk library (see risk_library.py), built
+once per library version. Text is normalized with the Turkish-aware
+normalize_text (I -> ı, İ -> i) and split into words; each word maps to the
+entries containing it with a field-weighted score.
+
+A query matches entries containing every query word (AND), each word also
+matching as a prefix of longer words, and results are ranked by score.
+Facet counts per category (Grup Adı) are returned with every search.
+
+Once the library is loaded into the database (RiskLibraryEntry), the same
+search runs as a full-text query instead (search_entries): FTS5 with bm25
+ranking on SQLite, a GIN-indexed tsvector with ts_rank on PostgreSQL, and
+plain substring matching on other backends. Pagination and facet counts are
+done by the database.
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from django.db import connection
+from django.db.models import BooleanField, Count, FloatField, Q
+from django.db.models.expressions import RawSQL
+from .blind_index import normalize_text
+
+# Searched fields and their weight in the ranking
+SEARCH_FIELDS = {
+    'Tehlike': 3,
+    'Risk': 3,
+    'Etiketler': 2,
+    'Grup Adı': 2,
+    'Konu': 1,
+}
+# A query word that is only a prefix of the indexed word scores less than a whole-word hit
+PREFIX_MATCH_WEIGHT = 0.5
+# Query words this short expand to many indexed words: their scores are memoized
+SHORT_WORD_LENGTH = 2
+
+_WORD_RE = re.compile(r'\w+')
+
+# Full-text objects created by migration 0046
+FTS_TABLE = 'core_risklibraryentry_fts'
+# bm25 column weights of the FTS5 table (search_title, search_body)
+FTS_COLUMN_WEIGHTS = (3.0, 1.0)
+
+
+def tokenize(value):
+    """Normalized words of a text"""
+    return _WORD_RE.findall(normalize_text(value)) if value else []
+
+
+class RiskSearchIndex:
+    def __init__(self, risks, fields=None):
+        """fields: {key: weight} of the indexed texts (SEARCH_FIELDS by default)"""
+        self.risks = risks
+        postings = {}
+        categories = []
+        for doc, risk in enumerate(risks):
+            for field, weight in (fields or SEARCH_FIELDS).items():
+                for word in tokenize(risk.get(field)):
+                    docs = postings.setdefault(word, {})
+                    docs[doc] = docs.get(doc, 0) + weight
+            categories.append((risk.get('Grup Adı') or '').strip())
+
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.categories = categories
+        self.docs_by_category = {}
+        for doc, name in enumerate(categories):
+            self.docs_by_category.setdefault(name, []).append(doc)
+        self.normalized_categories = {name: normalize_text(name) for name in self.docs_by_category}
+        self.all_facets = {name: len(docs) for name, docs in self.docs_by_category.items() if name}
+        self._short_word_scores = {}
+
+    def _word_scores(self, word):
+        """{doc: score} for one query word: whole-word hits at full weight, prefix hits reduced"""
+        if len(word) <= SHORT_WORD_LENGTH:
+            if word not in self._short_word_scores:
+                self._short_word_scores[word] = self._expand_word(word)
+            return self._short_word_scores[word]
+        return self._expand_word(word)
+
+    def _expand_word(self, word):
+        scores = {}
+        start = bisect_left(self.vocabulary, word)
+        for indexed in self.vocabulary[start:]:
+            if not indexed.startswith(word):
+                break
+            factor = 1 if indexed == word else PREFIX_MATCH_WEIGHT
+            for doc, score in self.postings[indexed].items():
+                score *= factor
+                if score > scores.get(doc, 0):
+                    scores[doc] = score
+        return scores
+
+    def match(self, query):
+        """{doc: score} of the entries containing every query word, or None for an empty query"""
+        words = set(tokenize(query))
+        if not words:
+            return None
+        scores = None
+        # Most selective (longest) words first so the candidate set shrinks quickly
+        for word in sorted(words, key=len, reverse=True):
+            word_scores = self._word_scores(word)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {doc: score + word_scores[doc] for doc, score in scores.items() if doc in word_scores}
+            if not scores:
+                break
+        return scores
+
+    def category_docs(self, category):
+        """Entries whose category contains the given text (case-insensitive)"""
+        needle = normalize_text(category)
+        docs = set()
+        for name, normalized in self.normalized_categories.items():
+            if needle in normalized:
+                docs.update(self.docs_by_category[name])
+        return docs
+
+    def search(self, query='', category='', limit=100, offset=0):
+        """
+        Returns:
+            dict: {'results': list, 'total': int, 'has_more': bool,
+                   'facets': {category: matches}} (facets ignore the category filter)
+        """
+        scores = self.match(query)
+        if scores is None:
+            docs = range(len(self.risks))
+            facets = self.all_facets
+        else:
+            docs = scores
+            facets = dict(Counter(self.categories[doc] for doc in scores if self.categories[doc]))
+
+        if category and category.strip():
+            allowed = self.category_docs(category)
+            docs = [doc for doc in docs if doc in allowed]
+
+        if scores is None:
+            ordered = list(docs)
+        else:
+            ordered = sorted(docs, key=lambda doc: (-scores[doc], doc))
+
+        total = len(ordered)
+        return {
+            'results': [self.risks[doc] for doc in ordered[offset:offset + limit]],
+            'total': total,
+            'has_more': (offset + limit) < total,
+            'facets': facets,
+        }
+
+
+def _full_text_filter(queryset, words):
+    """
+    (queryset restricted to the entries containing every word as a word
+    prefix, ranking): ranking lists the matching IDs best first, or is None
+    when the queryset itself is ordered by relevance.
+    """
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = ' AND '.join(f'"{word}"*' for word in words)
+        weights = ', '.join(str(weight) for weight in FTS_COLUMN_WEIGHTS)
+        # bm25() only exists inside the full-text query: rank there, in one statement
+        # (a correlated rank subquery would re-run the MATCH for every matching row)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}, {weights}), rowid',
+                [match],
+            )
+            ranking = [row[0] for row in cursor.fetchall()]
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        return queryset.filter(pk__in=matches), ranking
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        # search_vector is a generated column created by the migration, not a model field
+        return queryset.filter(
+            RawSQL("search_vector @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL("ts_rank(search_vector, to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+        ).order_by('-rank', 'pk'), None
+    for word in words:
+        queryset = queryset.filter(Q(search_title__contains=word) | Q(search_body__contains=word))
+    return queryset, None
+
+
+def search_entries(query='', category='', limit=100, offset=0):
+    """
+    RiskSearchIndex.search over the RiskLibraryEntry table: same arguments
+    and result shape, with the results as library dicts.
+    """
+    from .models import RiskLibraryEntry
+
+    entries = RiskLibraryEntry.objects.all()
+    ranking = None
+    words = sorted(set(tokenize(query)))
+    if words:
+        entries, ranking = _full_text_filter(entries, words)
+
+    facets = {
+        row['group_name']: row['count']
+        for row in entries.order_by().values('group_name').annotate(count=Count('pk'))
+        if row['group_name']
+    }
+
+    if category and category.strip():
+        # Matched like RiskSearchIndex.category_docs (Turkish-aware), over the few distinct group names
+        needle = normalize_text(category)
+        group_names = RiskLibraryEntry.objects.order_by().values_list('group_name', flat=True).distinct()
+        entries = entries.filter(group_name__in=[name for name in group_names if needle in normalize_text(name)])
+
+    if ranking is None:
+        total = entries.count()
+        page = list(entries[offset:offset + limit])
+    else:
+        if category and category.strip():
+            allowed = set(entries.values_list('pk', flat=True))
+            ranking = [pk for pk in ranking if pk in allowed]
+        total = len(ranking)
+        by_pk = entries.in_bulk(ranking[offset:offset + limit])
+        page = [by_pk[pk] for pk in ranking[offset:offset + limit] if pk in by_pk]
+    return {
+        'results': [entry.as_library_dict() for entry in page],
+        'total': total,
+        'has_more': (offset + limit) < total,
+        'facets': facets,
+    }
@@ -0,0 +1,86 @@
+"""
+Risk Tool Import
+
+Builds a RiskTool's categories, topics and questions from a spreadsheet with
+category / topic / question columns (optionally explanation, legal_ref).
+The sheet is cleaned and grouped with pandas column operations, then written
+with one bulk_create per level, so OiRA tools with thousands of questions
+import in a handful of statements.
+"""
+
+import pandas as pd
+from django.db import transaction
+from .models import RiskCategory, RiskTopic, RiskQuestion
+from .question_tree import bump_question_tree_version
+from .assessment_progress import refresh_question_count
+
+REQUIRED_COLUMNS = ('category', 'topic', 'question')
+OPTIONAL_COLUMNS = ('explanation', 'legal_ref')
+
+
+def read_risk_tool_file(uploaded_file):
+    """DataFrame of the uploaded CSV/Excel file; every cell as text, blanks as ''"""
+    if uploaded_file.name.lower().endswith('.csv'):
+        df = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(uploaded_file, dtype=str, keep_default_na=False)
+    # Normalize column names (lowercase, strip whitespace)
+    df.columns = df.columns.astype(str).str.lower().str.strip()
+    return df
+
+
+def get_missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def prepare_risk_tool_frame(df):
+    """
+    One row per question, in file order, with stripped texts and:
+      - category_idx: category number, in order of first appearance,
+      - topic_idx: topic number across the tool, in order of first appearance.
+    Rows missing a category, topic or question are dropped.
+    """
+    df = df.reindex(columns=[*REQUIRED_COLUMNS, *OPTIONAL_COLUMNS]).fillna('')
+    df = df.astype(str).apply(lambda column: column.str.strip())
+    df = df[(df['category'] != '') & (df['topic'] != '') & (df['question'] != '')].reset_index(drop=True)
+
+    df['category_idx'] = pd.factorize(df['category'])[0]
+    df['topic_idx'] = df.groupby(['category_idx', 'topic'], sort=False).ngroup()
+    return df
+
+
+def create_risk_tool_content(tool, df):
+    """
+    Creates the categories, topics and questions of a prepared frame under
+    tool (one bulk_create each, in one transaction). Returns the three counts.
+    """
+    category_titles = df.drop_duplicates('category_idx')['category']
+    topics = df.drop_duplicates('topic_idx')[['category_idx', 'topic']]
+    # Topics are numbered within their category
+    topic_orders = topics.groupby('category_idx').cumcount()
+
+    with transaction.atomic():
+        categories = RiskCategory.objects.bulk_create([
+            RiskCategory(tool=tool, title=title, order_index=order)
+            for order, title in enumerate(category_titles)
+        ])
+        created_topics = RiskTopic.objects.bulk_create([
+            RiskTopic(category=categories[category_idx], title=title, order_index=order)
+            for category_idx, title, order in zip(topics['category_idx'], topics['topic'], topic_orders)
+        ])
+        questions = RiskQuestion.objects.bulk_create([
+            RiskQuestion(
+                topic=created_topics[topic_idx],
+                content=content,
+                explanation_text=explanation,
+                legal_reference=legal_ref,
+                order_index=order,
+            )
+            for order, (topic_idx, content, explanation, legal_ref) in enumerate(zip(
+                df['topic_idx'], df['question'], df['explanation'], df['legal_ref'],
+            ))
+        ])
+    # bulk_create sends no post_save
+    refresh_question_count(tool.pk)
+    bump_question_tree_version(tool.pk)
+    return len(categories), len(created_topics), len(questions)
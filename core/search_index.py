@@ -0,0 +1,115 @@
+"""
+Search Index Utility Module
+
+Substring/prefix search over encrypted fields using a trigram blind index
+(SearchToken rows). A query is answered in two steps:
+  1. indexed join on SearchToken -> candidate PKs (may contain false positives),
+  2. decrypt only the candidate rows and verify the match in Python.
+Queries shorter than a trigram have no gram to look up: they scan (decrypt
+and verify every row of the queryset), matching anywhere in the text.
+"""
+
+from django.db.models import Count
+from .blind_index import normalize_text, compute_search_token
+from .models import SearchToken
+
+NGRAM_SIZE = 3
+
+
+def _grams(text):
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def index_grams(value):
+    """Grams stored for one field value: all trigrams of the normalized text"""
+    return _grams(normalize_text(value))
+
+
+def query_grams(query):
+    """Grams that must all be present in a field for it to possibly contain query (none if shorter than a gram)"""
+    return _grams(normalize_text(query))
+
+
+def get_model_key(model):
+    return model._meta.model_name
+
+
+def reindex_object(instance):
+    """
+    Brings the SearchToken rows of one object in line with its current values.
+    Diffs against the stored rows so a save that doesn't touch indexed fields costs one SELECT.
+    """
+    model_key = get_model_key(instance.__class__)
+    existing = {
+        (field, token): pk for pk, field, token in SearchToken.objects.filter(
+            model_name=model_key, object_id=instance.pk
+        ).values_list('pk', 'field', 'token')
+    }
+    wanted = {(t.field, t.token): t for t in build_tokens(instance)}
+
+    stale = [pk for key, pk in existing.items() if key not in wanted]
+    if stale:
+        SearchToken.objects.filter(pk__in=stale).delete()
+    missing = [t for key, t in wanted.items() if key not in existing]
+    if missing:
+        SearchToken.objects.bulk_create(missing)
+
+
+def build_tokens(instance):
+    """Unsaved SearchToken rows for every tokenized field of instance"""
+    model_key = get_model_key(instance.__class__)
+    tokens = []
+    for field_name in getattr(instance, 'SEARCH_TOKEN_FIELDS', ()):
+        for gram in index_grams(getattr(instance, field_name)):
+            tokens.append(SearchToken(
+                model_name=model_key,
+                object_id=instance.pk,
+                field=field_name,
+                token=compute_search_token(gram),
+            ))
+    return tokens
+
+
+def delete_tokens(model, object_ids):
+    SearchToken.objects.filter(model_name=get_model_key(model), object_id__in=object_ids).delete()
+
+
+def candidate_ids(model, query, fields=None):
+    """
+    Subquery of object IDs whose indexed field(s) contain every gram of query.
+    Grams must all come from the same field, so a match is never split across fields.
+    """
+    fields = fields or model.SEARCH_TOKEN_FIELDS
+    tokens = {compute_search_token(g) for g in query_grams(query)}
+    if not tokens:
+        return SearchToken.objects.none().values('object_id')
+    return SearchToken.objects.filter(
+        model_name=get_model_key(model),
+        field__in=fields,
+        token__in=tokens,
+    ).values('object_id', 'field').annotate(
+        matched=Count('token', distinct=True)
+    ).filter(matched=len(tokens)).values('object_id')
+
+
+def search_queryset(queryset, query, fields=None):
+    """
+    Returns queryset restricted to rows whose decrypted field(s) contain query
+    (Turkish-aware, case-insensitive). Only candidate rows are decrypted.
+    """
+    model = queryset.model
+    fields = fields or model.SEARCH_TOKEN_FIELDS
+    needle = normalize_text(query)
+    if not needle:
+        return queryset
+
+    candidates = queryset.model.objects.filter(pk__in=queryset.values('pk'))
+    if len(needle) >= NGRAM_SIZE:
+        candidates = candidates.filter(pk__in=candidate_ids(model, query, fields))
+    candidates = candidates.only('pk', *fields)
+
+    verified_ids = [
+        obj.pk for obj in candidates
+        if any(needle in normalize_text(getattr(obj, f)) for f in fields)
+    ]
+    return queryset.filter(pk__in=verified_ids)
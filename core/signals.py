@@ -1,7 +1,27 @@
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
-from .models import UserProfile, ActionLog
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import (
+    UserProfile, ActionLog, Workplace, Facility, Worker, Professional, Profession, Education, Examination,
+    WorkerComplianceStatus, RiskCategory, RiskTopic, RiskQuestion, AssessmentAnswer, AssessmentSession,
+)
+from .search_index import reindex_object, delete_tokens
+from .fingerprints import update_fingerprint, delete_fingerprints
+from .compliance import refresh_compliance_status
+from .stats import bump_stats_version
+from .filter_options import bump_filter_options_version
+from .question_tree import bump_question_tree_version
+from .assessment_progress import (
+    get_tool_id_of_topic, adjust_question_count, refresh_question_count, adjust_answered_count,
+)
+
+
+def _deleted_directly(origin, model):
+    """False for rows removed by a cascade from another model's deletion"""
+    return isinstance(origin, model) or (isinstance(origin, QuerySet) and origin.model is model)
+
 
 @receiver(pre_save, sender=UserProfile)
 def log_user_role_change(sender, instance, **kwargs):
@@ -26,3 +46,258 @@ def log_user_role_change(sender, instance, **kwargs):
                 pass
         except UserProfile.DoesNotExist:
             pass
+
+
+# =============================================================================
+# Search Token Maintenance (trigram blind index)
+# =============================================================================
+
+@receiver(post_save, sender=Workplace, dispatch_uid='search_tokens_save')
+@receiver(post_save, sender=Facility, dispatch_uid='search_tokens_save')
+@receiver(post_save, sender=Worker, dispatch_uid='search_tokens_save')
+@receiver(post_save, sender=Professional, dispatch_uid='search_tokens_save')
+def update_search_tokens(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    reindex_object(instance)
+
+
+@receiver(post_delete, sender=Workplace, dispatch_uid='search_tokens_delete')
+@receiver(post_delete, sender=Facility, dispatch_uid='search_tokens_delete')
+@receiver(post_delete, sender=Worker, dispatch_uid='search_tokens_delete')
+@receiver(post_delete, sender=Professional, dispatch_uid='search_tokens_delete')
+def remove_search_tokens(sender, instance, **kwargs):
+    delete_tokens(sender, [instance.pk])
+
+
+# =============================================================================
+# Row Fingerprint Maintenance (import duplicate detection)
+# =============================================================================
+
+@receiver(post_save, sender=Workplace, dispatch_uid='row_fingerprint_save')
+@receiver(post_save, sender=Facility, dispatch_uid='row_fingerprint_save')
+@receiver(post_save, sender=Worker, dispatch_uid='row_fingerprint_save')
+@receiver(post_save, sender=Professional, dispatch_uid='row_fingerprint_save')
+@receiver(post_save, sender=Examination, dispatch_uid='row_fingerprint_save')
+def update_row_fingerprint(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_fingerprint(instance)
+
+
+@receiver(post_delete, sender=Workplace, dispatch_uid='row_fingerprint_delete')
+@receiver(post_delete, sender=Facility, dispatch_uid='row_fingerprint_delete')
+@receiver(post_delete, sender=Worker, dispatch_uid='row_fingerprint_delete')
+@receiver(post_delete, sender=Professional, dispatch_uid='row_fingerprint_delete')
+@receiver(post_delete, sender=Examination, dispatch_uid='row_fingerprint_delete')
+def remove_row_fingerprint(sender, instance, **kwargs):
+    delete_fingerprints(sender, [instance.pk])
+
+
+# =============================================================================
+# Compliance Snapshot Maintenance (WorkerComplianceStatus)
+# =============================================================================
+
+def schedule_compliance_refresh(worker_ids):
+    """
+    Recomputes the snapshot of the given workers once the transaction commits,
+    so cascaded deletes never see a half-deleted worker.
+    """
+    worker_ids = {pk for pk in worker_ids if pk is not None}
+    if worker_ids:
+        transaction.on_commit(
+            lambda: refresh_compliance_status(Worker.objects.filter(pk__in=worker_ids))
+        )
+
+
+@receiver(post_save, sender=Worker, dispatch_uid='compliance_worker_save')
+def refresh_worker_compliance(sender, instance, raw=False, **kwargs):
+    # workplace (hazard class), facility and first aid fields live on the worker
+    if raw:
+        return
+    schedule_compliance_refresh([instance.pk])
+
+
+@receiver(post_save, sender=Workplace, dispatch_uid='compliance_workplace_save')
+def refresh_workplace_compliance(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    # Only workers whose snapshot still carries an old hazard class need a refresh
+    stale = WorkerComplianceStatus.objects.filter(
+        worker__workplace=instance
+    ).exclude(hazard_class=instance.hazard_class).values_list('worker_id', flat=True)
+    schedule_compliance_refresh(list(stale))
+
+
+@receiver(post_save, sender=Education, dispatch_uid='compliance_education_save')
+def refresh_education_compliance(sender, instance, created=False, raw=False, **kwargs):
+    # Participants are added after the first save and handled by m2m_changed
+    if raw or created:
+        return
+    schedule_compliance_refresh(instance.workers.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Education, dispatch_uid='compliance_education_delete')
+def refresh_deleted_education_compliance(sender, instance, **kwargs):
+    # Join rows are removed by cascade without m2m_changed, so collect participants first
+    schedule_compliance_refresh(list(instance.workers.values_list('pk', flat=True)))
+
+
+@receiver(m2m_changed, sender=Education.workers.through, dispatch_uid='compliance_education_workers')
+def refresh_participant_compliance(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if action == 'pre_clear':
+        # pk_set is not provided for clear(): remember who was affected before the rows go
+        if reverse:
+            instance._compliance_cleared_workers = [instance.pk]
+        else:
+            instance._compliance_cleared_workers = list(instance.workers.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            # instance is a Worker, pk_set holds Education ids
+            schedule_compliance_refresh([instance.pk])
+        else:
+            schedule_compliance_refresh(pk_set or [])
+    elif action == 'post_clear':
+        schedule_compliance_refresh(getattr(instance, '_compliance_cleared_workers', []))
+
+
+@receiver(post_save, sender=Examination, dispatch_uid='compliance_examination_save')
+@receiver(post_delete, sender=Examination, dispatch_uid='compliance_examination_delete')
+def refresh_examination_compliance(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_compliance_refresh([instance.worker_id])
+
+
+# =============================================================================
+# Scoped Stats Cache Invalidation
+# =============================================================================
+
+@receiver(pre_save, sender=Worker, dispatch_uid='stats_cache_previous')
+@receiver(pre_save, sender=Education, dispatch_uid='stats_cache_previous')
+@receiver(pre_save, sender=Examination, dispatch_uid='stats_cache_previous')
+@receiver(pre_save, sender=Facility, dispatch_uid='stats_cache_previous')
+def remember_stats_workplace(sender, instance, raw=False, **kwargs):
+    # A row moved to another workplace must invalidate the scope it left too
+    if raw or instance._state.adding:
+        return
+    lookup = 'worker__workplace_id' if sender is Examination else 'workplace_id'
+    instance._stats_previous_workplace_ids = list(
+        sender.objects.filter(pk=instance.pk).values_list(lookup, flat=True)
+    )
+
+
+# Allowed workplaces are resolved per request, so assignments need no invalidation here
+@receiver([post_save, post_delete], sender=Workplace, dispatch_uid='stats_cache')
+@receiver([post_save, post_delete], sender=Worker, dispatch_uid='stats_cache')
+@receiver([post_save, post_delete], sender=Education, dispatch_uid='stats_cache')
+@receiver([post_save, post_delete], sender=Examination, dispatch_uid='stats_cache')
+@receiver([post_save, post_delete], sender=Facility, dispatch_uid='stats_cache')
+def invalidate_scoped_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if sender is Workplace:
+        workplace_ids = [instance.pk]
+    elif sender is Examination:
+        workplace_ids = Worker.objects.filter(pk=instance.worker_id).values_list('workplace_id', flat=True)
+    else:
+        workplace_ids = [instance.workplace_id]
+    bump_stats_version([*workplace_ids, *getattr(instance, '_stats_previous_workplace_ids', [])])
+
+
+@receiver(m2m_changed, sender=Education.workers.through, dispatch_uid='stats_cache_education_workers')
+def invalidate_scoped_stats_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    # Education participants drive the training percentage of their own workplaces
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_stats_version([instance.workplace_id])
+    elif action in ('post_add', 'post_remove'):
+        bump_stats_version(Worker.objects.filter(pk__in=pk_set).values_list('workplace_id', flat=True))
+    elif action == 'pre_clear':
+        instance._cleared_workplace_ids = list(instance.workers.values_list('workplace_id', flat=True))
+    elif action == 'post_clear':
+        bump_stats_version(getattr(instance, '_cleared_workplace_ids', None))
+
+
+# =============================================================================
+# Filter Options Cache Invalidation (list page select filters)
+# =============================================================================
+
+@receiver([post_save, post_delete], sender=Workplace, dispatch_uid='filter_options')
+@receiver([post_save, post_delete], sender=Facility, dispatch_uid='filter_options')
+@receiver([post_save, post_delete], sender=Worker, dispatch_uid='filter_options')
+@receiver([post_save, post_delete], sender=Professional, dispatch_uid='filter_options')
+@receiver([post_save, post_delete], sender=Profession, dispatch_uid='filter_options')
+@receiver([post_save, post_delete], sender=User, dispatch_uid='filter_options')
+def invalidate_filter_options_cache(sender, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_filter_options_version()
+
+
+# =============================================================================
+# Question Tree Cache Invalidation (assessment runner navigation)
+# =============================================================================
+
+@receiver([post_save, post_delete], sender=RiskCategory, dispatch_uid='question_tree')
+@receiver([post_save, post_delete], sender=RiskTopic, dispatch_uid='question_tree')
+@receiver([post_save, post_delete], sender=RiskQuestion, dispatch_uid='question_tree')
+def invalidate_question_trees(sender, instance, raw=False, origin=None, **kwargs):
+    if raw:
+        return
+    # Cascaded deletions bump once, from the row the deletion started at
+    if origin is not None and not _deleted_directly(origin, sender):
+        return
+    if sender is RiskCategory:
+        tool_id = instance.tool_id
+    elif sender is RiskTopic:
+        tool_id = RiskCategory.objects.filter(pk=instance.category_id).values_list('tool_id', flat=True).first()
+    else:
+        tool_id = get_tool_id_of_topic(instance.topic_id)
+    bump_question_tree_version(tool_id)
+
+
+# =============================================================================
+# Assessment Progress Counters (question_count, total_questions, answered_count)
+# =============================================================================
+
+@receiver(post_save, sender=RiskQuestion, dispatch_uid='progress_question_save')
+def count_created_question(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    adjust_question_count(get_tool_id_of_topic(instance.topic_id), 1)
+
+
+@receiver(post_delete, sender=RiskQuestion, dispatch_uid='progress_question_delete')
+def count_deleted_question(sender, instance, origin=None, **kwargs):
+    # Cascades from a topic or category are recounted once at their origin; a deleted tool needs nothing
+    if _deleted_directly(origin, RiskQuestion):
+        adjust_question_count(get_tool_id_of_topic(instance.topic_id), -1)
+
+
+@receiver(post_delete, sender=RiskTopic, dispatch_uid='progress_topic_delete')
+def recount_deleted_topic(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, RiskTopic):
+        refresh_question_count(RiskCategory.objects.filter(pk=instance.category_id).values_list('tool_id', flat=True).first())
+
+
+@receiver(post_delete, sender=RiskCategory, dispatch_uid='progress_category_delete')
+def recount_deleted_category(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, RiskCategory):
+        refresh_question_count(instance.tool_id)
+
+
+@receiver(post_save, sender=AssessmentAnswer, dispatch_uid='progress_answer_save')
+def count_answer_transition(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    adjust_answered_count(instance.session_id, int(instance.is_answered) - int(instance._loaded_answered))
+    instance._loaded_answered = instance.is_answered
+
+
+@receiver(post_delete, sender=AssessmentAnswer, dispatch_uid='progress_answer_delete')
+def count_deleted_answer(sender, instance, origin=None, **kwargs):
+    if instance._loaded_answered and not _deleted_directly(origin, AssessmentSession):
+        adjust_answered_count(instance.session_id, -1)
@@ -1,54 +1,61 @@
 from datetime import date
+import hashlib
+from django.core.cache import cache
 from django.db.models import Count
 from core.models import Worker, Facility, Education, Examination
-from core.utils import get_allowed_workplaces
+from core.utils import get_allowed_workplaces, get_allowed_workplace_ids, scope_queryset, bump_cache_version
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Cached stats are keyed by the version of every workplace in the scope (bumped
+# by signals on writes, see signals.py), so a write only invalidates the
+# scopes holding the workplace it touched. Unrestricted users have a version
+# of their own, moved by every write; a global version covers writes of
+# unknown scope (bulk imports). The timeout bounds staleness for writes that
+# bypass signals (queryset.update) and, on a per-process cache backend, for
+# writes handled by other workers (see DEPLOYMENT.md: use a shared cache).
+STATS_CACHE_TIMEOUT = 300
+STATS_VERSION_KEY = 'scoped_stats:version'
+STATS_ALL_VERSION_KEY = 'scoped_stats:version:all'
+STATS_WORKPLACE_VERSION_KEY = 'scoped_stats:version:wp:{}'
+
+
+def bump_stats_version(workplace_ids=None):
+    """Invalidates the cached stats of the scopes holding one of workplace_ids (None: of every scope)"""
+    if workplace_ids is None:
+        bump_cache_version(STATS_VERSION_KEY)
+        return
+    bump_cache_version(STATS_ALL_VERSION_KEY)
+    for pk in set(workplace_ids):
+        if pk:
+            bump_cache_version(STATS_WORKPLACE_VERSION_KEY.format(pk))
+
+
+def get_stats_cache_key(allowed_ids):
+    """allowed_ids: frozenset of workplace IDs, or None for unrestricted users"""
+    if allowed_ids is None:
+        version_keys = [STATS_VERSION_KEY, STATS_ALL_VERSION_KEY]
+    else:
+        version_keys = [STATS_VERSION_KEY, *(STATS_WORKPLACE_VERSION_KEY.format(pk) for pk in sorted(allowed_ids))]
+    # Missing versions read as 1, the value get_cache_version starts from
+    versions = cache.get_many(version_keys)
+    scope = ','.join(f'{key}={versions.get(key, 1)}' for key in version_keys)
+    return f"scoped_stats:{hashlib.sha1(scope.encode('utf-8')).hexdigest()}"
+
+
 def get_user_scoped_stats(user):
     """
     Calculates dashboard stats based strictly on the user's allowed universe.
     Returns a safe dictionary even on error to prevent 500s.
     """
     try:
-        # 1. Get the Universe (The Allowed Workplaces)
-        allowed_workplaces = get_allowed_workplaces(user)
-        
-        # 2. Scope the Sub-Models
-        # Optimization: Don't fetch objects, just querysets
-        scoped_workers = Worker.objects.filter(workplace__in=allowed_workplaces)
-        scoped_facilities = Facility.objects.filter(workplace__in=allowed_workplaces)
-        
-        # 3. Calculate Counts
-        total_workers = scoped_workers.count()
-        total_facilities = scoped_facilities.count()
-        
-        # 4. Calculate Compliance %
-        if total_workers > 0:
-            # Education: Percentage (Fast approximation using exists/count)
-            trained_workers = scoped_workers.filter(education__isnull=False).distinct().count()
-            training_pct = int((trained_workers / total_workers * 100))
-            
-            # Examination
-            examined_workers = scoped_workers.filter(examination__isnull=False).distinct().count()
-            exam_pct = int((examined_workers / total_workers * 100))
-            
-            # First Aid (EncryptedBooleanField — must count in Python, not SQL)
-            first_aid_count = sum(1 for w in scoped_workers if w.first_aid_certificate)
-        else:
-            training_pct = 0
-            exam_pct = 0
-            first_aid_count = 0
-
-        return {
-            'total_workplaces': allowed_workplaces.count(),
-            'total_facilities': total_facilities,
-            'total_workers': total_workers,
-            'training_pct': training_pct,
-            'exam_pct': exam_pct,
-            'first_aid_count': first_aid_count,
-        }
+        key = get_stats_cache_key(get_allowed_workplace_ids(user))
+        stats = cache.get(key)
+        if stats is None:
+            stats = compute_scoped_stats(user)
+            cache.set(key, stats, STATS_CACHE_TIMEOUT)
+        return stats
     except Exception as e:
         logger.error(f"Error calculating stats: {e}", exc_info=True)
         # Return zeros on error to prevent crash
@@ -60,3 +67,42 @@ def get_user_scoped_stats(user):
             'exam_pct': 0,
             'first_aid_count': 0,
         }
+
+
+def compute_scoped_stats(user):
+    """Uncached stats for the user's allowed workplaces"""
+    # 1. Scope the Sub-Models
+    # Optimization: Don't fetch objects, just querysets
+    allowed_workplaces = get_allowed_workplaces(user)
+    scoped_workers = scope_queryset(Worker.objects.all(), user)
+    scoped_facilities = scope_queryset(Facility.objects.all(), user)
+
+    # 2. Calculate Counts
+    total_workers = scoped_workers.count()
+    total_facilities = scoped_facilities.count()
+
+    # 3. Calculate Compliance %
+    if total_workers > 0:
+        # Education: Percentage (Fast approximation using exists/count)
+        trained_workers = scoped_workers.filter(education__isnull=False).distinct().count()
+        training_pct = int((trained_workers / total_workers * 100))
+
+        # Examination
+        examined_workers = scoped_workers.filter(examination__isnull=False).distinct().count()
+        exam_pct = int((examined_workers / total_workers * 100))
+
+        # First Aid (EncryptedBooleanField — must count in Python, not SQL; only that column is decrypted)
+        first_aid_count = sum(1 for has_cert in scoped_workers.values_list('first_aid_certificate', flat=True) if has_cert)
+    else:
+        training_pct = 0
+        exam_pct = 0
+        first_aid_count = 0
+
+    return {
+        'total_workplaces': allowed_workplaces.count(),
+        'total_facilities': total_facilities,
+        'total_workers': total_workers,
+        'training_pct': training_pct,
+        'exam_pct': exam_pct,
+        'first_aid_count': first_aid_count,
+    }
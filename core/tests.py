@@ -1,7 +1,7 @@
 from django.test import TestCase, RequestFactory
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
-from core.models import Worker, Workplace, Facility, Examination, Professional
+from core.models import Worker, Workplace, Facility, Examination, Professional, BackgroundJob
 from core.views import apply_filters
 from core.import_utils import ImportHandler
 import csv
@@ -78,3 +78,949 @@ class ImportHandlerTests(TestCase):
         # This is hard to unit test in isolation without full integration test setup.
         # Skipping for now to focus on model/view logic which is critical.
         pass
+
+class BlindIndexTests(TestCase):
+    def setUp(self):
+        self.workplace = Workplace.objects.create(name="WP1", detsis_number="123")
+        self.worker = Worker.objects.create(name="İsmail Işık", tckn="12345678901", workplace=self.workplace)
+        Worker.objects.create(name="Other Worker", tckn="10987654321", workplace=self.workplace)
+
+    def test_blind_index_maintained_on_save(self):
+        self.assertTrue(self.worker.tckn_bidx)
+        self.assertNotIn("12345678901", self.worker.tckn_bidx)
+        old_bidx = self.worker.tckn_bidx
+        self.worker.tckn = "11111111111"
+        self.worker.save()
+        self.assertNotEqual(self.worker.tckn_bidx, old_bidx)
+
+    def test_apply_filters_uses_blind_index(self):
+        config = [{'field': 'tckn', 'type': 'text'}]
+        filtered_qs = apply_filters(Worker.objects.all(), config, {'tckn': '123 456 789 01'})
+        self.assertEqual(filtered_qs.count(), 1)
+        # Substring match, as before encryption
+        filtered_qs = apply_filters(Worker.objects.all(), config, {'tckn': '5678'})
+        self.assertEqual(list(filtered_qs), [self.worker])
+
+    def test_blind_index_columns_not_exported(self):
+        from core.exports import get_export_fields
+        names = [field.name for field in get_export_fields(Worker)]
+        self.assertIn('tckn', names)
+        self.assertFalse([name for name in names if name.endswith('_bidx')])
+
+    def test_turkish_normalized_name_lookup(self):
+        config = [{'field': 'name', 'type': 'text'}]
+        filtered_qs = apply_filters(Worker.objects.all(), config, {'name': 'İSMAİL  IŞIK'})
+        self.assertEqual(list(filtered_qs), [self.worker])
+
+class SearchTokenTests(TestCase):
+    def setUp(self):
+        self.workplace = Workplace.objects.create(name="IŞIK İNŞAAT A.Ş.", detsis_number="123")
+        self.other = Workplace.objects.create(name="Deniz Lojistik", detsis_number="456")
+        self.facility = Facility.objects.create(name="Merkez Bina", workplace=self.workplace)
+
+    def test_substring_search_turkish_casefold(self):
+        from core.search_index import search_queryset
+        qs = search_queryset(Workplace.objects.all(), "ışık inş")
+        self.assertEqual(list(qs), [self.workplace])
+        qs = search_queryset(Workplace.objects.all(), "lojist")
+        self.assertEqual(list(qs), [self.other])
+
+    def test_short_prefix_search(self):
+        from core.search_index import search_queryset
+        qs = search_queryset(Facility.objects.all(), "me")
+        self.assertEqual(list(qs), [self.facility])
+        # Shorter than a trigram: scanned, so it also matches inside words
+        qs = search_queryset(Workplace.objects.all(), "st")
+        self.assertEqual(list(qs), [self.other])
+
+    def test_tokens_follow_updates_and_deletes(self):
+        from core.models import SearchToken
+        from core.search_index import search_queryset
+        self.other.name = "Deniz Nakliyat"
+        self.other.save()
+        self.assertFalse(search_queryset(Workplace.objects.all(), "lojist").exists())
+        self.assertTrue(search_queryset(Workplace.objects.all(), "nakliyat").exists())
+        pk = self.other.pk
+        self.other.delete()
+        self.assertFalse(SearchToken.objects.filter(model_name='workplace', object_id=pk).exists())
+
+
+class ComplianceEngineTests(TestCase):
+    def setUp(self):
+        self.workplace = Workplace.objects.create(name="WP", detsis_number="123", hazard_class='HIGH')
+        self.facility = Facility.objects.create(name="Fac", workplace=self.workplace)
+        self.doctor = Professional.objects.create(name="Doc", tckn="1", role='DOCTOR')
+        today = date.today()
+        # Snapshot refreshes run on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_records(today)
+
+    def _create_records(self, today):
+        from core.models import Education
+        self.valid = Worker.objects.create(name="Valid", tckn="1", workplace=self.workplace, facility=self.facility,
+                                           first_aid_certificate=True, first_aid_expiry_date=today + timedelta(days=30))
+        self.expired = Worker.objects.create(name="Expired", tckn="2", workplace=self.workplace)
+        self.missing = Worker.objects.create(name="Missing", tckn="3", workplace=self.workplace,
+                                             first_aid_certificate=False, first_aid_expiry_date=today + timedelta(days=30))
+        # HIGH hazard: education and examination are valid for 1 year
+        recent = Education.objects.create(date=today - timedelta(days=30), workplace=self.workplace)
+        recent.workers.add(self.valid)
+        old = Education.objects.create(date=today - timedelta(days=800), workplace=self.workplace)
+        old.workers.add(self.valid, self.expired)
+        Examination.objects.create(date=today - timedelta(days=30), worker=self.valid, professional=self.doctor)
+        Examination.objects.create(date=today - timedelta(days=400), worker=self.expired, professional=self.doctor)
+
+    def test_load_and_summarize(self):
+        from core.compliance import load_compliance, summarize, summarize_by
+        with self.assertNumQueries(3):
+            records = load_compliance(Worker.objects.filter(workplace=self.workplace))
+        self.assertEqual(records[self.valid.pk].latest_education_date, date.today() - timedelta(days=30))
+        self.assertIsNone(records[self.missing.pk].first_aid_expiry)
+
+        summary = summarize(records.values())
+        self.assertEqual(summary['total_workers'], 3)
+        self.assertEqual(summary['valid_education'], 1)
+        self.assertEqual(summary['valid_examination'], 1)
+        self.assertEqual(summary['first_aid_count'], 1)
+        self.assertEqual(summary['missing_edu'], 1)
+        self.assertEqual(summary['missing_exam'], 1)
+        self.assertEqual(summary['education_percentage'], 33)
+
+        by_facility = summarize_by(records.values(), 'facility_id')
+        self.assertEqual(by_facility[self.facility.pk]['total_workers'], 1)
+        self.assertEqual(by_facility[None]['total_workers'], 2)
+
+    def test_model_properties_use_engine(self):
+        self.assertEqual(self.workplace.valid_education_count_display, "1/3")
+        self.assertEqual(self.workplace.valid_examination_count_display, "1/3")
+        self.assertIn("bg-success", self.valid.education_status)
+        self.assertIn("Gecikmiş", self.expired.examination_status)
+        self.assertIn("Yok", self.missing.education_status)
+
+    def test_snapshot_matches_live_computation(self):
+        from core.compliance import load_compliance, summarize, summarize_snapshot
+        workers = Worker.objects.filter(workplace=self.workplace)
+        self.assertEqual(summarize_snapshot(workers), summarize(load_compliance(workers).values()))
+        self.assertEqual(self.valid.compliance_status.education_status, 'VALID')
+        self.assertEqual(self.expired.compliance_status.exam_status, 'EXPIRED')
+        self.assertEqual(self.missing.compliance_status.education_status, 'MISSING')
+
+    def test_snapshot_follows_signals(self):
+        from core.models import Education, WorkerComplianceStatus
+        with self.captureOnCommitCallbacks(execute=True):
+            edu = Education.objects.create(date=date.today(), workplace=self.workplace)
+            edu.workers.add(self.missing)
+        self.assertEqual(WorkerComplianceStatus.objects.get(pk=self.missing.pk).education_status, 'VALID')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            edu.delete()
+        self.assertEqual(WorkerComplianceStatus.objects.get(pk=self.missing.pk).education_status, 'MISSING')
+
+        # LOW hazard: the 400-day-old examination is valid again (5 years)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workplace.hazard_class = 'LOW'
+            self.workplace.save()
+        self.assertEqual(WorkerComplianceStatus.objects.get(pk=self.expired.pk).exam_status, 'VALID')
+
+    def test_nightly_expiry(self):
+        from core.compliance import expire_compliance_statuses
+        from core.models import WorkerComplianceStatus
+        status = WorkerComplianceStatus.objects.get(pk=self.valid.pk)
+        self.assertEqual(expire_compliance_statuses(status.education_expiry + timedelta(days=1)), (1, 1))
+        status.refresh_from_db()
+        self.assertEqual((status.education_status, status.exam_status), ('EXPIRED', 'EXPIRED'))
+
+    def test_due_calendar(self):
+        from core.compliance import get_due_items, group_due_items
+        workers = Worker.objects.filter(workplace=self.workplace)
+        items = get_due_items(workers, days=30)
+        self.assertEqual([(i['worker_id'], i['type']) for i in items], [(self.valid.pk, 'first_aid')])
+        items = get_due_items(workers, days=365)
+        self.assertEqual({i['type'] for i in items}, {'education', 'examination', 'first_aid'})
+        self.assertEqual(items[0]['type'], 'first_aid')
+        groups = group_due_items(items, by='facility')
+        self.assertEqual(groups[0]['facility_name'], "Fac")
+        self.assertEqual(groups[0]['count'], 3)
+
+    def test_due_calendar_api_hides_examinations_without_medical_access(self):
+        from django.contrib.auth.models import User
+        from core.models import UserProfile, WorkplaceAssignment
+        user = User.objects.create_user('specialist', password='pw')
+        UserProfile.objects.update_or_create(user=user, defaults={'role': 'ADMIN'})
+        self.client.force_login(user)
+        response = self.client.get('/api/due-calendar/', {'days': 365}, secure=True)
+        types = {i['type'] for g in response.json()['groups'] for i in g['items']}
+        self.assertIn('examination', types)
+
+        UserProfile.objects.filter(user=user).update(role='SPECIALIST')
+        WorkplaceAssignment.objects.create(user=user, workplace=self.workplace, start_date=date.today())
+        user.refresh_from_db()
+        response = self.client.get('/api/due-calendar/', {'days': 365}, secure=True)
+        types = {i['type'] for g in response.json()['groups'] for i in g['items']}
+        self.assertNotIn('examination', types)
+        self.assertEqual(types, {'education', 'first_aid'})
+
+        response = self.client.get('/due-calendar/export/', {'days': 365}, secure=True)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('İlkyardım Sertifikası', response.content.decode('utf-8'))
+
+
+class ScopedStatsCacheTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_superuser('admin', 'a@a.com', 'pw')
+        self.workplace = Workplace.objects.create(name="WP", detsis_number="123")
+
+    def test_cached_until_write(self):
+        from core.stats import get_user_scoped_stats
+        self.assertEqual(get_user_scoped_stats(self.user)['total_workers'], 0)
+        # Cache hit: unrestricted users need no ACL query either
+        with self.assertNumQueries(0):
+            get_user_scoped_stats(self.user)
+        Worker.objects.create(name="A", tckn="1", workplace=self.workplace, first_aid_certificate=True)
+        stats = get_user_scoped_stats(self.user)
+        self.assertEqual(stats['total_workers'], 1)
+        self.assertEqual(stats['first_aid_count'], 1)
+
+    def test_writes_only_invalidate_scopes_holding_the_workplace(self):
+        from django.contrib.auth.models import User
+        from core.models import UserProfile, WorkplaceAssignment
+        from core.stats import get_user_scoped_stats
+        other = Workplace.objects.create(name="Other", detsis_number="456")
+        doctor = User.objects.create_user('doctor', password='pw')
+        UserProfile.objects.update_or_create(user=doctor, defaults={'role': 'DOCTOR'})
+        WorkplaceAssignment.objects.create(user=doctor, workplace=self.workplace, start_date=date.today())
+
+        def stats_of(user):
+            return get_user_scoped_stats(User.objects.select_related('profile').get(pk=user.pk))
+
+        self.assertEqual(stats_of(doctor)['total_workers'], 0)
+        Worker.objects.create(name="B", tckn="2", workplace=other)
+        with self.assertNumQueries(2):  # User and ACL only: the doctor's scope is still cached
+            stats_of(doctor)
+        self.assertEqual(stats_of(self.user)['total_workers'], 1)
+
+        Worker.objects.create(name="A", tckn="1", workplace=self.workplace)
+        self.assertEqual(stats_of(doctor)['total_workers'], 1)
+
+    def test_moving_a_row_invalidates_the_workplace_it_left(self):
+        from django.contrib.auth.models import User
+        from core.models import UserProfile, WorkplaceAssignment
+        from core.stats import get_user_scoped_stats
+        other = Workplace.objects.create(name="Other", detsis_number="456")
+        doctor = User.objects.create_user('doctor', password='pw')
+        UserProfile.objects.update_or_create(user=doctor, defaults={'role': 'DOCTOR'})
+        WorkplaceAssignment.objects.create(user=doctor, workplace=self.workplace, start_date=date.today())
+        worker = Worker.objects.create(name="A", tckn="1", workplace=self.workplace)
+
+        def stats_of(user):
+            return get_user_scoped_stats(User.objects.select_related('profile').get(pk=user.pk))
+
+        self.assertEqual(stats_of(doctor)['total_workers'], 1)
+        worker.workplace = other
+        worker.save()
+        self.assertEqual(stats_of(doctor)['total_workers'], 0)
+
+
+class AllowedWorkplaceCacheTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from core.models import UserProfile
+        cache.clear()
+        self.user = User.objects.create_user('doctor', password='pw')
+        UserProfile.objects.update_or_create(user=self.user, defaults={'role': 'DOCTOR'})
+        self.wp1 = Workplace.objects.create(name="WP1", detsis_number="1")
+        self.wp2 = Workplace.objects.create(name="WP2", detsis_number="2")
+
+    def _fresh_user(self):
+        from django.contrib.auth.models import User
+        return User.objects.select_related('profile').get(pk=self.user.pk)
+
+    def test_ids_memoized_per_request_and_revocation_immediate(self):
+        from core.models import WorkplaceAssignment
+        from core.utils import get_allowed_workplace_ids, scope_queryset
+        assignment = WorkplaceAssignment.objects.create(user=self.user, workplace=self.wp1, start_date=date.today())
+        user = self._fresh_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_allowed_workplace_ids(user), frozenset({self.wp1.pk}))
+        with self.assertNumQueries(0):
+            get_allowed_workplace_ids(user)
+        self.assertEqual(list(scope_queryset(Workplace.objects.all(), user, 'pk')), [self.wp1])
+
+        # Not cached across requests: the next request sees the revocation
+        assignment.end_date = date.today() - timedelta(days=1)
+        assignment.save()
+        self.assertEqual(get_allowed_workplace_ids(self._fresh_user()), frozenset())
+
+    def test_admin_fast_path(self):
+        from core.models import UserProfile
+        from core.utils import get_allowed_workplace_ids, scope_queryset
+        UserProfile.objects.filter(user=self.user).update(role='ADMIN')
+        user = self._fresh_user()
+        self.assertIsNone(get_allowed_workplace_ids(user))
+        self.assertEqual(scope_queryset(Worker.objects.all(), user).query.where.children, [])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.workplace = Workplace.objects.create(name="WP", detsis_number="123")
+        self.workers = [
+            Worker.objects.create(name=f"Worker {i:02d}", tckn=str(i), workplace=self.workplace)
+            for i in range(7)
+        ]
+
+    def _walk(self, sort):
+        from django.http import QueryDict
+        from core.pagination import paginate_items
+        params = QueryDict(mutable=True)
+        if sort:
+            params['sort'] = sort
+        seen, pages = [], []
+        while True:
+            page = paginate_items(Worker.objects.all(), sort, params, page_size=3)
+            pages.append(page)
+            seen.extend(w.pk for w in page.object_list)
+            if not page.has_next:
+                return seen, pages
+            params = QueryDict(page.next_query, mutable=True)
+
+    def test_keyset_walks_every_row_once(self):
+        ids = [w.pk for w in self.workers]
+        seen, pages = self._walk(None)
+        self.assertEqual(seen, ids)
+        self.assertEqual(pages[0].mode, 'keyset')
+        seen, _ = self._walk('-id')
+        self.assertEqual(seen, ids[::-1])
+
+    def test_previous_cursor_returns_same_page(self):
+        from django.http import QueryDict
+        from core.pagination import paginate_items
+        _, pages = self._walk(None)
+        page = paginate_items(Worker.objects.all(), None, QueryDict(pages[2].previous_query), page_size=3)
+        self.assertEqual(page.object_list, pages[1].object_list)
+
+    def test_encrypted_sort_pages_by_decrypted_value(self):
+        seen, pages = self._walk('-name')
+        self.assertEqual(seen, [w.pk for w in self.workers][::-1])
+        self.assertEqual(pages[0].mode, 'offset')
+        self.assertEqual(len(pages), 3)
+
+
+class FilterOptionsTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from core.models import UserProfile, WorkplaceAssignment
+        cache.clear()
+        self.user = User.objects.create_user('specialist', password='pw')
+        UserProfile.objects.update_or_create(user=self.user, defaults={'role': 'SPECIALIST'})
+        self.wp1 = Workplace.objects.create(name="Çelik Fabrikası", detsis_number="1")
+        self.wp2 = Workplace.objects.create(name="Tekstil Atölyesi", detsis_number="2")
+        WorkplaceAssignment.objects.create(user=self.user, workplace=self.wp1, start_date=date.today())
+        self.worker = Worker.objects.create(name="Ayşe Yılmaz", tckn="12345678901", workplace=self.wp1)
+        Worker.objects.create(name="Ayşe Demir", tckn="12345678902", workplace=self.wp2)
+
+    def test_options_scoped_searched_and_resolved(self):
+        from core.models import Examination
+        from core.filter_options import resolve_related_model, get_filter_options
+        self.assertIs(resolve_related_model(Examination, 'worker__workplace'), Workplace)
+        self.assertIsNone(resolve_related_model(Examination, 'date'))
+
+        options = get_filter_options(Workplace, self.user)
+        self.assertEqual(options, {'results': [{'id': self.wp1.pk, 'text': str(self.wp1)}], 'has_more': False})
+        self.assertEqual(get_filter_options(Worker, self.user, 'ayşe')['results'], [{'id': self.worker.pk, 'text': str(self.worker)}])
+        self.assertEqual(len(get_filter_options(Worker, self.user, '12345678901')['results']), 1)
+
+        # Search and paging cached until an option model changes; labels are
+        # read back by primary key and never stored in the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(get_filter_options(Workplace, self.user), options)
+        with self.assertNumQueries(1):
+            get_filter_options(Worker, self.user, 'ayşe')
+        from django.core.cache import cache
+        from core.filter_options import _get_cache_key
+        cached = cache.get(_get_cache_key(Worker, self.user, 'ayşe', 1))
+        self.assertEqual(cached['ids'], [self.worker.pk])
+        self.assertNotIn('text', cached)
+        self.wp2.name = "Tekstil"
+        self.wp2.save()
+        self.assertNotEqual(get_filter_options(Workplace, self.user)['results'], [])
+
+    def test_list_page_renders_only_selected_option(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/workers/', {'workplace': self.wp1.pk}, secure=True)
+        config = next(c for c in response.context['filter_config'] if c['field'] == 'workplace')
+        self.assertIn('options_url', config)
+        self.assertEqual(config['options'], [(self.wp1.pk, str(self.wp1))])
+
+        response = self.client.get('/api/filter-options/', {'model': 'worker', 'field': 'workplace', 'q': 'tekstil'}, secure=True)
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get('/api/filter-options/', {'model': 'worker', 'field': 'name'}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingExportTests(TestCase):
+    def test_csv_export_streams_without_per_row_queries(self):
+        from django.contrib.auth.models import User
+        from core.models import Profession
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        workplace = Workplace.objects.create(name="WP", detsis_number="1")
+        facility = Facility.objects.create(name="Bina A", workplace=workplace)
+        profession = Profession.objects.create(name="Kaynakçı")
+        for i in range(5):
+            Worker.objects.create(name=f"Worker {i}", tckn=str(i), workplace=workplace, facility=facility, profession=profession)
+
+        self.client.force_login(user)
+        response = self.client.get('/workers/export/', secure=True)
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content).decode('utf-8')
+        lines = content.lstrip('\ufeff').splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertIn('Bina A (WP)', lines[1])
+        self.assertIn('Kaynakçı', lines[1])
+
+    def test_xlsx_export_write_only(self):
+        import io
+        import openpyxl
+        from django.contrib.auth.models import User
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        workplace = Workplace.objects.create(name="Uzun İsimli İşyeri", detsis_number="1")
+        Worker.objects.create(name="Ayşe", tckn="1", workplace=workplace)
+
+        self.client.force_login(user)
+        response = self.client.get('/workers/export/', {'format': 'xlsx'}, secure=True)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        wb = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(wb.active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(rows[0][0])
+        self.assertIn('Ayşe', rows[1])
+
+
+
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.contrib.auth.models import User
+        self.artifact_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.artifact_dir.cleanup)
+        override = self.settings(JOB_ARTIFACT_ROOT=self.artifact_dir.name, JOB_CONCURRENCY=1)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        workplace = Workplace.objects.create(name="WP", detsis_number="1")
+        Worker.objects.create(name="Ayşe", tckn="1", workplace=workplace)
+
+    def test_export_job_runs_and_downloads(self):
+        from core.jobs import claim_next_job, run_job
+        self.client.force_login(self.user)
+        response = self.client.get('/workers/export/', {'format': 'csv', 'background': '1', 'name': 'Ayşe'}, secure=True)
+        job = BackgroundJob.objects.get()
+        self.assertRedirects(response, f'/jobs/{job.pk}/', fetch_redirect_response=False)
+
+        job = run_job(claim_next_job('test'))
+        self.assertEqual(job.status, BackgroundJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {'rows': 1})
+
+        status = self.client.get(f'/api/jobs/{job.pk}/', secure=True).json()
+        self.assertTrue(status['finished'])
+        download = self.client.get(status['download_url'], secure=True)
+        self.assertIn('Ayşe', b''.join(download.streaming_content).decode('utf-8'))
+
+    def test_retry_concurrency_and_expiry(self):
+        from django.utils import timezone
+        from core.jobs import claim_next_job, run_job, expire_job_artifacts, enqueue_job
+        failing = enqueue_job('EXPORT', self.user, {'model': 'worker', 'filter_config': 'broken'}, max_attempts=2)
+        enqueue_job('EXPORT', self.user, {'model': 'worker'})
+
+        job = claim_next_job('a')
+        self.assertEqual(job.pk, failing.pk)
+        self.assertIsNone(claim_next_job('b'))  # JOB_CONCURRENCY = 1
+
+        job = run_job(job)
+        self.assertEqual((job.status, job.attempts), (BackgroundJob.STATUS_PENDING, 1))
+        done = run_job(claim_next_job('a'))  # the retry waits for its backoff
+        self.assertEqual(done.status, BackgroundJob.STATUS_SUCCEEDED)
+        self.assertIsNone(claim_next_job('a'))
+
+        later = timezone.now() + timedelta(minutes=5)
+        job = run_job(claim_next_job('a', now=later))
+        self.assertEqual((job.pk, job.status), (failing.pk, BackgroundJob.STATUS_FAILED))
+
+        self.assertEqual(expire_job_artifacts(now=done.expires_at + timedelta(seconds=1)), 1)
+        self.assertEqual(BackgroundJob.objects.get(pk=done.pk).status, BackgroundJob.STATUS_EXPIRED)
+
+
+
+class BulkImportTests(TestCase):
+    def _handler_for(self, text):
+        import tempfile
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8-sig', delete=False)
+        handle.write(text)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return ImportHandler(session={'import_file_path': handle.name})
+
+    def test_workers_imported_in_bulk_with_name_lookups(self):
+        from core.blind_index import filter_by_blind_index
+        from core.models import WorkerComplianceStatus, Profession
+        from core.search_index import search_queryset
+        workplace = Workplace.objects.create(name="Çelik A.Ş.", detsis_number="1")
+        other = Workplace.objects.create(name="Başka", detsis_number="2")
+        Facility.objects.create(name="Depo", workplace=other)
+        facility = Facility.objects.create(name="Depo", workplace=workplace)
+        Profession.objects.create(name="Kaynakçı")
+        rows = ''.join(f"Çalışan {i};{10000000000 + i};çelik a.ş.;depo;kaynakçı\n" for i in range(30))
+        handler = self._handler_for("ad;tckn;isyeri;bina;meslek\n" + rows + "Eksik;1;Yok A.Ş.;depo;kaynakçı\n")
+        mapping = {'name': 'ad', 'tckn': 'tckn', 'workplace': 'isyeri', 'facility': 'bina', 'profession': 'meslek'}
+
+        # 3 FK tables, fingerprints + per batch of 10: savepoints, insert, tokens, fingerprints, 4 for snapshots
+        with self.assertNumQueries(31):
+            count = handler.execute_import(Worker, mapping, batch_size=10)
+        self.assertEqual(count, 30)
+
+        worker = filter_by_blind_index(Worker.objects.all(), 'tckn', '10000000007').get()
+        self.assertEqual((worker.workplace_id, worker.facility_id), (workplace.pk, facility.pk))
+        self.assertEqual(list(search_queryset(Worker.objects.all(), 'çalışan 7')), [worker])
+        self.assertEqual(WorkerComplianceStatus.objects.count(), 30)
+
+    def test_workplaces_get_default_facility_and_duplicates_skipped(self):
+        from core.models import Profession
+        handler = self._handler_for("ad\nMarangoz\nMarangoz\nKaynakçı\n")
+        self.assertEqual(handler.execute_import(Profession, {'name': 'ad'}), 2)
+        self.assertEqual(handler.execute_import(Profession, {'name': 'ad'}), 0)
+
+        handler = self._handler_for("ad;detsis\nYeni İşyeri;55\n")
+        self.assertEqual(handler.execute_import(Workplace, {'name': 'ad', 'detsis_number': 'detsis'}), 1)
+        self.assertEqual([f.name for f in Facility.objects.filter(workplace__detsis_number_bidx__isnull=False)], ["MERKEZ BİNA"])
+
+    def test_encrypted_duplicates_detected_by_fingerprint(self):
+        workplace = Workplace.objects.create(name="Çelik A.Ş.", detsis_number="1")
+        Worker.objects.create(name="Ali Veli", tckn="10000000001", workplace=workplace)
+        text = (
+            "ad;tckn;isyeri\n"
+            f"ALİ VELİ;100 000 000 01;{workplace.pk}\n"  # Existing worker, differently formatted
+            f"Ayşe Kaya;10000000002;{workplace.pk}\n"
+            f"Ayşe K.;10000000002;{workplace.pk}\n"  # Repeat within the file
+        )
+        mapping = {'name': 'ad', 'tckn': 'tckn', 'workplace': 'isyeri'}
+
+        preview = self._handler_for(text).get_preview_data(Worker, mapping)
+        self.assertEqual((preview['valid'], preview['error']), (1, 2))
+
+        handler = self._handler_for(text)
+        self.assertEqual(handler.execute_import(Worker, mapping), 1)
+        self.assertEqual(handler.execute_import(Worker, mapping), 0)
+        self.assertEqual(Worker.objects.count(), 2)
+
+    def test_preview_checks_a_sample_and_builds_full_report_in_background(self):
+        from django.contrib.auth.models import User
+        from core.jobs import claim_next_job, run_job
+        workplace = Workplace.objects.create(name="Çelik A.Ş.", detsis_number="1")
+        rows = ''.join(f"Çalışan {i};{10000000000 + i};{workplace.pk}\n" for i in range(201))
+        handler = self._handler_for("ad;tckn;isyeri\n" + rows + "Eksik;1;Yok A.Ş.\n")
+        mapping = {'name': 'ad', 'tckn': 'tckn', 'workplace': 'isyeri'}
+
+        preview = handler.get_preview_data(Worker, mapping)
+        self.assertEqual((preview['total'], preview['sampled'], preview['valid'], preview['error']), (202, 200, 200, 0))
+        self.assertFalse(preview['complete'])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        session = self.client.session
+        session.update({
+            'import_file_path': handler.get_file_path(),
+            'import_settings': {'delimiter': ';', 'encoding': 'utf-8-sig'},
+            'import_mapping': mapping,
+        })
+        session.save()
+        self.client.get('/workers/import/step4/', secure=True)
+        self.client.get('/workers/import/step4/', secure=True)  # Same file and mapping: the report is reused
+        job = BackgroundJob.objects.get(kind='VALIDATE')
+
+        job = run_job(claim_next_job('test'))
+        self.assertEqual((job.result['total'], job.result['valid'], job.result['error']), (202, 201, 1))
+        self.assertEqual(job.result['errors'][0]['row_idx'], 202)
+
+        response = self.client.get('/workers/import/step4/', secure=True)
+        self.assertTrue(response.context['summary']['complete'])
+        self.assertEqual(response.context['summary']['valid'], 201)
+
+    def _spreadsheet_handler(self, suffix, write):
+        import tempfile
+        handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        write(handle.name)
+        return ImportHandler(session={'import_file_path': handle.name})
+
+    def test_xlsx_and_ods_sheets_imported_like_csv(self):
+        import datetime
+        import zipfile
+        import openpyxl
+        workplace = Workplace.objects.create(name="Çelik A.Ş.", detsis_number="1")
+        worker = Worker.objects.create(name="Ali", tckn="10000000001", workplace=workplace)
+        doctor = Professional.objects.create(name="Dr. Can", tckn="2", license_id="1", role='DOCTOR')
+        mapping = {'worker': 'calisan', 'date': 'tarih', 'professional': 'hekim'}
+
+        def write_xlsx(path):
+            wb = openpyxl.Workbook()
+            wb.active.append(['calisan', 'tarih', 'hekim'])
+            wb.active.append([worker.pk, datetime.datetime(2024, 3, 1), float(doctor.pk)])  # Numeric and date cells
+            wb.active.append([None, None])
+            wb.save(path)
+
+        handler = self._spreadsheet_handler('.xlsx', write_xlsx)
+        self.assertEqual(handler.get_headers(), ['calisan', 'tarih', 'hekim'])
+        self.assertEqual(handler.execute_import(Examination, mapping, date_format='%d.%m.%Y'), 1)
+        self.assertEqual(Examination.objects.get().date, datetime.date(2024, 3, 1))
+
+        def write_ods(path):
+            cell = '<table:table-cell office:value-type="{0}" office:{1}="{2}"><text:p>{2}</text:p></table:table-cell>'
+            content = (
+                '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+                ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+                ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"><office:body><office:spreadsheet>'
+                '<table:table><table:table-row>'
+                '<table:table-cell office:value-type="string"><text:p>calisan</text:p></table:table-cell>'
+                '<table:table-cell office:value-type="string"><text:p>tarih</text:p></table:table-cell>'
+                '<table:table-cell office:value-type="string"><text:p>hekim</text:p></table:table-cell>'
+                '<table:table-cell table:number-columns-repeated="16000"/></table:table-row><table:table-row>'
+                + cell.format('float', 'value', worker.pk) + cell.format('date', 'date-value', '2024-04-01') +
+                cell.format('float', 'value', doctor.pk) +
+                '</table:table-row><table:table-row table:number-rows-repeated="1000000"><table:table-cell/></table:table-row>'
+                '</table:table></office:spreadsheet></office:body></office:document-content>'
+            )
+            with zipfile.ZipFile(path, 'w') as archive:
+                archive.writestr('content.xml', content)
+
+        handler = self._spreadsheet_handler('.ods', write_ods)
+        self.assertEqual(handler.get_headers(), ['calisan', 'tarih', 'hekim'])
+        self.assertEqual(handler.execute_import(Examination, mapping), 1)
+        self.assertEqual(sorted(e.date for e in Examination.objects.all()), [datetime.date(2024, 3, 1), datetime.date(2024, 4, 1)])
+
+    def test_csv_delimiter_and_encoding_detected(self):
+        from core.import_readers import sniff_csv
+        path = self._handler_for("x").get_file_path()
+        with open(path, 'wb') as f:
+            f.write("ad,tckn\nŞükrü Işık,1\nÇağrı,2\n".encode('cp1254'))
+        self.assertEqual(sniff_csv(path), {'encoding': 'cp1254', 'delimiter': ','})
+
+    def test_workplace_hazard_class_follows_nace_code(self):
+        handler = self._handler_for(
+            "ad;detsis;nace;sinif\n"
+            "Tarla;1;01.11.12;\n"  # Filled in: Tehlikeli
+            "Maden;2;05.10.01;LOW\n"  # Contradicts the NACE table
+            "Diğer;3;;HIGH\n"
+        )
+        mapping = {'name': 'ad', 'detsis_number': 'detsis', 'nace_code': 'nace', 'hazard_class': 'sinif'}
+        preview = handler.get_preview_data(Workplace, mapping)
+        self.assertEqual((preview['valid'], preview['error']), (2, 1))
+        self.assertEqual(handler.execute_import(Workplace, mapping), 2)
+        self.assertEqual(sorted(Workplace.objects.values_list('hazard_class', flat=True)), ['HIGH', 'MEDIUM'])
+
+
+class NaceIndexTests(TestCase):
+    def test_code_prefix_and_turkish_text_search(self):
+        from core.nace import search_nace
+        results, total = search_nace('01.11')
+        self.assertEqual(([r['nace_code'] for r in results], total), (['01.11.12', '01.11.14'], 2))
+        self.assertEqual(search_nace('0111', limit=1)[1], 2)
+
+        results, total = search_nace('TAHIL yetiş')
+        self.assertEqual([r['nace_code'] for r in results], ['01.11.12'])
+        self.assertEqual(search_nace('zzz'), ([], 0))
+
+    def test_danger_class_lookup(self):
+        from core.nace import get_danger_class, get_hazard_class
+        self.assertEqual(get_danger_class('01.11.12'), 'Tehlikeli')
+        self.assertEqual(get_hazard_class('233202'), 'HIGH')  # Listed with an amendment note: '23.32.02 (Ek:...)'
+        self.assertIsNone(get_hazard_class('99.99.99'))
+
+    def test_api_returns_ranked_results(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        data = self.client.get('/api/search_nace/', {'q': 'tahıl yetiş'}, secure=True).json()
+        self.assertEqual(data['results'][0], {
+            'nace_code': '01.11.12', 'danger_class': 'Tehlikeli',
+            'description': 'Tahıl yetiştiriciliği (buğday, dane mısır, süpürge darısı, arpa, çavdar, yulaf, darı, kuş yemi vb.) (pirinç hariç)',
+        })
+
+
+
+class HttpCacheTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        workplace = Workplace.objects.create(name="WP", detsis_number="1")
+        self.facility = Facility.objects.create(name="Fac", workplace=workplace)
+
+    def test_unchanged_json_answered_with_304(self):
+        self.client.force_login(self.user)
+        first = self.client.get('/api/search_nace/', {'q': 'tahıl'}, secure=True)
+        self.assertTrue(first.has_header('ETag'))
+        self.assertIn('no-cache', first['Cache-Control'])
+        again = self.client.get('/api/search_nace/', {'q': 'tahıl'}, secure=True, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((again.status_code, again.content), (304, b''))
+        other = self.client.get('/api/search_nace/', {'q': 'tahıl yetiş'}, secure=True, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(other.status_code, 200)
+
+    def test_public_apis_revalidate_after_changes(self):
+        from django.core.cache import cache
+        from core.models import EngagementComment, SafetyEngagement, SafetyPoll
+        wall_url = f'/api/public/wall/{self.facility.uuid}/'
+        polls_url = f'/api/public/polls/{self.facility.uuid}/'
+        engagement = SafetyEngagement.objects.create(facility=self.facility, topic='HAZARD', message="Kablo", is_public_on_wall=True)
+        poll = SafetyPoll.objects.create(facility=self.facility, question="Soru?", options=['Evet', 'Hayır'])
+
+        wall = self.client.get(wall_url, secure=True)
+        polls = self.client.get(polls_url, secure=True)
+        with self.assertNumQueries(1):  # Only the version query: facility lookup and serialization skipped
+            self.assertEqual(self.client.get(wall_url, secure=True, HTTP_IF_NONE_MATCH=wall['ETag']).status_code, 304)
+        # Derived from the database, not per-process state: another worker computes the same ETag
+        cache.clear()
+        self.assertEqual(self.client.get(wall_url, secure=True, HTTP_IF_NONE_MATCH=wall['ETag']).status_code, 304)
+
+        engagement.likes += 1
+        engagement.save()
+        changed = self.client.get(wall_url, secure=True, HTTP_IF_NONE_MATCH=wall['ETag'])
+        self.assertEqual((changed.status_code, changed.json()['items'][0]['likes']), (200, 1))
+        # Written without signals (queryset update), as another process might
+        EngagementComment.objects.create(engagement=engagement, author_name="Uzman", text="Bakıldı")
+        EngagementComment.objects.filter(engagement=engagement).update(is_public_on_voice=True)
+        commented = self.client.get(wall_url, secure=True, HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(commented.json()['items'][0]['public_comments'][0]['text'], "Bakıldı")
+
+        poll.votes = {'Evet': 1}
+        poll.save()
+        self.assertEqual(self.client.get(polls_url, secure=True, HTTP_IF_NONE_MATCH=polls['ETag']).status_code, 200)
+        self.client.cookies['voted_polls'] = str(poll.pk)
+        self.assertTrue(self.client.get(polls_url, secure=True).json()['polls'][0]['has_voted'])
+
+
+class RiskToolImportTests(TestCase):
+    def test_tool_built_with_one_insert_per_level(self):
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.models import RiskTool, RiskCategory, RiskTopic, RiskQuestion
+        rows = [
+            "Fiziksel,Gürültü,Kulak koruyucu var mı?,,",
+            "Fiziksel,Aydınlatma,Işık yeterli mi?,Açıklama,Yönetmelik md. 5",
+            "Kimyasal,Depolama,Etiketler okunuyor mu?,,",
+            "Fiziksel,Gürültü,Ölçüm yapıldı mı?,,",
+            ",Gürültü,Kategorisiz soru,,",  # Dropped: no category
+        ]
+        upload = SimpleUploadedFile('Ofis.csv', ("Category,Topic,Question,Explanation,Legal_Ref\n" + "\n".join(rows)).encode('utf-8'))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+
+        response = self.client.post('/risk-tools/import/', {'file': upload}, secure=True)
+        self.assertRedirects(response, '/risk-tools/', fetch_redirect_response=False)
+
+        tool = RiskTool.objects.get(title='Ofis')
+        self.assertEqual(list(RiskCategory.objects.filter(tool=tool).values_list('title', 'order_index')), [('Fiziksel', 0), ('Kimyasal', 1)])
+        self.assertEqual(
+            list(RiskTopic.objects.filter(category__tool=tool).values_list('category__title', 'title', 'order_index')),
+            [('Fiziksel', 'Gürültü', 0), ('Fiziksel', 'Aydınlatma', 1), ('Kimyasal', 'Depolama', 0)],
+        )
+        noise = RiskQuestion.objects.filter(topic__title='Gürültü').order_by('order_index')
+        self.assertEqual([q.content for q in noise], ["Kulak koruyucu var mı?", "Ölçüm yapıldı mı?"])
+        lighting = RiskQuestion.objects.get(topic__title='Aydınlatma')
+        self.assertEqual((lighting.explanation_text, lighting.legal_reference), ("Açıklama", "Yönetmelik md. 5"))
+        self.assertEqual(RiskQuestion.objects.get(content="Etiketler okunuyor mu?").explanation_text, '')
+
+        import pandas as pd
+        from core.risk_tool_import import prepare_risk_tool_frame, create_risk_tool_content
+        df = prepare_risk_tool_frame(pd.DataFrame({
+            'category': [f"Kategori {i % 7}" for i in range(150)],
+            'topic': [f"Konu {i % 40}" for i in range(150)],
+            'question': [f"Soru {i}" for i in range(150)],
+        }))
+        other = RiskTool.objects.create(title="Büyük Araç")
+        # savepoint, categories, topics, questions, release (SQLite splits larger inserts by its parameter limit),
+        # then the question count (count, tool, sessions) and the tool's question tree version
+        with self.assertNumQueries(9):
+            self.assertEqual(create_risk_tool_content(other, df), (7, 150, 150))
+
+
+class AssessmentRunnerTests(TestCase):
+    def setUp(self):
+        import pandas as pd
+        from django.contrib.auth.models import User
+        from core.models import RiskTool, AssessmentSession
+        from core.risk_tool_import import prepare_risk_tool_frame, create_risk_tool_content
+        self.tool = RiskTool.objects.create(title="Ofis")
+        create_risk_tool_content(self.tool, prepare_risk_tool_frame(pd.DataFrame({
+            'category': ["Fiziksel", "Fiziksel", "Kimyasal"],
+            'topic': ["Gürültü", "Gürültü", "Depolama"],
+            'question': ["Kulak koruyucu var mı?", "Ölçüm " * 20, "Etiketler okunuyor mu?"],
+        })))
+        workplace = Workplace.objects.create(name="WP", detsis_number="1")
+        facility = Facility.objects.create(name="Fac", workplace=workplace)
+        self.session = AssessmentSession.objects.create(facility=facility, tool=self.tool, title="D", workflow_type='TEMPLATE')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.url = f'/assessments/{self.session.pk}/run/'
+
+    def test_navigation_uses_cached_tree_and_answer_statuses(self):
+        from core.models import AssessmentAnswer, RiskQuestion, RiskTopic
+        from core.question_tree import get_question_tree
+        q1, q2, q3 = get_question_tree(self.tool)['question_ids']
+        AssessmentAnswer.objects.create(session=self.session, question_id=q1, response='NO')
+
+        response = self.client.get(self.url, secure=True)  # First unanswered question
+        self.assertEqual((response.context['current_question'].id, response.context['current_index']), (q2, 1))
+        self.assertEqual((response.context['prev_question']['id'], response.context['next_question']['id']), (q1, q3))
+        topic = response.context['categories_data'][0]['topics'][0]
+        self.assertEqual([(q['id'], q['status']) for q in topic['questions']], [(q1, 'no'), (q2, 'unanswered')])
+        self.assertTrue(topic['questions'][1]['content'].endswith('...'))
+
+        response = self.client.get(self.url, {'q': q3}, secure=True)
+        self.assertEqual((response.context['current_index'], response.context['next_question']), (2, None))
+
+        # Editing the tool invalidates the tree
+        RiskQuestion.objects.create(topic=RiskTopic.objects.get(title="Depolama"), content="Yeni soru", order_index=5)
+        self.assertEqual(self.client.get(self.url, {'q': q3}, secure=True).context['total_questions'], 4)
+
+        # A tree naming a question deleted behind its back is rebuilt instead of answering 404
+        RiskQuestion.objects.filter(pk=q3)._raw_delete('default')
+        response = self.client.get(self.url, {'q': q3}, secure=True)
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertEqual(self.client.get(self.url, secure=True).context['total_questions'], 3)
+
+    def test_progress_counters_follow_answers_and_tool_changes(self):
+        import json
+        from core.models import AssessmentSession, RiskTopic, RiskTool
+        from core.question_tree import get_question_tree
+        q1, q2, q3 = get_question_tree(self.tool)['question_ids']
+        stale = AssessmentSession.objects.get(pk=self.session.pk)
+        self.assertEqual((RiskTool.objects.get(pk=self.tool.pk).question_count, stale.total_questions), (3, 3))
+
+        def answer(question_id, value):
+            body = json.dumps({'question_id': question_id, 'response': value})
+            return self.client.post(f'/assessments/{self.session.pk}/save-answer/', body, content_type='application/json', secure=True).json()
+
+        self.assertEqual(answer(q1, 'YES')['progress'], 33)
+        self.assertEqual(answer(q1, 'NO')['progress'], 33)  # Already answered: unchanged
+        self.assertEqual(answer(q2, 'NA')['progress'], 67)
+        stale.title = "Yeni başlık"
+        stale.save()  # Must not write back its loaded answered_count of 0
+
+        session = AssessmentSession.objects.get(pk=self.session.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(session.progress_percentage, 67)
+
+        self.session.answers.get(question_id=q2).delete()
+        RiskTopic.objects.get(title="Depolama").delete()  # Cascades to q3
+        session.refresh_from_db()
+        self.assertEqual((session.total_questions, session.answered_count, session.progress_percentage), (2, 1, 50))
+        self.assertEqual(RiskTool.objects.get(pk=self.tool.pk).question_count, 2)
+
+        session.tool = RiskTool.objects.create(title="Boş")
+        session.save()
+        self.assertEqual(AssessmentSession.objects.get(pk=session.pk).progress_percentage, 0)
+
+    def test_status_summary_uses_fixed_queries(self):
+        from core.models import ActionPlanMeasure, AssessmentAnswer, AssessmentCustomRisk
+        from core.assessment_progress import get_status_summary
+        from core.question_tree import get_question_tree
+        q1, q2, q3 = get_question_tree(self.tool)['question_ids']
+        no_answer = AssessmentAnswer.objects.create(session=self.session, question_id=q1, response='NO', risk_priority='HIGH')
+        AssessmentAnswer.objects.create(session=self.session, question_id=q3, response='YES')
+        ActionPlanMeasure.objects.create(answer=no_answer, description="Kulaklık dağıtılacak")
+        AssessmentCustomRisk.objects.create(session=self.session, description="Kaygan zemin", is_acceptable=False, priority='LOW')
+        AssessmentCustomRisk.objects.create(session=self.session, description="Kabul", is_acceptable=True, priority='HIGH')
+
+        with self.assertNumQueries(4):
+            summary = get_status_summary(self.session)
+        self.assertEqual(summary['category_progress'], [
+            {'title': "Fiziksel", 'answered': 1, 'total': 2, 'progress': 50},
+            {'title': "Kimyasal", 'answered': 1, 'total': 1, 'progress': 100},
+        ])
+        self.assertEqual(
+            [summary[key] for key in ('total_progress', 'high_priority', 'medium_priority', 'low_priority', 'total_risks', 'risks_with_measures')],
+            [67, 1, 0, 1, 2, 1],
+        )
+        response = self.client.get(f'/assessments/{self.session.pk}/status/', secure=True)
+        self.assertEqual(response.context['total_risks'], 2)
+
+
+class RiskLibraryTests(TestCase):
+    def setUp(self):
+        import json
+        import tempfile
+        from core import risk_library
+        base = tempfile.TemporaryDirectory()
+        self.addCleanup(base.cleanup)
+        self.risks_dir = os.path.join(base.name, 'static', 'external_data', 'risks')
+        os.makedirs(self.risks_dir)
+        for filename, groups in (('b.json', ['Elektrik', 'Yangın']), ('a.json', ['Elektrik'])):
+            with open(os.path.join(self.risks_dir, filename), 'w', encoding='utf-8') as f:
+                json.dump([{'Grup Adı': group, 'Tehlike': f"{filename} {group}"} for group in groups], f)
+        override = self.settings(BASE_DIR=base.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.library = risk_library
+
+    def test_ids_are_content_derived_and_looked_up_directly(self):
+        risks = self.library.get_risk_library()
+        ids = {risk['Tehlike']: risk['id'] for risk in risks}
+        self.assertEqual(len(set(ids.values())), 3)
+        self.assertEqual(self.library.get_risk_categories(), ['Elektrik', 'Yangın'])
+        self.assertEqual(self.library.get_risk(str(ids['b.json Yangın']))['Tehlike'], 'b.json Yangın')
+        self.assertIs(self.library.get_risk_library(), risks)  # Parsed once
+
+        # A rebuilt library (another process, a changed file) gives unchanged entries the same IDs
+        with open(os.path.join(self.risks_dir, 'c.json'), 'w', encoding='utf-8') as f:
+            f.write('[{"Grup Adı": "Kimyasal", "Tehlike": "c.json"}]')
+        rebuilt = {risk['Tehlike']: risk['id'] for risk in self.library.get_risk_library()}
+        self.assertEqual(len(rebuilt), 4)
+        self.assertEqual({key: rebuilt[key] for key in ids}, ids)
+        self.assertIsNone(self.library.get_risk('abc'))
+
+    def test_search_is_turkish_aware_prefix_and_ranked(self):
+        from core.risk_search import RiskSearchIndex
+        index = RiskSearchIndex([
+            {'Grup Adı': 'Yüksekte Çalışma', 'Tehlike': 'İskele korkuluğu yok', 'Risk': 'Düşme', 'Konu': ''},
+            {'Grup Adı': 'Elektrik', 'Tehlike': 'Kablo', 'Risk': 'Çarpılma', 'Konu': 'İskele yakınında kablo'},
+            {'Grup Adı': 'Yüksekte Çalışma', 'Tehlike': 'Merdiven', 'Risk': 'Düşme', 'Konu': 'IŞIK yetersiz'},
+        ])
+        result = index.search('İSKELE')
+        self.assertEqual([r['Tehlike'] for r in result['results']], ['İskele korkuluğu yok', 'Kablo'])  # Tehlike outranks Konu
+        self.assertEqual(result['facets'], {'Yüksekte Çalışma': 1, 'Elektrik': 1})
+
+        self.assertEqual([r['Tehlike'] for r in index.search('isk düş')['results']], ['İskele korkuluğu yok'])
+        self.assertEqual([r['Tehlike'] for r in index.search('ışık')['results']], ['Merdiven'])
+        filtered = index.search('düşme', category='yüksekte')
+        self.assertEqual((filtered['total'], filtered['has_more']), (2, False))
+        self.assertEqual(index.search('', category='Elektrik')['total'], 1)
+
+    def test_library_loaded_into_database_is_searched_there(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from core.models import RiskLibraryEntry
+        file_ids = {risk['Tehlike']: risk['id'] for risk in self.library.get_risk_library()}
+        extra = os.path.join(self.risks_dir, '..', 'kurum.json')
+        with open(extra, 'w', encoding='utf-8') as f:
+            f.write('[{"Grup Adı": "Yüksekte Çalışma", "Tehlike": "İSKELE çökmesi", "Risk": "Düşme"}]')
+        call_command('import_risk_library', stdout=StringIO())
+        call_command('import_risk_library', extra, stdout=StringIO())
+        call_command('import_risk_library', stdout=StringIO())  # Reloading replaces, never duplicates
+
+        self.assertEqual(RiskLibraryEntry.objects.count(), 4)
+        self.assertEqual(self.library.get_risk_categories(), ['Elektrik', 'Yangın', 'Yüksekte Çalışma'])
+        risk = self.library.get_risk(file_ids['b.json Yangın'])  # Same IDs as the file-based library
+        self.assertEqual((risk['Tehlike'], risk['source_file']), ('b.json Yangın', 'b.json'))
+        with self.assertNumQueries(1):  # The entry only: whether the table is loaded is not re-checked per call
+            self.library.get_risk(file_ids['b.json Yangın'])
+
+        result = self.library.search_risks('iskele çök')
+        self.assertEqual([r['Tehlike'] for r in result['results']], ['İSKELE çökmesi'])
+        self.assertEqual(result['facets'], {'Yüksekte Çalışma': 1})
+        page = self.library.search_risks('elektrik', limit=1)
+        self.assertEqual((page['total'], page['has_more'], len(page['results'])), (2, True, 1))
+        self.assertEqual(self.library.search_risks('', category='yüksekte')['total'], 1)
+
+        call_command('import_risk_library', remove=['kurum.json'], stdout=StringIO())
+        self.assertEqual(self.library.search_risks('iskele')['total'], 0)
@@ -210,4 +210,17 @@ urlpatterns = [
     
     # Dashboard Search API
     path('api/dashboard-search/', views.api_dashboard_search, name='api_dashboard_search'),
+
+    # Due Calendar (upcoming expiries)
+    path('api/due-calendar/', views.api_due_calendar, name='api_due_calendar'),
+    path('due-calendar/export/', views.due_calendar_export, name='due_calendar_export'),
+
+    # List filter options (on-demand select options)
+    path('api/filter-options/', views.api_filter_options, name='api_filter_options'),
+
+    # Background jobs (exports, reports, imports)
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+    path('api/jobs/<int:pk>/', views.api_job_status, name='api_job_status'),
+    path('assessments/<int:session_pk>/export/<str:report_format>/background/', views.enqueue_report_job, name='enqueue_report_job'),
 ]
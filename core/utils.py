@@ -1,34 +1,82 @@
+from django.core.cache import cache
 from django.db.models import Q
-from .models import Workplace
+from .models import Workplace, WorkplaceAssignment
 from datetime import date
 
-def get_allowed_workplaces(user):
-    """
-    Returns a QuerySet of Workplaces the user is explicitly authorized to access.
-    Handles Admins, Managers, and assigned Professionals.
-    """
+UNRESTRICTED_ROLES = ('ADMIN', 'MANAGER')
+
+
+def get_cache_version(version_key):
+    """Current value of a cache version counter (used as part of cache keys)"""
+    return cache.get_or_set(version_key, 1, timeout=None)
+
+
+def bump_cache_version(version_key):
+    """Moves a version counter forward so every key built on it is abandoned"""
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, 2, timeout=None)
+
+
+def _is_unrestricted(user):
     # 1. Superusers always see everything
     if user.is_superuser:
-        return Workplace.objects.all()
-
+        return True
     # 2. Check user profile role
     # Use getattr to avoid potential DoesNotExist errors if profile missing
     if hasattr(user, 'profile'):
-        role = user.profile.role
-        if role in ['ADMIN', 'MANAGER']:
-            return Workplace.objects.all()
+        return user.profile.role in UNRESTRICTED_ROLES
+    return False
+
 
+def _resolve_assigned_workplace_ids(user, today):
     # 3. Doctors & Experts see ONLY assigned workplaces
-    # usage: checks the 'assignments' relation
     # Also enforcing date validity
-    today = date.today()
-    
-    return Workplace.objects.filter(
-        assignments__user=user,
-        assignments__is_active=True,
-        assignments__start_date__lte=today
+    return frozenset(WorkplaceAssignment.objects.filter(
+        user=user,
+        is_active=True,
+        start_date__lte=today,
     ).filter(
-        Q(assignments__end_date__isnull=True) | Q(assignments__end_date__gte=today)
-    ).distinct()
+        Q(end_date__isnull=True) | Q(end_date__gte=today)
+    ).values_list('workplace_id', flat=True))
+
+
+def get_allowed_workplace_ids(user):
+    """
+    Returns None if the user may see every workplace (admin fast path: no
+    filtering needed), otherwise a frozenset of allowed workplace IDs.
+    Resolved once per request (memoized on the user object). Deliberately not
+    cached across requests: a revoked assignment must take effect at once in
+    every worker process.
+    """
+    if hasattr(user, '_allowed_workplace_ids'):
+        return user._allowed_workplace_ids
+
+    if _is_unrestricted(user):
+        ids = None
+    else:
+        ids = _resolve_assigned_workplace_ids(user, date.today())
+
+    user._allowed_workplace_ids = ids
+    return ids
+
+
+def scope_queryset(queryset, user, field='workplace_id'):
+    """
+    Restricts queryset to the user's workplaces through `field` (a workplace ID
+    lookup such as 'workplace_id', 'worker__workplace_id' or 'pk' for Workplace).
+    Unrestricted users get the queryset back unfiltered.
+    """
+    ids = get_allowed_workplace_ids(user)
+    if ids is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': ids})
 
 
+def get_allowed_workplaces(user):
+    """
+    Returns a QuerySet of Workplaces the user is explicitly authorized to access.
+    Handles Admins, Managers, and assigned Professionals.
+    """
+    return scope_queryset(Workplace.objects.all(), user, field='pk')
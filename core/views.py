@@ -2,13 +2,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse, FileResponse
-from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Q, Count, Max
 from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.core.exceptions import FieldDoesNotExist
+from urllib.parse import urlencode
 import json
 from .decorators import medical_access_required
 import csv
-import openpyxl
 from datetime import datetime
 from django.forms import inlineformset_factory
 from .forms import (
@@ -19,16 +22,27 @@ from .forms import (
 )
 from .models import (
     Workplace, Worker, Professional, Education, Inspection, Examination, Profession, Facility, ActionLog, CertificateTemplate,
-    RiskTool, RiskCategory, RiskTopic, RiskQuestion, AssessmentSession, AssessmentCustomRisk, AssessmentAnswer, ActionPlanMeasure,
-    RiskAssessmentTeamMember, RiskControlRecord, UserProfile, WorkplaceAssignment
+    RiskTool, RiskQuestion, AssessmentSession, AssessmentCustomRisk, AssessmentAnswer, ActionPlanMeasure,
+    RiskAssessmentTeamMember, RiskControlRecord, UserProfile, WorkplaceAssignment, BackgroundJob
 )
 
-from .utils import get_allowed_workplaces
+from .utils import get_allowed_workplaces, scope_queryset
+from .blind_index import get_blind_index_kind, filter_by_blind_index, blind_index_matches, normalize_identifier
+from .search_index import search_queryset
 from .stats import get_user_scoped_stats
+from .compliance import summarize_snapshot, summarize_snapshot_by, attach_compliance
+from .pagination import paginate_items, PAGE_SIZE_CHOICES
+from .exports import get_export_fields, get_export_headers, iter_export_values, iter_csv_lines, xlsx_response
+from .jobs import enqueue_job, get_artifact_storage, REPORT_VIEWS
+from .filter_options import FILTER_SOURCE_MODELS, resolve_related_model, get_filter_options, get_selected_options
+from .question_tree import get_question_tree, get_answer_statuses, get_navigation
+from .assessment_progress import get_status_summary
+from .http_cache import conditional_json
 from encrypted_model_fields.fields import EncryptedCharField, EncryptedTextField, EncryptedDateField, EncryptedBooleanField
 from django.contrib.auth.models import User
 # Removed duplicate imports
 from .import_utils import ImportHandler
+from .import_readers import IMPORT_FILE_EXTENSIONS
 import json
 from .pdf_generator import generate_certificate_pdf
 
@@ -104,6 +118,11 @@ def get_workers_json(request):
         # Cannot use .values() with encrypted fields as it returns raw bytes
         # Must fetch objects to trigger partial decryption
         worker_objs = Worker.objects.filter(workplace_id=workplace_id).only('id', 'name', 'tckn')
+        # Optional exact lookups run against the blind indexes instead of decrypting every worker
+        for field_name in ('tckn', 'name'):
+            value = request.GET.get(field_name)
+            if value:
+                worker_objs = filter_by_blind_index(worker_objs, field_name, value)
         workers = [{'id': w.id, 'name': w.name, 'tckn': w.tckn} for w in worker_objs]
     return JsonResponse({'workers': workers})
 
@@ -115,104 +134,63 @@ def api_get_facilities(request):
         facilities = list(Facility.objects.filter(workplace_id=workplace_id).values('id', 'name'))
     return JsonResponse({'facilities': facilities})
 
+def _nace_version(request):
+    from .nace import get_nace_version
+    return get_nace_version()
+
+
 @login_required
+@conditional_json(_nace_version)
 def api_search_nace(request):
-    """Search NACE codes from JSON file"""
-    import os
-    from django.conf import settings
-    
-    query = request.GET.get('q', '').lower().strip()
+    """Search NACE codes (code prefix or description words) in the process-wide NACE index"""
+    from .nace import get_nace_index
+
+    query = request.GET.get('q', '').strip()
     if len(query) < 2:
         return JsonResponse({'results': [], 'count': 0})
-    
-    # Load NACE codes from JSON file
-    json_path = os.path.join(settings.BASE_DIR, 'nace-codes.json')
-    
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            nace_codes = json.load(f)
-    except FileNotFoundError:
+
+    index = get_nace_index()
+    if not index.entries:
         return JsonResponse({'results': [], 'count': 0, 'error': 'NACE codes file not found'})
-    
-    # Search in both nace_code and description
-    results = []
-    for item in nace_codes:
-        if (query in item.get('nace_code', '').lower() or 
-            query in item.get('description', '').lower()):
-            results.append({
-                'nace_code': item.get('nace_code'),
-                'description': item.get('description'),
-                'danger_class': item.get('danger_class')
-            })
-            if len(results) >= 10:  # Limit results
-                break
-    
-    return JsonResponse({'results': results, 'count': len(results)})
+
+    entries, total = index.search(query, limit=10)
+    results = [
+        {'nace_code': entry['nace_code'], 'description': entry['description'], 'danger_class': entry['danger_class']}
+        for entry in entries
+    ]
+    return JsonResponse({'results': results, 'count': len(results), 'total': total})
 
 
 @login_required
 def dashboard(request):
-    from datetime import date, timedelta
-    
     # 1. Apply Scope
     allowed_workplaces = get_allowed_workplaces(request.user)
     
     # 2. Filter Data based on Scope
-    workers = Worker.objects.filter(workplace__in=allowed_workplaces)\
-                            .select_related('workplace')\
-                            .prefetch_related('education_set', 'examination_set')
+    workers = scope_queryset(Worker.objects.all(), request.user)
 
     # Attention Logic
-    missing_edu = 0
-    missing_exam = 0
-    expiring_edu = 0
-    expiring_exam = 0
-    today = date.today()
-
-    for w in workers:
-        # Education
-        edus = w.education_set.all()
-        if not edus:
-            missing_edu += 1
-        else:
-            latest_edu = max(edus, key=lambda x: x.date, default=None)
-            if latest_edu:
-                validity = w.workplace.get_validity_years('education')
-                expiry = latest_edu.date + timedelta(days=365*validity)
-                if expiry.year == today.year and expiry.month == today.month:
-                     expiring_edu += 1
-
-        # Examination
-        exams = w.examination_set.all()
-        if not exams:
-            missing_exam += 1
-        else:
-            latest_exam = max(exams, key=lambda x: x.date, default=None)
-            if latest_exam:
-                validity = w.workplace.get_validity_years('examination')
-                expiry = latest_exam.date + timedelta(days=365*validity)
-                if expiry.year == today.year and expiry.month == today.month:
-                     expiring_exam += 1
-
+    summary = summarize_snapshot(workers)
     attention_data = {
-        'missing_edu': missing_edu,
-        'missing_exam': missing_exam,
-        'expiring_edu': expiring_edu,
-        'expiring_exam': expiring_exam,
-        'has_issues': any([missing_edu, missing_exam, expiring_edu, expiring_exam])
+        'missing_edu': summary['missing_edu'],
+        'missing_exam': summary['missing_exam'],
+        'expiring_edu': summary['expiring_edu'],
+        'expiring_exam': summary['expiring_exam'],
+        'has_issues': any([summary['missing_edu'], summary['missing_exam'],
+                           summary['expiring_edu'], summary['expiring_exam']])
     }
 
     # Context with Scoped Counts
     context = {
         'workplace_count': allowed_workplaces.count(),
-        'facility_count': Facility.objects.filter(workplace__in=allowed_workplaces).count(),
-        'worker_count': workers.count(),
+        'facility_count': scope_queryset(Facility.objects.all(), request.user).count(),
+        'worker_count': summary['total_workers'],
         'professional_count': Professional.objects.count(), # Professionals are global
-        'education_count': Education.objects.filter(workplace__in=allowed_workplaces).count(),
-        'inspection_count': Inspection.objects.filter(workplace__in=allowed_workplaces).count(),
-        'examination_count': Examination.objects.filter(worker__workplace__in=allowed_workplaces).count(),
+        'education_count': scope_queryset(Education.objects.all(), request.user).count(),
+        'inspection_count': scope_queryset(Inspection.objects.all(), request.user).count(),
+        'examination_count': scope_queryset(Examination.objects.all(), request.user, 'worker__workplace_id').count(),
         'risk_tool_count': RiskTool.objects.count(), # Global Templates
-        'assessment_count': AssessmentSession.objects.filter(facility__workplace__in=allowed_workplaces).count(),
+        'assessment_count': scope_queryset(AssessmentSession.objects.all(), request.user, 'facility__workplace_id').count(),
         'attention': attention_data,
     }
     return render(request, 'core/dashboard.html', context)
@@ -222,7 +200,9 @@ def dashboard(request):
 def apply_filters(queryset, filter_config, params):
     """
     Applies filters to the queryset based on configuration and request parameters.
-    Handles encrypted fields by switching to Python-side filtering.
+    Encrypted fields are matched through their blind indexes where available:
+    trigram tokens for substring (text) filters, HMAC columns for exact matches.
+    Other encrypted fields fall back to Python-side filtering.
     """
     is_list = isinstance(queryset, list)
     model = queryset.model if hasattr(queryset, 'model') else (queryset[0].__class__ if queryset else None)
@@ -244,8 +224,22 @@ def apply_filters(queryset, filter_config, params):
             # Update config with the current value
             config['value'] = param_value
             filter_type = config.get('type', 'text')
-
-            if is_encrypted or is_list:
+            blind_kind = get_blind_index_kind(model, field_name)
+            is_tokenized = field_name in getattr(model, 'SEARCH_TOKEN_FIELDS', ())
+
+            if is_tokenized and filter_type == 'text' and not is_list:
+                # Substring search via the trigram blind index (decrypts candidates only);
+                # identifiers are matched without separators ('123 456' finds '1234567...')
+                if blind_kind == 'identifier':
+                    param_value = normalize_identifier(param_value)
+                queryset = search_queryset(queryset, param_value, fields=(field_name,))
+            elif blind_kind:
+                # Encrypted field with a blind index: exact (normalized) match
+                if is_list:
+                    queryset = [obj for obj in queryset if blind_index_matches(getattr(obj, field_name), param_value, blind_kind)]
+                else:
+                    queryset = filter_by_blind_index(queryset, field_name, param_value)
+            elif is_encrypted or is_list:
                 # Python filtering
                 if not is_list:
                     queryset = list(queryset)
@@ -291,40 +285,8 @@ def apply_filters(queryset, filter_config, params):
 
     return queryset
 
-def apply_sorting(queryset, sort_param):
-    if not sort_param:
-        return queryset
-
-    # Check if we need Python sorting (list input or encrypted field)
-    is_list = isinstance(queryset, list)
-    model = queryset.model if hasattr(queryset, 'model') else (queryset[0].__class__ if queryset else None)
-    
-    is_encrypted_sort = False
-    clean_sort_param = sort_param.lstrip('-')
-    if model:
-        try:
-            field = model._meta.get_field(clean_sort_param)
-            if isinstance(field, (EncryptedCharField, EncryptedTextField, EncryptedDateField, EncryptedBooleanField)):
-                is_encrypted_sort = True
-        except: pass
-
-    if is_list or is_encrypted_sort:
-        if not is_list:
-            queryset = list(queryset)
-        
-        reverse = sort_param.startswith('-')
-        try:
-            return sorted(queryset, key=lambda x: getattr(x, clean_sort_param) or '', reverse=reverse)
-        except:
-            return queryset
-    else:
-        try:
-            return queryset.order_by(sort_param)
-        except:
-            return queryset
-
 # Generic helper for CRUD views
-def generic_list_view(request, model_class, title, create_url_name, update_url_name, fields_to_show, bulk_delete_url_name=None, export_url_name=None, filter_config=None, import_url_name=None, queryset=None, extra_actions=None, mobile_config=None, extra_context=None):
+def generic_list_view(request, model_class, title, create_url_name, update_url_name, fields_to_show, bulk_delete_url_name=None, export_url_name=None, filter_config=None, import_url_name=None, queryset=None, extra_actions=None, mobile_config=None, extra_context=None, prepare_items=None):
 
     if queryset is not None:
         items = queryset
@@ -335,25 +297,39 @@ def generic_list_view(request, model_class, title, create_url_name, update_url_n
         # Populate options for select fields dynamically if not provided
         for config in filter_config:
             if config['type'] == 'select' and 'options' not in config:
-                # Assuming the field name refers to a related model (e.g., 'workplace')
-                # Or a field with choices
+                # Relations (e.g. 'workplace', 'worker__workplace') load their options on demand
+                # from api_filter_options; only the selected option is rendered here.
+                # Fields with choices keep static options.
+                related_model = resolve_related_model(model_class, config['field'])
+                if related_model is not None:
+                    config['options_url'] = reverse('api_filter_options') + '?' + urlencode({
+                        'model': model_class._meta.model_name,
+                        'field': config['field'],
+                    })
+                    config['options'] = get_selected_options(related_model, request.user, request.GET.get(config['field']))
+                    continue
                 try:
                     field_object = model_class._meta.get_field(config['field'])
-                    if field_object.is_relation:
-                        related_model = field_object.related_model
-                        config['options'] = [(obj.pk, str(obj)) for obj in related_model.objects.all()]
-                    elif field_object.choices:
-                        config['options'] = field_object.choices
-                except:
+                    config['options'] = field_object.choices or []
+                except FieldDoesNotExist:
                     config['options'] = []
 
         items = apply_filters(items, filter_config, request.GET)
 
+    # Sort and cut the visible page; only these rows are decrypted and rendered
     current_sort = request.GET.get('sort')
-    items = apply_sorting(items, current_sort)
+    page = paginate_items(items, current_sort, request.GET)
+    items = page.object_list
+
+    # Optional batch step over the final rows (e.g. attaching computed per-row data)
+    if prepare_items:
+        items = prepare_items(items)
 
     context = {
         'items': items,
+        'page': page,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'current_sort': current_sort,
         'title': title,
         'create_url_name': create_url_name,
         'update_url_name': update_url_name,
@@ -378,25 +354,38 @@ def generic_import_view(request, model_class, title, list_url_name, step=1):
     if step == 1:
         if request.method == 'POST':
             if 'import_file' in request.FILES:
-                handler.save_file(request.FILES['import_file'])
+                import_file = request.FILES['import_file']
+                if not import_file.name.lower().endswith(IMPORT_FILE_EXTENSIONS):
+                    messages.error(request, 'Desteklenmeyen dosya türü. CSV, XLSX veya ODS dosyası yükleyin.')
+                    return redirect(f'import_{model_class.__name__.lower()}_step1')
+                handler.save_file(import_file)
                 # Clear previous session data
                 if 'import_mapping' in request.session: del request.session['import_mapping']
                 if 'import_settings' in request.session: del request.session['import_settings']
+                request.session['import_detected'] = handler.detect_settings()
                 return redirect(f'import_{model_class.__name__.lower()}_step2')
-        return render(request, 'core/import/import_step1.html', {'title': title, 'list_url_name': list_url_name})
+        return render(request, 'core/import/import_step1.html', {
+            'title': title, 'list_url_name': list_url_name, 'accept': ','.join(IMPORT_FILE_EXTENSIONS),
+        })
 
     # Step 2: Settings
     elif step == 2:
+        detected = dict(request.session.get('import_detected', {}))
         if request.method == 'POST':
+            delimiter = request.POST.get('delimiter', detected.get('delimiter', ';'))
             settings = {
-                'delimiter': request.POST.get('delimiter', ';'),
+                'delimiter': '\t' if delimiter == '\\t' else delimiter,  # The form posts tab as "\t"
                 'date_format': request.POST.get('date_format', '%Y-%m-%d'),
-                'encoding': request.POST.get('encoding', 'utf-8-sig'),
+                'encoding': request.POST.get('encoding', detected.get('encoding', 'utf-8-sig')),
                 'uppercase_names': request.POST.get('uppercase_names') == 'on'
             }
             request.session['import_settings'] = settings
             return redirect(f'import_{model_class.__name__.lower()}_step3')
-        return render(request, 'core/import/import_step2.html', {'title': title})
+        if detected.get('delimiter') == '\t':
+            detected['delimiter'] = '\\t'
+        return render(request, 'core/import/import_step2.html', {
+            'title': title, 'detected': detected, 'is_spreadsheet': handler.is_spreadsheet(),
+        })
 
     # Step 3: Mapping
     elif step == 3:
@@ -406,7 +395,8 @@ def generic_import_view(request, model_class, title, list_url_name, step=1):
         # Get Model Fields
         model_fields = []
         for field in model_class._meta.fields:
-            if field.auto_created or field.name == 'id':
+            # Derived columns (blind indexes, counters) are never imported
+            if field.auto_created or field.name == 'id' or not field.editable:
                 continue
 
             field_type = field.get_internal_type()
@@ -441,6 +431,13 @@ def generic_import_view(request, model_class, title, list_url_name, step=1):
         mapping = request.session.get('import_mapping', {})
 
         if request.method == 'POST':
+            if request.POST.get('background') == '1':
+                return _enqueue_job_and_redirect(request, 'IMPORT', {
+                    'model': model_class._meta.model_name,
+                    'file_path': handler.get_file_path(),
+                    'settings': settings,
+                    'mapping': mapping,
+                })
             count = handler.execute_import(
                 model_class, mapping,
                 delimiter=settings.get('delimiter', ';'),
@@ -457,10 +454,35 @@ def generic_import_view(request, model_class, title, list_url_name, step=1):
             encoding=settings.get('encoding', 'utf-8-sig')
         )
 
-        return render(request, 'core/import/import_step4.html', {'title': title, 'summary': summary})
+        report_job = None
+        if summary.get('complete') is False:
+            # Only a sample was checked: the full report is built in the background
+            report_job = _get_validation_job(request, handler, model_class, mapping, settings)
+            if report_job.status == BackgroundJob.STATUS_SUCCEEDED:
+                summary.update(report_job.result, complete=True)
+
+        return render(request, 'core/import/import_step4.html', {
+            'title': title, 'summary': summary, 'report_job': report_job,
+        })
 
     return redirect(list_url_name)
 
+def _get_validation_job(request, handler, model_class, mapping, settings):
+    """The user's full validation report for this file, mapping and settings (enqueued once, then reused)"""
+    report_key = handler.get_report_key(model_class, mapping, settings)
+    job = BackgroundJob.objects.filter(
+        kind='VALIDATE', user=request.user, params__report_key=report_key,
+    ).exclude(status__in=[BackgroundJob.STATUS_FAILED, BackgroundJob.STATUS_EXPIRED]).order_by('-pk').first()
+    if job is None:
+        job = enqueue_job('VALIDATE', request.user, {
+            'model': model_class._meta.model_name,
+            'file_path': handler.get_file_path(),
+            'settings': settings,
+            'mapping': mapping,
+            'report_key': report_key,
+        })
+    return job
+
 def generic_bulk_delete_view(request, model_class, list_url_name):
     if request.method == 'POST':
         selected_ids = request.POST.getlist('selected_items')
@@ -505,99 +527,49 @@ def generic_update_view(request, model_class, form_class, pk, title, list_url_na
     return render(request, 'core/form_template.html', {'form': form, 'title': title})
 
 def generic_export_view(request, model_class, filter_config=None):
+    export_format = request.GET.get('format', 'csv')
+
+    # Large exports can be prepared by the job worker instead (see jobs.py)
+    if request.GET.get('background') == '1':
+        query = {key: value for key, value in request.GET.items() if key not in ('background', 'format')}
+        return _enqueue_job_and_redirect(request, 'EXPORT', {
+            'model': model_class._meta.model_name,
+            'format': export_format,
+            'filter_config': filter_config or [],
+            'query': query,
+        })
+
     queryset = model_class.objects.all()
     if filter_config:
          queryset = apply_filters(queryset, filter_config, request.GET)
 
-    export_format = request.GET.get('format', 'csv')
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f"{model_class._meta.verbose_name_plural}_{timestamp}"
 
-    # Get all field names
-    field_names = [field.name for field in model_class._meta.fields]
+    fields = get_export_fields(model_class)
     # Make header pretty (verbose names)
-    headers = [field.verbose_name for field in model_class._meta.fields]
+    headers = get_export_headers(fields)
 
     if export_format == 'xlsx':
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Export"
-
-        ws.append(headers)
-
-        for obj in queryset:
-            row = []
-            for field in field_names:
-                val = getattr(obj, field)
-                # Handle relations nicely (str representation)
-                if hasattr(val, 'pk'): # It's a related object
-                    val = str(val)
-                # Handle choices nicely
-                elif hasattr(obj, f'get_{field}_display'):
-                    val = getattr(obj, f'get_{field}_display')()
-
-                # Handle dates and None
-                if val is None:
-                    val = ""
-                # Convert dates to string for Excel compatibility if needed,
-                # but openpyxl handles datetime objects well.
-                # Just ensuring timezone info is stripped if present/problematic
-                if isinstance(val, datetime):
-                     val = val.replace(tzinfo=None)
-                
-                # Convert UUID to string for Excel compatibility
-                from uuid import UUID
-                if isinstance(val, UUID):
-                    val = str(val)
-
-                row.append(val)
-            ws.append(row)
-
-        wb.save(response)
-        return response
+        return xlsx_response(iter_export_values(queryset, fields), headers, f"{filename}.xlsx")
 
     else: # Default to CSV
-        response = HttpResponse(content_type='text/csv')
+        # Streamed: rows are fetched, decrypted and written chunk by chunk
+        response = StreamingHttpResponse(iter_csv_lines(queryset, fields), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        response.write(u'\ufeff'.encode('utf8')) # BOM for Excel compatibility
-
-        writer = csv.writer(response)
-        writer.writerow(headers)
-
-        for obj in queryset:
-            row = []
-            for field in field_names:
-                val = getattr(obj, field)
-                if hasattr(val, 'pk'):
-                    val = str(val)
-                elif hasattr(obj, f'get_{field}_display'):
-                    val = getattr(obj, f'get_{field}_display')()
-                if val is None:
-                    val = ""
-                row.append(val)
-            writer.writerow(row)
-
         return response
 
 
 # Specific Views using helpers
 @login_required
 def workplace_list(request):
-    from django.db.models import Count, Q
-    from datetime import date, timedelta
+    from django.db.models import Count
 
     # ACL: Centralized permission check
     queryset = get_allowed_workplaces(request.user)
 
-    # Prefetch related data for cards
-    queryset = queryset.prefetch_related(
-        'workers__education_set', 
-        'workers__examination_set',
-        'facilities'
-    )
+    # Worker count for cards (read by Workplace.total_workers_count)
+    queryset = queryset.annotate(total_workers=Count('workers', distinct=True))
 
     # Apply filters
     search_query = request.GET.get('search', '')
@@ -607,24 +579,9 @@ def workplace_list(request):
     if hazard_filter:
         queryset = queryset.filter(hazard_class=hazard_filter)
         
-    # Apply encrypted field search (Python side)
+    # Encrypted field search via the trigram blind index (only candidates are decrypted)
     if search_query:
-        # Switch to list for Python filtering
-        queryset = list(queryset)
-        search_query_lower = search_query.lower()
-        queryset = [
-            obj for obj in queryset
-            if (obj.name and search_query_lower in obj.name.lower()) or
-               (obj.detsis_number and search_query_lower in obj.detsis_number.lower()) or
-               (obj.nace_code and search_query_lower in obj.nace_code.lower())
-        ]
-    
-    # Calculate summary statistics
-    all_workplaces = Workplace.objects.all()
-    total_count = all_workplaces.count()
-    low_hazard_count = all_workplaces.filter(hazard_class='LOW').count()
-    medium_hazard_count = all_workplaces.filter(hazard_class='MEDIUM').count()
-    high_hazard_count = all_workplaces.filter(hazard_class='HIGH').count()
+        queryset = search_queryset(queryset, search_query, fields=('name', 'detsis_number', 'nace_code'))
     
     # Calculate Stats (Scoped)
     stats = get_user_scoped_stats(request.user)
@@ -641,60 +598,6 @@ def workplace_list(request):
         'export_url_name': 'workplace_export',
     }
     return render(request, 'core/workplace_list.html', context)
-    
-    if total_workers > 0:
-        today = date.today()
-        workers = Worker.objects.select_related('workplace').prefetch_related('education_set', 'examination_set')
-        
-        for worker in workers:
-            wp = worker.workplace
-            if wp:
-                edu_years = wp.get_validity_years('education')
-                exam_years = wp.get_validity_years('examination')
-            else:
-                edu_years = 2
-                exam_years = 1
-            
-            # Valid education
-            for edu in worker.education_set.all():
-                if edu.date and edu.date >= today - relativedelta(years=edu_years):
-                    valid_education += 1
-                    break
-            
-            # Valid examination  
-            for exam in worker.examination_set.all():
-                if exam.date and exam.date >= today - relativedelta(years=exam_years):
-                    valid_examination += 1
-                    break
-            
-            # First aid count
-            if worker.first_aid_certificate and worker.first_aid_expiry_date and worker.first_aid_expiry_date >= today:
-                first_aid_count += 1
-    
-    education_percentage = round((valid_education / total_workers * 100) if total_workers > 0 else 0)
-    examination_percentage = round((valid_examination / total_workers * 100) if total_workers > 0 else 0)
-
-    context = {
-        'items': queryset,
-        'title': 'Firmalar',
-        'search_query': search_query,
-        'hazard_filter': hazard_filter,
-        'total_count': total_count,
-        'low_hazard_count': low_hazard_count,
-        'medium_hazard_count': medium_hazard_count,
-        'high_hazard_count': high_hazard_count,
-        'total_facilities': total_facilities,
-        'total_workers': total_workers,
-        'education_percentage': education_percentage,
-        'examination_percentage': examination_percentage,
-        'first_aid_count': first_aid_count,
-        'create_url_name': 'workplace_create',
-        'update_url_name': 'workplace_update',
-        'bulk_delete_url_name': 'workplace_bulk_delete',
-        'import_url_name': 'import_workplace_step1',
-        'export_url_name': 'workplace_export',
-    }
-    return render(request, 'core/workplace_list.html', context)
 
 
 @login_required
@@ -737,81 +640,31 @@ def workplace_create(request):
 
 @login_required
 def workplace_detail(request, pk):
-    from datetime import date
-    from dateutil.relativedelta import relativedelta
-    
     # Permission Check
     allowed = get_allowed_workplaces(request.user)
     workplace = get_object_or_404(allowed, pk=pk)
     
     # Get all facilities and workers
-    facilities = workplace.facilities.prefetch_related('worker_set__education_set', 'worker_set__examination_set', 'assessment_sessions').all()
-    workers = Worker.objects.filter(workplace=workplace).prefetch_related('education_set', 'examination_set')
-    
-    total_workers = workers.count()
-    facility_count = facilities.count()
-    
-    # Calculate education percentage
-    valid_education = 0
-    valid_examination = 0
-    first_aid_count = 0
-    
-    today = date.today()
-    edu_years = workplace.get_validity_years('education')
-    exam_years = workplace.get_validity_years('examination')
-    
-    for worker in workers:
-        # Check valid education
-        for edu in worker.education_set.all():
-            if edu.date and edu.date >= today - relativedelta(years=edu_years):
-                valid_education += 1
-                break
-        
-        # Check valid examination
-        for exam in worker.examination_set.all():
-            if exam.date and exam.date >= today - relativedelta(years=exam_years):
-                valid_examination += 1
-                break
-        
-        # Count first aid certificates
-        if worker.first_aid_certificate:
-            if worker.first_aid_expiry_date and worker.first_aid_expiry_date >= today:
-                first_aid_count += 1
+    facilities = workplace.facilities.annotate(
+        assessment_total=Count('assessment_sessions', distinct=True)
+    ).prefetch_related('worker_set__profession')
+    workers = Worker.objects.filter(workplace=workplace).select_related('facility')
     
-    education_percentage = round((valid_education / total_workers * 100) if total_workers > 0 else 0)
-    examination_percentage = round((valid_examination / total_workers * 100) if total_workers > 0 else 0)
+    # Compliance for the whole workplace and per facility (SQL aggregates over the snapshot)
+    summary = summarize_snapshot(workers)
+    facility_summaries = summarize_snapshot_by(workers, 'facility_id')
+    empty_summary = summarize_snapshot(Worker.objects.none())
     
-    # Calculate per-facility compliance stats
     facilities_with_stats = []
     for facility in facilities:
-        facility_workers = list(facility.worker_set.all())
-        fac_worker_count = len(facility_workers)
-        fac_valid_edu = 0
-        fac_valid_exam = 0
-        fac_first_aid = 0
-        
-        for worker in facility_workers:
-            # Education
-            for edu in worker.education_set.all():
-                if edu.date and edu.date >= today - relativedelta(years=edu_years):
-                    fac_valid_edu += 1
-                    break
-            # Examination
-            for exam in worker.examination_set.all():
-                if exam.date and exam.date >= today - relativedelta(years=exam_years):
-                    fac_valid_exam += 1
-                    break
-            # First aid
-            if worker.first_aid_certificate and worker.first_aid_expiry_date and worker.first_aid_expiry_date >= today:
-                fac_first_aid += 1
-        
+        fac_summary = facility_summaries.get(facility.pk, empty_summary)
         facilities_with_stats.append({
             'facility': facility,
-            'worker_count': fac_worker_count,
-            'edu_percentage': round((fac_valid_edu / fac_worker_count * 100) if fac_worker_count > 0 else 0),
-            'exam_percentage': round((fac_valid_exam / fac_worker_count * 100) if fac_worker_count > 0 else 0),
-            'first_aid_count': fac_first_aid,
-            'assessment_count': facility.assessment_sessions.count(),
+            'worker_count': fac_summary['total_workers'],
+            'edu_percentage': fac_summary['education_percentage'],
+            'exam_percentage': fac_summary['examination_percentage'],
+            'first_aid_count': fac_summary['first_aid_count'],
+            'assessment_count': facility.assessment_total,
         })
     
     # Get tab from query param
@@ -822,6 +675,7 @@ def workplace_detail(request, pk):
     filtered_workers = workers
     if facility_filter:
         filtered_workers = workers.filter(facility_id=facility_filter)
+    filtered_workers = attach_compliance(filtered_workers)
     
     # Fetch education sessions for this workplace
     education_sessions = Education.objects.filter(
@@ -833,13 +687,13 @@ def workplace_detail(request, pk):
         'facilities': facilities,
         'facilities_with_stats': facilities_with_stats,
         'workers': filtered_workers,
-        'total_workers': total_workers,
-        'facility_count': facility_count,
-        'valid_education': valid_education,
-        'valid_examination': valid_examination,
-        'education_percentage': education_percentage,
-        'examination_percentage': examination_percentage,
-        'first_aid_count': first_aid_count,
+        'total_workers': summary['total_workers'],
+        'facility_count': len(facilities_with_stats),
+        'valid_education': summary['valid_education'],
+        'valid_examination': summary['valid_examination'],
+        'education_percentage': summary['education_percentage'],
+        'examination_percentage': summary['examination_percentage'],
+        'first_aid_count': summary['first_aid_count'],
         'active_tab': active_tab,
         'facility_filter': facility_filter,
         'education_sessions': education_sessions,
@@ -864,6 +718,7 @@ def workplace_update(request, pk):
 
     # Fetch facilities with their workers
     facilities = item.facilities.prefetch_related('worker_set').all()
+    attach_compliance(worker for facility in facilities for worker in facility.worker_set.all())
 
     return render(request, 'core/workplace_form.html', {
         'form': form, 
@@ -881,10 +736,8 @@ def worker_list(request):
         {'field': 'profession', 'label': 'Meslek', 'type': 'select'},
     ]
 
-    # Prefetch related data to optimize badge generation
-    allowed_workplaces = get_allowed_workplaces(request.user)
-    # Fix: Use 'education' and 'examination' as per stats.py findings
-    queryset = Worker.objects.filter(workplace__in=allowed_workplaces).select_related('workplace', 'facility').prefetch_related('education_set', 'examination_set')
+    # Badges read compliance attached in one batch by attach_compliance
+    queryset = scope_queryset(Worker.objects.all(), request.user).select_related('workplace', 'facility')
 
     extra_actions = [
         {
@@ -907,7 +760,8 @@ def worker_list(request):
                               ('education_status', 'Eğitim Durumu'),
                               ('examination_status', 'Muayene Durumu')],
                              'worker_bulk_delete', 'worker_export', filter_config, 'import_worker_step1',
-                             queryset=queryset, extra_actions=extra_actions, extra_context={'stats': stats})
+                             queryset=queryset, extra_actions=extra_actions, extra_context={'stats': stats},
+                             prepare_items=attach_compliance)
 
 @login_required
 def worker_import(request, step=1):
@@ -1300,22 +1154,22 @@ def update_examination_note(request, pk):
 @login_required
 def facility_list(request):
     from django.db.models import Count, Q
-    from datetime import date
-    from dateutil.relativedelta import relativedelta
 
     try:
         # Base Query
         allowed_workplaces = get_allowed_workplaces(request.user)
-        queryset = Facility.objects.filter(workplace__in=allowed_workplaces)\
-            .select_related('workplace').prefetch_related(
-                'worker_set__education_set',
-                'worker_set__examination_set'
-            ).annotate(total_workers_count=Count('worker'))
+        queryset = scope_queryset(Facility.objects.all(), request.user)\
+            .select_related('workplace').annotate(total_workers_count=Count('worker'))
 
         # Search
         search_query = request.GET.get('search', '')
         if search_query:
-            queryset = queryset.filter(Q(name__icontains=search_query) | Q(workplace__name__icontains=search_query))
+            # name fields are encrypted: match via the trigram blind index
+            scoped_facilities = scope_queryset(Facility.objects.all(), request.user)
+            queryset = queryset.filter(
+                Q(pk__in=search_queryset(scoped_facilities, search_query).values('pk')) |
+                Q(workplace__in=search_queryset(allowed_workplaces, search_query, fields=('name',)).values('pk'))
+            )
 
         # Filter by Workplace
         workplace_filter = request.GET.get('workplace')
@@ -1326,18 +1180,6 @@ def facility_list(request):
             except ValueError:
                 workplace_filter = None
 
-        # Stats Calculation - Dynamic based on filter
-        # If workplace filter is active, calculate stats for that workplace only
-        if workplace_filter:
-            total_facilities = queryset.count()
-            # Get workers from filtered facilities
-            workers_qs = Worker.objects.filter(
-                facility__workplace_id=workplace_filter
-            ).select_related('workplace').prefetch_related('education_set', 'examination_set')
-        else:
-            total_facilities = Facility.objects.count()
-            workers_qs = Worker.objects.select_related('workplace').prefetch_related('education_set', 'examination_set')
-        
         # Calculate Stats
         stats = get_user_scoped_stats(request.user)
 
@@ -1392,42 +1234,17 @@ def facility_create(request):
 @login_required
 def facility_detail(request, pk):
     """Facility Dashboard - Read-only overview with tabs"""
-    allowed_workplaces = get_allowed_workplaces(request.user)
-    facility = get_object_or_404(Facility, pk=pk, workplace__in=allowed_workplaces)
+    facility = get_object_or_404(scope_queryset(Facility.objects.all(), request.user), pk=pk)
     workplace = facility.workplace
     
     # Workers for this facility
-    workers = facility.worker_set.all()
-    worker_count = workers.count()
+    workers = attach_compliance(facility.worker_set.all())
     
     # Calculate compliance stats
     from datetime import date
-    from dateutil.relativedelta import relativedelta
-    
-    valid_education = 0
-    valid_examination = 0
     today = date.today()
-    
-    if worker_count > 0:
-        # Get validity periods from workplace
-        edu_years = workplace.get_validity_years('education')
-        exam_years = workplace.get_validity_years('examination')
-        
-        for worker in workers:
-            # Check education validity
-            for edu in worker.education_set.all():
-                if edu.date and edu.date >= today - relativedelta(years=edu_years):
-                    valid_education += 1
-                    break
-            
-            # Check examination validity
-            for exam in worker.examination_set.all():
-                if exam.date and exam.date >= today - relativedelta(years=exam_years):
-                    valid_examination += 1
-                    break
-    
-    education_percentage = round((valid_education / worker_count * 100) if worker_count > 0 else 0)
-    examination_percentage = round((valid_examination / worker_count * 100) if worker_count > 0 else 0)
+    summary = summarize_snapshot(facility.worker_set.all())
+    worker_count = summary['total_workers']
     
     # Risk assessments for this facility
     assessment_sessions = facility.assessment_sessions.all().order_by('-created_at')
@@ -1458,10 +1275,10 @@ def facility_detail(request, pk):
         'workplace': workplace,
         'workers': workers,
         'worker_count': worker_count,
-        'valid_education': valid_education,
-        'valid_examination': valid_examination,
-        'education_percentage': education_percentage,
-        'examination_percentage': examination_percentage,
+        'valid_education': summary['valid_education'],
+        'valid_examination': summary['valid_examination'],
+        'education_percentage': summary['education_percentage'],
+        'examination_percentage': summary['examination_percentage'],
         'assessment_sessions': assessment_sessions,
         'assessment_count': assessment_count,
         'risk_tools': risk_tools,
@@ -1477,8 +1294,7 @@ def facility_detail(request, pk):
 
 @login_required
 def facility_update(request, pk):
-    allowed_workplaces = get_allowed_workplaces(request.user)
-    item = get_object_or_404(Facility, pk=pk, workplace__in=allowed_workplaces)
+    item = get_object_or_404(scope_queryset(Facility.objects.all(), request.user), pk=pk)
     if request.method == 'POST':
         form = FacilityForm(request.POST, instance=item, user=request.user)
         if form.is_valid():
@@ -1912,11 +1728,11 @@ def api_get_statistics(request):
     if model_name == 'Workplace':
         queryset = allowed_workplaces
     elif model_name == 'Worker':
-        queryset = Worker.objects.filter(workplace__in=allowed_workplaces)
+        queryset = scope_queryset(Worker.objects.all(), request.user)
     elif model_name == 'Education':
-        queryset = Education.objects.filter(workplace__in=allowed_workplaces)
+        queryset = scope_queryset(Education.objects.all(), request.user)
     elif model_name == 'Examination':
-        queryset = Examination.objects.filter(worker__workplace__in=allowed_workplaces)
+        queryset = scope_queryset(Examination.objects.all(), request.user, 'worker__workplace_id')
     else:
         # Fallback for safety
         queryset = model_class.objects.none()
@@ -2032,109 +1848,41 @@ def assessment_session_run(request, pk):
         messages.warning(request, 'Bu değerlendirme için araç seçilmemiş.')
         return redirect('facility_update', pk=session.facility.pk)
     
-    # Get all questions for this tool (ordered by category, topic, then question)
-    all_questions = RiskQuestion.objects.filter(
-        topic__category__tool=tool
-    ).select_related('topic__category').order_by(
-        'topic__category__order_index',
-        'topic__order_index',
-        'order_index'
-    )
-    
-    questions_list = list(all_questions)
-    total_questions = len(questions_list)
+    # Cached category/topic/question tree of the tool, plus this session's answer statuses
+    tree = get_question_tree(tool)
+    question_ids = tree['question_ids']
+    total_questions = len(question_ids)
     
     if total_questions == 0:
         messages.warning(request, 'Bu değerlendirme aracında henüz soru bulunmuyor.')
         return redirect('facility_update', pk=session.facility.pk)
     
-    # Get existing answers for this session
-    existing_answers = {
-        answer.question_id: answer 
-        for answer in session.answers.all()
-    }
-    
-    # Build navigation structure with answer status
-    categories_data = []
-    current_category = None
-    current_topic = None
-    
-    for idx, question in enumerate(questions_list):
-        cat = question.topic.category
-        topic = question.topic
-        
-        # New category?
-        if current_category is None or current_category['id'] != cat.id:
-            current_category = {
-                'id': cat.id,
-                'title': cat.title,
-                'topics': []
-            }
-            categories_data.append(current_category)
-            current_topic = None
-        
-        # New topic?
-        if current_topic is None or current_topic['id'] != topic.id:
-            current_topic = {
-                'id': topic.id,
-                'title': topic.title,
-                'questions': []
-            }
-            current_category['topics'].append(current_topic)
-        
-        # Get answer status
-        answer = existing_answers.get(question.id)
-        status = 'unanswered'
-        if answer and answer.response:
-            if answer.response == 'YES':
-                status = 'yes'
-            elif answer.response == 'NO':
-                status = 'no'
-            elif answer.response == 'NA':
-                status = 'na'
-            else:
-                status = 'postponed'
-        
-        current_topic['questions'].append({
-            'id': question.id,
-            'index': idx,
-            'content': question.content[:60] + '...' if len(question.content) > 60 else question.content,
-            'status': status
-        })
+    statuses = get_answer_statuses(session)
+    categories_data = get_navigation(tree, statuses)
     
     # Determine current question (from ?q= param or first unanswered)
-    q_param = request.GET.get('q')
-    current_question = None
-    current_index = 0
-    
-    if q_param:
-        try:
-            q_id = int(q_param)
-            for idx, q in enumerate(questions_list):
-                if q.id == q_id:
-                    current_question = q
-                    current_index = idx
-                    break
-        except (ValueError, TypeError):
-            pass
+    current_index = None
+    try:
+        current_index = tree['index_of'].get(int(request.GET.get('q')))
+    except (ValueError, TypeError):
+        pass
     
     # Default to first unanswered or first question
-    if not current_question:
-        for idx, q in enumerate(questions_list):
-            if q.id not in existing_answers or not existing_answers[q.id].response:
-                current_question = q
-                current_index = idx
-                break
-        if not current_question:
-            current_question = questions_list[0]
-            current_index = 0
-    
-    # Get current answer if exists
-    current_answer = existing_answers.get(current_question.id)
-    
-    # Calculate prev/next
-    prev_question = questions_list[current_index - 1] if current_index > 0 else None
-    next_question = questions_list[current_index + 1] if current_index < total_questions - 1 else None
+    if current_index is None:
+        current_index = next(
+            (idx for idx, question_id in enumerate(question_ids) if question_id not in statuses), 0
+        )
+    
+    current_question = RiskQuestion.objects.select_related('topic__category').filter(pk=question_ids[current_index]).first()
+    if current_question is None:
+        # The cached tree is behind a concurrent edit of the tool: rebuild it and start over
+        get_question_tree(tool, rebuild=True)
+        return redirect('assessment_session_run', pk=session.pk)
+    current_answer = session.answers.filter(question_id=current_question.id).first()
+    
+    # Calculate prev/next (the template only links to their IDs)
+    prev_question = {'id': question_ids[current_index - 1]} if current_index > 0 else None
+    next_question = {'id': question_ids[current_index + 1]} if current_index < total_questions - 1 else None
     
     # Get custom risks for sidebar
     custom_risks = session.custom_risks.all()
@@ -2233,8 +1981,8 @@ def risk_tool_delete(request, pk):
 @login_required
 def risk_tool_import(request):
     """Import Risk Tool from Excel/CSV file"""
-    import pandas as pd
     import os
+    from .risk_tool_import import read_risk_tool_file, get_missing_columns, prepare_risk_tool_frame, create_risk_tool_content
     
     if request.method == 'POST':
         form = RiskToolImportForm(request.POST, request.FILES)
@@ -2248,82 +1996,22 @@ def risk_tool_import(request):
                 tool_name = os.path.splitext(uploaded_file.name)[0]
             
             try:
-                # Read file based on extension
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
-                else:
-                    df = pd.read_excel(uploaded_file)
-                
-                # Normalize column names (lowercase, strip whitespace)
-                df.columns = df.columns.str.lower().str.strip()
+                df = read_risk_tool_file(uploaded_file)
                 
                 # Validate required columns
-                required_cols = ['category', 'topic', 'question']
-                missing_cols = [col for col in required_cols if col not in df.columns]
+                missing_cols = get_missing_columns(df)
                 if missing_cols:
                     messages.error(request, f"Eksik sütunlar: {', '.join(missing_cols)}")
                     return redirect('risk_tool_import')
                 
-                # Create the RiskTool
-                tool = RiskTool.objects.create(
-                    title=tool_name,
-                    sector=sector,
-                    is_active=True
-                )
-                
-                # Track created objects
-                categories_created = 0
-                topics_created = 0
-                questions_created = 0
-                
-                # Process each row
-                category_cache = {}
-                topic_cache = {}
-                
-                for idx, row in df.iterrows():
-                    category_name = str(row.get('category', '')).strip()
-                    topic_name = str(row.get('topic', '')).strip()
-                    question_text = str(row.get('question', '')).strip()
-                    explanation = str(row.get('explanation', '')).strip() if 'explanation' in df.columns else ''
-                    legal_ref = str(row.get('legal_ref', '')).strip() if 'legal_ref' in df.columns else ''
-                    
-                    if not category_name or not topic_name or not question_text:
-                        continue
-                    
-                    # Get or create Category
-                    if category_name not in category_cache:
-                        category, created = RiskCategory.objects.get_or_create(
-                            tool=tool,
-                            title=category_name,
-                            defaults={'order_index': len(category_cache)}
-                        )
-                        category_cache[category_name] = category
-                        if created:
-                            categories_created += 1
-                    category = category_cache[category_name]
-                    
-                    # Get or create Topic
-                    topic_key = f"{category_name}|{topic_name}"
-                    if topic_key not in topic_cache:
-                        topic, created = RiskTopic.objects.get_or_create(
-                            category=category,
-                            title=topic_name,
-                            defaults={'order_index': len([k for k in topic_cache if k.startswith(category_name)])}
-                        )
-                        topic_cache[topic_key] = topic
-                        if created:
-                            topics_created += 1
-                    topic = topic_cache[topic_key]
-                    
-                    # Create Question
-                    RiskQuestion.objects.create(
-                        topic=topic,
-                        content=question_text,
-                        explanation_text=explanation,
-                        legal_reference=legal_ref,
-                        order_index=questions_created
+                df = prepare_risk_tool_frame(df)
+                with transaction.atomic():
+                    tool = RiskTool.objects.create(
+                        title=tool_name,
+                        sector=sector,
+                        is_active=True
                     )
-                    questions_created += 1
+                    categories_created, topics_created, questions_created = create_risk_tool_content(tool, df)
                 
                 log_action(request.user, 'İçe Aktarma', tool, f"{questions_created} soru eklendi")
                 messages.success(
@@ -2395,6 +2083,8 @@ def assessment_answer_save(request, session_pk):
         
         # Update session timestamp
         session.save()  # This triggers auto_now on updated_at
+        # answered_count was moved in the database by the answer's signal
+        session.refresh_from_db(fields=['answered_count', 'total_questions'])
         
         return JsonResponse({
             'success': True,
@@ -2413,59 +2103,9 @@ def assessment_answer_save(request, session_pk):
 def get_runner_context(session):
     """Build context for runner sidebar - shared by all runner views"""
     tool = session.tool
-    
-    # Get all questions for this tool
-    all_questions = RiskQuestion.objects.filter(
-        topic__category__tool=tool
-    ).select_related('topic__category').order_by(
-        'topic__category__order_index',
-        'topic__order_index',
-        'order_index'
-    )
-    
-    questions_list = list(all_questions)
-    total_questions = len(questions_list)
-    
-    # Get existing answers
-    existing_answers = {
-        answer.question_id: answer 
-        for answer in session.answers.all()
-    }
-    
-    # Build navigation structure
-    categories_data = []
-    current_category = None
-    current_topic = None
-    
-    for idx, question in enumerate(questions_list):
-        cat = question.topic.category
-        topic = question.topic
-        
-        if current_category is None or current_category['id'] != cat.id:
-            current_category = {'id': cat.id, 'title': cat.title, 'topics': []}
-            categories_data.append(current_category)
-            current_topic = None
-        
-        if current_topic is None or current_topic['id'] != topic.id:
-            current_topic = {'id': topic.id, 'title': topic.title, 'questions': []}
-            current_category['topics'].append(current_topic)
-        
-        answer = existing_answers.get(question.id)
-        status = 'unanswered'
-        if answer and answer.response:
-            if answer.response == 'YES':
-                status = 'yes'
-            elif answer.response == 'NO':
-                status = 'no'
-            elif answer.response == 'NA':
-                status = 'na'
-        
-        current_topic['questions'].append({
-            'id': question.id,
-            'index': idx,
-            'content': question.content[:60] + '...' if len(question.content) > 60 else question.content,
-            'status': status
-        })
+    tree = get_question_tree(tool)
+    categories_data = get_navigation(tree, get_answer_statuses(session))
+    total_questions = len(tree['question_ids'])
     
     custom_risks = session.custom_risks.all()
     
@@ -2804,64 +2444,11 @@ def assessment_status(request, session_pk):
     session = get_object_or_404(AssessmentSession, pk=session_pk)
     tool = session.tool
     
-    # Get all categories with progress
-    categories = RiskCategory.objects.filter(tool=tool).prefetch_related('topics__questions')
-    
-    category_progress = []
-    total_questions = 0
-    total_answered = 0
-    
-    for cat in categories:
-        cat_questions = 0
-        cat_answered = 0
-        for topic in cat.topics.all():
-            for q in topic.questions.all():
-                cat_questions += 1
-                total_questions += 1
-                answer = session.answers.filter(question=q).first()
-                if answer and answer.response:
-                    cat_answered += 1
-                    total_answered += 1
-        
-        progress = round((cat_answered / cat_questions * 100)) if cat_questions > 0 else 0
-        category_progress.append({
-            'title': cat.title,
-            'answered': cat_answered,
-            'total': cat_questions,
-            'progress': progress,
-        })
-    
-    # Risk summary
-    high_priority = session.answers.filter(response='NO', risk_priority='HIGH').count()
-    high_priority += session.custom_risks.filter(is_acceptable=False, priority='HIGH').count()
-    
-    medium_priority = session.answers.filter(response='NO', risk_priority='MEDIUM').count()
-    medium_priority += session.custom_risks.filter(is_acceptable=False, priority='MEDIUM').count()
-    
-    low_priority = session.answers.filter(response='NO', risk_priority='LOW').count()
-    low_priority += session.custom_risks.filter(is_acceptable=False, priority='LOW').count()
-    
-    # Measures defined
-    total_risks = session.answers.filter(response='NO').count() + session.custom_risks.filter(is_acceptable=False).count()
-    risks_with_measures = 0
-    for answer in session.answers.filter(response='NO'):
-        if answer.measures.exists():
-            risks_with_measures += 1
-    for cr in session.custom_risks.filter(is_acceptable=False):
-        if cr.custom_measures.exists():
-            risks_with_measures += 1
-    
     context = {
         'session': session,
         'facility': session.facility,
         'tool': tool,
-        'category_progress': category_progress,
-        'total_progress': round((total_answered / total_questions * 100)) if total_questions > 0 else 0,
-        'high_priority': high_priority,
-        'medium_priority': medium_priority,
-        'low_priority': low_priority,
-        'total_risks': total_risks,
-        'risks_with_measures': risks_with_measures,
+        **get_status_summary(session),
     }
     return render(request, 'core/assessment_status.html', context)
 
@@ -2896,81 +2483,54 @@ def assessment_report(request, session_pk):
     return render(request, 'core/assessment_report.html', context)
 
 
-@login_required
-def export_action_plan_excel(request, session_pk):
-    """Export action plan as Excel file"""
-    session = get_object_or_404(AssessmentSession, pk=session_pk)
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Eylem Planı"
-    
-    # Headers
-    headers = ['Risk No', 'Risk Tanımı', 'Kategori', 'Öncelik', 'Önlem', 'Sorumlu', 'Bütçe', 'Başlangıç', 'Bitiş']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = openpyxl.styles.Font(bold=True)
-    
-    row = 2
+def _action_plan_rows(session):
+    """Action plan rows: one per measure, or one per risk without measures"""
+    def measure_cells(measure):
+        return [
+            measure.description,
+            measure.responsible_person,
+            measure.budget,
+            str(measure.planning_start_date) if measure.planning_start_date else '',
+            str(measure.planning_end_date) if measure.planning_end_date else '',
+        ]
+
     risk_num = 1
-    
+
     # Standard risks
-    for answer in session.answers.filter(response='NO').select_related('question__topic__category'):
+    answers = session.answers.filter(response='NO').select_related('question__topic__category').prefetch_related('measures')
+    for answer in answers:
+        risk = [
+            f"R{risk_num}",
+            answer.question.content,
+            answer.question.topic.category.title,
+            answer.get_risk_priority_display() if answer.risk_priority else '-',
+        ]
         measures = answer.measures.all()
         if measures:
             for measure in measures:
-                ws.cell(row=row, column=1, value=f"R{risk_num}")
-                ws.cell(row=row, column=2, value=answer.question.content)
-                ws.cell(row=row, column=3, value=answer.question.topic.category.title)
-                ws.cell(row=row, column=4, value=answer.get_risk_priority_display() if answer.risk_priority else '-')
-                ws.cell(row=row, column=5, value=measure.description)
-                ws.cell(row=row, column=6, value=measure.responsible_person)
-                ws.cell(row=row, column=7, value=measure.budget)
-                ws.cell(row=row, column=8, value=str(measure.planning_start_date) if measure.planning_start_date else '')
-                ws.cell(row=row, column=9, value=str(measure.planning_end_date) if measure.planning_end_date else '')
-                row += 1
+                yield risk + measure_cells(measure)
         else:
-            ws.cell(row=row, column=1, value=f"R{risk_num}")
-            ws.cell(row=row, column=2, value=answer.question.content)
-            ws.cell(row=row, column=3, value=answer.question.topic.category.title)
-            ws.cell(row=row, column=4, value=answer.get_risk_priority_display() if answer.risk_priority else '-')
-            ws.cell(row=row, column=5, value='Önlem tanımlanmadı')
-            row += 1
+            yield risk + ['Önlem tanımlanmadı']
         risk_num += 1
-    
+
     # Custom risks
-    for cr in session.custom_risks.filter(is_acceptable=False):
+    for cr in session.custom_risks.filter(is_acceptable=False).prefetch_related('custom_measures'):
+        risk = [f"Ω{risk_num}", cr.description, 'Ek Risk', cr.get_priority_display() if cr.priority else '-']
         measures = cr.custom_measures.all()
         if measures:
             for measure in measures:
-                ws.cell(row=row, column=1, value=f"Ω{risk_num}")
-                ws.cell(row=row, column=2, value=cr.description)
-                ws.cell(row=row, column=3, value='Ek Risk')
-                ws.cell(row=row, column=4, value=cr.get_priority_display() if cr.priority else '-')
-                ws.cell(row=row, column=5, value=measure.description)
-                ws.cell(row=row, column=6, value=measure.responsible_person)
-                ws.cell(row=row, column=7, value=measure.budget)
-                ws.cell(row=row, column=8, value=str(measure.planning_start_date) if measure.planning_start_date else '')
-                ws.cell(row=row, column=9, value=str(measure.planning_end_date) if measure.planning_end_date else '')
-                row += 1
+                yield risk + measure_cells(measure)
         else:
-            ws.cell(row=row, column=1, value=f"Ω{risk_num}")
-            ws.cell(row=row, column=2, value=cr.description)
-            ws.cell(row=row, column=3, value='Ek Risk')
-            ws.cell(row=row, column=4, value=cr.get_priority_display() if cr.priority else '-')
-            ws.cell(row=row, column=5, value='Önlem tanımlanmadı')
-            row += 1
+            yield risk + ['Önlem tanımlanmadı']
         risk_num += 1
-    
-    # Auto-size columns
-    for col in ws.columns:
-        max_length = max(len(str(cell.value or '')) for cell in col)
-        ws.column_dimensions[col[0].column_letter].width = min(max_length + 2, 50)
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="eylem_plani_{session.pk}.xlsx"'
-    wb.save(response)
-    return response
+
+
+@login_required
+def export_action_plan_excel(request, session_pk):
+    """Export action plan as Excel file"""
+    session = get_object_or_404(AssessmentSession, pk=session_pk)
+    headers = ['Risk No', 'Risk Tanımı', 'Kategori', 'Öncelik', 'Önlem', 'Sorumlu', 'Bütçe', 'Başlangıç', 'Bitiş']
+    return xlsx_response(_action_plan_rows(session), headers, f"eylem_plani_{session.pk}.xlsx", sheet_title="Eylem Planı")
 
 
 @login_required
@@ -3916,7 +3476,7 @@ def education_certificate_word(request):
 # Fast Track Assessment Mode
 # =============================================================================
 
-from .risk_library import get_risk_library, get_risk_categories, search_risks
+from .risk_library import get_risk, get_risk_categories, search_risks, get_library_version
 
 @login_required
 def assessment_fast_run(request, pk):
@@ -3974,7 +3534,12 @@ def assessment_fast_run(request, pk):
     return render(request, 'core/assessment_fast_run.html', context)
 
 
+def _risk_library_version(request):
+    return get_library_version()
+
+
 @login_required
+@conditional_json(_risk_library_version)
 def api_get_risk_library(request):
     """API endpoint to get paginated risk library"""
     query = request.GET.get('q', '')
@@ -4001,10 +3566,12 @@ def api_get_risk_library(request):
         'results': formatted_results,
         'total': result['total'],
         'has_more': result['has_more'],
+        'facets': result['facets'],
     })
 
 
 @login_required
+@conditional_json(_risk_library_version)
 def api_get_risk_categories(request):
     """API endpoint to get risk categories"""
     categories = get_risk_categories()
@@ -4027,12 +3594,7 @@ def api_add_library_risk(request, session_pk):
     library_id = data.get('library_id')
     
     # Get risk from library
-    all_risks = get_risk_library()
-    risk_data = None
-    for risk in all_risks:
-        if risk.get('id') == library_id:
-            risk_data = risk
-            break
+    risk_data = get_risk(library_id)
     
     if not risk_data:
         return JsonResponse({'error': 'Risk not found in library'}, status=404)
@@ -4054,7 +3616,7 @@ def api_add_library_risk(request, session_pk):
         sub_category=risk_data.get('Üst Grup Adı', ''),
         hazard_source=risk_data.get('Tehlike Kaynağı', '') or tehlike,
         legal_basis=risk_data.get('İlgili Mevzuat', ''),
-        source_library_id=library_id,
+        source_library_id=risk_data['id'],
         affected_persons=etkilenen,
         measure=onlem,
     )
@@ -4778,7 +4340,30 @@ def add_public_comment(request, engagement_pk):
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
 
+def _wall_version(request, facility_uuid):
+    # One query over exactly what the wall shows: database state, so every worker derives the same ETag.
+    # Likes and moderation change rows in place (no timestamp), hence no Last-Modified.
+    rows = SafetyEngagement.objects.filter(
+        Q(facility__uuid=facility_uuid) & (Q(is_public_on_wall=True, status='APPROVED') | Q(status='PENDING'))
+    ).order_by('-created_at').annotate(
+        comment_count=Count('comments', distinct=True),
+        last_comment=Max('comments__pk'),
+        public_comments=Count('comments', filter=Q(comments__is_public_on_voice=True), distinct=True),
+    ).values_list('pk', 'status', 'topic', 'message', 'likes', 'comment_count', 'last_comment', 'public_comments')[:20]
+    return repr(list(rows)), None
+
+
+def _polls_version(request, facility_uuid):
+    rows = SafetyPoll.objects.filter(facility__uuid=facility_uuid, is_active=True).order_by('-created_at').values_list(
+        'pk', 'question', 'options', 'votes'
+    )
+    # has_voted comes from the voted_polls cookie
+    voted = ','.join(sorted(set(request.COOKIES.get('voted_polls', '').split(',')) - {''}))
+    return f'{list(rows)!r}|{voted}', None
+
+
 @ratelimit(key='ip', rate='30/m', method='GET', block=True)
+@conditional_json(_wall_version)
 def api_wall_items(request, facility_uuid):
     """JSON API endpoint for wall items - for client-side rendering"""
     facility = get_object_or_404(Facility, uuid=facility_uuid)
@@ -4842,6 +4427,7 @@ def api_wall_items(request, facility_uuid):
 
 
 @ratelimit(key='ip', rate='30/m', method='GET', block=True)
+@conditional_json(_polls_version, vary_on=('Cookie',))
 def api_public_polls(request, facility_uuid):
     """JSON API endpoint for polls - for client-side rendering"""
     facility = get_object_or_404(Facility, uuid=facility_uuid)
@@ -4964,11 +4550,10 @@ def api_dashboard_search(request):
         return JsonResponse({'results': []})
     
     results = []
+    allowed_workplaces = get_allowed_workplaces(request.user)
     
-    # Search Workplaces
-    workplaces = Workplace.objects.filter(
-        Q(name__icontains=query) | Q(detsis_number__icontains=query)
-    )[:5]
+    # Search Workplaces (encrypted names: trigram blind index + decrypt-and-verify)
+    workplaces = search_queryset(allowed_workplaces, query, fields=('name', 'detsis_number'))[:5]
     
     for wp in workplaces:
         results.append({
@@ -4980,8 +4565,8 @@ def api_dashboard_search(request):
         })
     
     # Search Facilities
-    facilities = Facility.objects.filter(
-        Q(name__icontains=query)
+    facilities = search_queryset(
+        scope_queryset(Facility.objects.all(), request.user), query
     ).select_related('workplace')[:5]
     
     for fac in facilities:
@@ -4994,3 +4579,146 @@ def api_dashboard_search(request):
         })
     
     return JsonResponse({'results': results})
+
+
+# Due Calendar (upcoming education / examination / first aid expiries)
+DUE_CALENDAR_MAX_DAYS = 365
+
+
+def _get_due_calendar_items(request):
+    """Parses ?days=&type=&workplace= and returns (days, items) scoped to the user's workplaces"""
+    from .compliance import get_due_items, DUE_TYPES
+
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        days = 30
+    days = max(0, min(days, DUE_CALENDAR_MAX_DAYS))
+
+    types = set(request.GET.getlist('type')) or {t[0] for t in DUE_TYPES}
+    # Examination dates are medical data (same rule as medical_access_required)
+    profile = getattr(request.user, 'profile', None)
+    medical_access = profile.has_medical_access() if profile else request.user.is_superuser
+    if not medical_access:
+        types.discard('examination')
+
+    workers = scope_queryset(Worker.objects.all(), request.user)
+    workplace_filter = request.GET.get('workplace')
+    if workplace_filter and workplace_filter.isdigit():
+        workers = workers.filter(workplace_id=workplace_filter)
+
+    return days, get_due_items(workers, days=days, types=types)
+
+
+@login_required
+def api_due_calendar(request):
+    """Upcoming expiries in the next N days, grouped by workplace (default) or facility"""
+    from .compliance import group_due_items
+
+    days, items = _get_due_calendar_items(request)
+    group_by = 'facility' if request.GET.get('group') == 'facility' else 'workplace'
+    groups = group_due_items(items, by=group_by)
+    for group in groups:
+        for item in group['items']:
+            item['expiry_date'] = item['expiry_date'].isoformat()
+
+    return JsonResponse({'days': days, 'count': len(items), 'group': group_by, 'groups': groups})
+
+
+@login_required
+def due_calendar_export(request):
+    """CSV of the same items as api_due_calendar, one row per expiry"""
+    days, items = _get_due_calendar_items(request)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="yaklasan_gecerlilikler_{timestamp}.csv"'
+    response.write('\ufeff')  # UTF-8 BOM for Excel compatibility
+    writer = csv.writer(response)
+    writer.writerow(['İşyeri', 'Bina/Birim', 'Çalışan', 'Tür', 'Bitiş Tarihi', 'Kalan Gün'])
+    for item in items:
+        writer.writerow([
+            item['workplace_name'],
+            item['facility_name'],
+            item['worker_name'],
+            item['type_display'],
+            item['expiry_date'].strftime('%d.%m.%Y'),
+            item['days_left'],
+        ])
+    return response
+
+
+@login_required
+def api_filter_options(request):
+    """One page of options for a relation select filter on a list page (see filter_options.py)"""
+    source_model = FILTER_SOURCE_MODELS.get(request.GET.get('model', ''))
+    related_model = resolve_related_model(source_model, request.GET.get('field', '')) if source_model else None
+    if related_model is None:
+        return JsonResponse({'error': 'Geçersiz filtre alanı.'}, status=400)
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    return JsonResponse(get_filter_options(related_model, request.user, request.GET.get('q', ''), page))
+
+
+# =============================================================================
+# Background Jobs (see jobs.py; executed by `manage.py run_jobs`)
+# =============================================================================
+
+def _enqueue_job_and_redirect(request, kind, params):
+    job = enqueue_job(kind, request.user, params)
+    messages.info(request, 'İşlem arka planda hazırlanıyor. Tamamlandığında bu sayfadan indirebilirsiniz.')
+    return redirect('job_detail', pk=job.pk)
+
+
+def _get_user_job(request, pk):
+    """Jobs are only visible to the user who started them (and superusers)"""
+    jobs = BackgroundJob.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(user=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+
+@login_required
+def enqueue_report_job(request, session_pk, report_format):
+    """Renders an assessment report (pdf, word, checklist) in the background"""
+    session = get_object_or_404(AssessmentSession, pk=session_pk)
+    if report_format not in REPORT_VIEWS:
+        messages.error(request, 'Geçersiz rapor türü.')
+        return redirect('assessment_report', session_pk=session.pk)
+    return _enqueue_job_and_redirect(request, 'REPORT', {'format': report_format, 'session_pk': session.pk})
+
+
+@login_required
+def job_detail(request, pk):
+    job = _get_user_job(request, pk)
+    return render(request, 'core/job_detail.html', {'job': job})
+
+
+@login_required
+def api_job_status(request, pk):
+    job = _get_user_job(request, pk)
+    has_download = job.status == BackgroundJob.STATUS_SUCCEEDED and bool(job.artifact)
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'message': job.progress_message,
+        'error': job.error if job.status == BackgroundJob.STATUS_FAILED else '',
+        'result': job.result,
+        'finished': job.is_finished,
+        'download_url': reverse('job_download', args=[job.pk]) if has_download else None,
+    })
+
+
+@login_required
+def job_download(request, pk):
+    job = _get_user_job(request, pk)
+    if job.status == BackgroundJob.STATUS_EXPIRED:
+        return HttpResponse('Dosyanın süresi doldu, lütfen yeniden oluşturun.', status=410)
+    if job.status != BackgroundJob.STATUS_SUCCEEDED or not job.artifact:
+        return HttpResponse('Dosya henüz hazır değil.', status=404)
+    return FileResponse(get_artifact_storage().open(job.artifact, 'rb'), as_attachment=True, filename=job.artifact_name)
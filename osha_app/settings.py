@@ -30,6 +30,11 @@ SECRET_KEY = os.environ['SECRET_KEY']
 # CRITICAL: Losing this key = losing access to all encrypted worker data.
 FIELD_ENCRYPTION_KEY = os.environ['FIELD_ENCRYPTION_KEY']
 
+# HMAC key for blind-index columns (searchable digests of encrypted fields).
+# Optional: if unset, a sub-key is derived from FIELD_ENCRYPTION_KEY.
+# Changing it requires `python manage.py rebuild_blind_indexes`.
+BLIND_INDEX_KEY = os.getenv('BLIND_INDEX_KEY', '')
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', '0') == '1'
 
@@ -147,6 +152,22 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 
+# Cache (scoped stats, filter options, ...). Local memory is per process: with several
+# gunicorn workers set CACHE_BACKEND to a shared backend (e.g. FileBasedCache +
+# CACHE_LOCATION, see DEPLOYMENT.md) so invalidation reaches every worker.
+# `manage.py check --deploy` warns about a local memory cache (core/checks.py).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'osha-app'),
+    }
+}
+
+# Background jobs (exports, reports, imports) run by `manage.py run_jobs`
+JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '2'))  # jobs running at once across all workers
+JOB_ARTIFACT_TTL_HOURS = int(os.getenv('JOB_ARTIFACT_TTL_HOURS', '24'))  # finished files are deleted after this
+JOB_ARTIFACT_ROOT = BASE_DIR / 'job_artifacts'
+
 
 # ═══════════════════════════════════════════════════════════════
 # PRODUCTION SECURITY SETTINGS (only active when DEBUG=False)